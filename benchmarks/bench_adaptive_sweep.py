@@ -0,0 +1,92 @@
+"""
+Frequency points per second and noise with full window sweeps only versus the
+adaptive coarse/fine sweep scheduling, on a simulated device whose sweep time
+grows with the number of samples.
+
+Run from the repository root:
+    python -m benchmarks.bench_adaptive_sweep
+"""
+
+from time import perf_counter
+
+import numpy as np
+
+import openQCM.processors.Serial as serial_module
+from openQCM.core.constants import Constants, EstimatorType
+from openQCM.processors.Serial import SerialProcess
+
+# simulated device: fixed overhead and acquisition time per sample (s)
+SWEEP_OVERHEAD = 10e-3
+SAMPLE_TIME = 0.5e-3
+BANDWIDTH = 400.0
+NOISE = 0.02
+
+
+class _Parser:
+    # collects the resonance frequency published by the process
+    def __init__(self):
+        self.frequency = []
+
+    def add_sweep(self, record):
+        if record.frequency is not None:
+            self.frequency.append(record.frequency)
+
+
+def run(adaptive, estimator, duration=60.0, offset=300.0, seed=0):
+    Constants.adaptive_sweep = adaptive
+    Constants.low_cpu_mode = False
+    Constants.Estimator5_fundamental = estimator
+    rng = np.random.default_rng(seed)
+    parser = _Parser()
+    process = SerialProcess(parser)
+    process._overtone_int = 0
+    samples = Constants.argument_default_samples
+    process.setup_processing(samples)
+    f0 = process._reference_frequency + offset
+    gamma = BANDWIDTH / 2 / np.sqrt(1 / 0.707 - 1)
+
+    # single sweep estimates, before the streaming average
+    raw = []
+    update = process._frequency_smoother.update
+    process._frequency_smoother.update = lambda value: (raw.append(value), update(value))[1]
+
+    clock = [0.0]
+    serial_module.time = lambda: clock[0]
+    k = 0
+    times = []
+    while clock[0] < duration:
+        sweep_start = clock[0]
+        (start, stop, step, freq, n, spline_points, process._full_sweep) = process.next_sweep_window(clock[0])
+        clock[0] += SWEEP_OVERHEAD + n * SAMPLE_TIME
+        u = (freq - f0) / gamma
+        mag = 6 / (1 + u * u) + process.coeffs_all(freq) + rng.normal(0, NOISE, n)
+        phase = -np.degrees(np.arctan(u)) + process.coeffs_all_phase(freq) + rng.normal(0, NOISE, n)
+        t = perf_counter()
+        failed = False
+        try:
+            process.elaborate(k, process._coeffs_all, freq, n, mag, phase, 25.0,
+                              process._SG_window_size, spline_points, process._Spline_factor, 0)
+        except Exception:
+            failed = True
+        clock[0] += perf_counter() - t
+        times.append(clock[0])
+        process.end_sweep(k, failed, sweep_start)
+        k += 1
+
+    serial_module.time = perf_counter
+    raw = np.array(raw[process._environment:]) - f0
+    times = np.array(times[-len(raw):])
+    # noise at equal time resolution: averages over 1 s bins
+    bins = np.floor(times).astype(int)
+    means = np.array([raw[bins == b].mean() for b in np.unique(bins)])
+    return k / duration, np.std(raw), np.std(means), np.mean(raw)
+
+
+if __name__ == '__main__':
+    print("{:<12}{:<10}{:>10}{:>18}{:>20}{:>12}".format(
+        "estimator", "mode", "points/s", "single std [Hz]", "1 s mean std [Hz]", "bias [Hz]"))
+    for estimator in EstimatorType:
+        for adaptive in (False, True):
+            rate, single, binned, bias = run(adaptive, estimator)
+            print("{:<12}{:<10}{:>10.1f}{:>18.3f}{:>20.3f}{:>12.3f}".format(
+                estimator.name, "adaptive" if adaptive else "full", rate, single, binned, bias))
@@ -0,0 +1,94 @@
+"""
+CPU and memory per instrument of the asynchronous acquisition (one process
+with an asyncio event loop for all the devices, spline estimation in a DSP
+process pool) against the process-per-device model, on N simulated devices
+served on pseudo-terminals, so the acquisition reads real serial ports.
+
+Reports, for each model and N, the sweeps per second of each device and the
+CPU time and proportional set size (PSS) of the acquisition processes (pool
+included) per device.
+
+Run from the repository root (Linux, the CPU and memory are read from /proc):
+    python -m benchmarks.bench_async_acquisition
+"""
+
+import os
+import shutil
+import tempfile
+from time import perf_counter, sleep
+
+import numpy as np
+
+from benchmarks.bench_multi_device import consume, cpu_time
+from benchmarks.fake_device import PtyDevice
+from openQCM.core.constants import Constants
+from openQCM.core.worker import Worker
+from openQCM.processors.Serial import SerialProcess
+
+DURATION = 10.0
+DEVICES = (1, 2, 4, 8)
+TICK = Constants.plot_update_ms / 1000
+
+
+def pss(pid):
+    # proportional set size of a process (MB): shared pages split among the processes
+    with open("/proc/{}/smaps_rollup".format(pid)) as f:
+        for line in f:
+            if line.startswith("Pss:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def tree(pid):
+    # pid and pids of all its descendants
+    pids = [pid]
+    for task in os.listdir("/proc/{}/task".format(pid)):
+        with open("/proc/{}/task/{}/children".format(pid, task)) as f:
+            for child in f.read().split():
+                pids += tree(int(child))
+    return pids
+
+
+def run(n, asynchronous):
+    Constants.async_acquisition = asynchronous
+    devices = [PtyDevice() for i in range(n)]
+    worker = Worker(port=devices[0].port, speed=str(SerialProcess.load_frequencies_file()[0]),
+                    device_ports=[d.port for d in devices[1:]])
+    worker.start()
+    workers = [worker] + worker.get_devices()
+    pids = sorted(set(w._get_process().pid for w in workers))
+    t_end = perf_counter() + DURATION
+    while perf_counter() < t_end:
+        t = perf_counter()
+        consume(worker)
+        sleep(max(0.0, TICK - (perf_counter() - t)))
+    pids = [p for pid in pids for p in tree(pid)]
+    cpu = sum(cpu_time(pid) for pid in pids)
+    memory = sum(pss(pid) for pid in pids)
+    worker.stop()
+    worker.wait_for_process()
+    consume(worker)
+    sweeps = [w.get_ser_error()[2] + 1 for w in workers]
+    for device in devices:
+        device.close()
+    return np.mean(sweeps) / DURATION, cpu / DURATION / n, memory / n, len(pids)
+
+
+if __name__ == '__main__':
+    # pseudo-terminals are not listed among the Q-1 ports
+    SerialProcess._is_port_available = lambda self, port: True
+    path = tempfile.mkdtemp()
+    # (trailing separator: FileManager joins with a backslash on Linux)
+    Constants.csv_export_path = os.path.join(path, "")
+    try:
+        # the table is printed at the end, after the logs of the processes
+        results = [(n, mode) + run(n, asynchronous)
+                   for (asynchronous, mode) in ((False, "processes"), (True, "asyncio"))
+                   for n in DEVICES]
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+    print("\n{:<9}{:<11}{:>11}{:>21}{:>24}{:>22}".format(
+        "devices", "model", "processes", "sweeps/s per device", "CPU per device [%]", "PSS per device [MB]"))
+    for (n, mode, rate, cpu, memory, processes) in results:
+        print("{:<9}{:<11}{:>11}{:>21.1f}{:>24.1f}{:>22.1f}".format(
+            n, mode, processes, rate, 100 * cpu, memory))
@@ -0,0 +1,109 @@
+"""
+CSV rows written by the Worker: the previous writer (csv.writer, one row
+formatted and written per sweep) against CSVBlockWriter (rows buffered in
+arrays, formatted per column and written once per block).
+
+The files must be identical byte for byte (but for the time of the rows
+without acquisition timestamp, the time they are written): the data include rounding ties
+(x.xx5), negative values and -0.0, NaN, large values, rows without
+acquisition timestamp and both the single and multi-overtone layouts.
+Reports rows per second for each writer and block size.
+
+Run from the repository root:
+    python -m benchmarks.bench_block_csv
+"""
+
+import csv
+import datetime
+import io
+from time import perf_counter, strftime, localtime, time
+
+import numpy as np
+
+from openQCM.common.csvBlockWriter import CSVBlockWriter
+
+ROWS = 100000
+BLOCKS = (30, 256, 4096)
+
+
+def legacy(file, rows):
+    # the Worker before CSVBlockWriter
+    writer = csv.writer(file)
+    for (relative_time, temperature, frequency, dissipation, acq_timestamp_us, harmonic) in rows:
+        if acq_timestamp_us is not None:
+            acq_dt = datetime.datetime.fromtimestamp(acq_timestamp_us / 1e6)
+            csv_date = acq_dt.strftime("%Y-%m-%d")
+            csv_time = acq_dt.strftime("%H:%M:%S") + ".{:03d}".format(acq_dt.microsecond // 1000)
+        else:
+            csv_date = strftime("%Y-%m-%d", localtime())
+            csv_time = strftime("%H:%M:%S", localtime())
+        d0 = float("{0:.2f}".format(relative_time))
+        d1 = float("{0:.2f}".format(temperature))
+        d2 = float("{0:.2f}".format(frequency))
+        row = [csv_date, csv_time, d0, d1, d2, dissipation]
+        if harmonic is not None:
+            row.append(harmonic)
+        writer.writerow(row)
+
+
+def block(file, rows, size, harmonic):
+    writer = CSVBlockWriter(file, harmonic=harmonic, rows=size)
+    for row in rows:
+        writer.append(*row)
+    writer.flush()
+
+
+def sweeps(n, harmonic=False):
+    # a session at 2.3 sweeps/s, then the corner cases
+    t = ((time() + np.arange(n) * 0.43) * 1e6).astype(np.int64)
+    relative = (t - t[0]) / 1e6
+    temperature = 25.0 + np.random.normal(0, 0.5, n)
+    frequency = 5e6 + np.random.normal(0, 50, n)
+    dissipation = 1e-5 + np.random.normal(0, 1e-8, n)
+    k = np.arange(n)
+    # ties and values one ulp around them, negative and small values
+    ties = (np.random.randint(-10**6, 10**6, n) + 0.005) + np.random.randint(-1, 2, n) * 1e-12
+    temperature[k % 7 == 0] = ties[k % 7 == 0]
+    frequency[k % 11 == 0] = np.round(frequency[k % 11 == 0], 3)
+    temperature[k % 13 == 0] = np.random.uniform(-0.01, 0.01, (k % 13 == 0).sum())
+    rows = [[float(a), float(b), float(c), float(d), int(e), 2 * (i % 3) + 1 if harmonic else None]
+            for (i, (a, b, c, d, e)) in enumerate(zip(relative, temperature, frequency, dissipation, t))]
+    for (i, value) in enumerate((float("nan"), float("inf"), -0.0, 1e16, -123456789012.345, 0.125, 2.675, -0.005)):
+        rows[i][1] = value
+        rows[i][3] = value
+    rows[-1][4] = None
+    return rows
+
+
+def check():
+    for harmonic in (False, True):
+        rows = sweeps(20000, harmonic)
+        for size in BLOCKS + (1, 7):
+            (expected, actual) = (io.StringIO(newline=''), io.StringIO(newline=''))
+            legacy(expected, rows)
+            block(actual, rows, size, harmonic)
+            (expected, actual) = (expected.getvalue().split("\r\n"), actual.getvalue().split("\r\n"))
+            assert expected[:-2] == actual[:-2], "block {} differs".format(size)
+            # last row: time of the write, no milliseconds
+            assert expected[-2].split(",", 2)[2] == actual[-2].split(",", 2)[2], "block {} differs".format(size)
+            assert len(actual[-2].split(",")[1]) == 8 and actual[-1] == ""
+    print("identical output ({} rows, block sizes {})".format(20000, BLOCKS + (1, 7)))
+
+
+def rate(write):
+    rows = sweeps(ROWS)
+    file = io.StringIO(newline='')
+    start = perf_counter()
+    write(file, rows)
+    return ROWS / (perf_counter() - start)
+
+
+if __name__ == '__main__':
+    check()
+    results = [("csv.writer", rate(legacy))]
+    for size in BLOCKS:
+        results.append(("block {}".format(size), rate(lambda file, rows: block(file, rows, size, False))))
+    print("\n{} rows".format(ROWS))
+    print("{:<14}{:>12}{:>10}".format("writer", "rows/s", "speedup"))
+    for (name, rows) in results:
+        print("{:<14}{:>12.0f}{:>10.1f}".format(name, rows, rows / results[0][1]))
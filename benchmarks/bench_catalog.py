@@ -0,0 +1,94 @@
+"""
+Finding past sessions among SESSIONS: the session catalog against a scan
+of the data folder. The folder holds one CSV file per session (ROWS rows,
+timestamped name, overtone in the name); the catalog the same sessions.
+
+Queries: the sessions of a week at 5 MHz, and the same with their sweep
+count and frequency range (the folder scan reads every candidate file).
+Also reports the cost of the catalog for the Worker: begin (START), files
+of a segment and finish (STOP).
+
+Run from the repository root:
+    python -m benchmarks.bench_catalog
+"""
+
+import os
+import tempfile
+from datetime import datetime
+from time import perf_counter, strftime, localtime, time
+
+import numpy as np
+
+from openQCM.common.sessionCatalog import SessionCatalog
+from openQCM.core.constants import Constants
+
+SESSIONS = 10000
+ROWS = 100
+OVERTONES = (("fundamental", 5003000.0), ("3rd_Overtone", 14995000.0), ("5th_Overtone", 24987000.0))
+
+
+def populate(path):
+    catalog = SessionCatalog(os.path.join(path, "sessions.db"))
+    start = time() - SESSIONS * 3600
+    rows = "".join("2024-01-01,00:00:00.000,{:.2f},25.0,{:.2f},1e-05\r\n".format(i * 0.43, 5e6 + i) for i in range(ROWS))
+    for k in range(SESSIONS):
+        started = start + k * 3600
+        (name, value) = OVERTONES[k % len(OVERTONES)]
+        session = strftime(Constants.csv_default_prefix, localtime(started))
+        filename = os.path.join(path, "{}_{}.csv".format(session, name))
+        with open(filename, 'w', newline='') as f:
+            f.write("Date,Time,Relative_time,Temperature,Resonance_Frequency,Dissipation\r\n" + rows)
+        info = {'session': session, 'device': 0, 'port': "COM3", 'source': "serial", 'overtones': [0]}
+        session_id = catalog.begin(info, {'overtone_name': name, 'overtone_value': value})
+        catalog.add_files(session_id, 1, {'csv': filename})
+        catalog.finish(session_id, {'sweeps': ROWS, 'frequency_min': 5e6, 'frequency_max': 5e6 + ROWS})
+        with catalog._connect() as connection:
+            connection.execute("UPDATE sessions SET started = ? WHERE id = ?", (started, session_id))
+    return catalog, start
+
+
+def scan(path, since, until, name, statistics):
+    # the sessions in the folder names, the statistics in the files
+    found = []
+    for filename in os.listdir(path):
+        if not filename.endswith("_{}.csv".format(name)):
+            continue
+        started = datetime.strptime(filename[:-len("_{}.csv".format(name))], Constants.csv_default_prefix).timestamp()
+        if since <= started < until:
+            session = {'file': filename, 'started': started}
+            if statistics:
+                frequency = np.loadtxt(os.path.join(path, filename), delimiter=",", skiprows=1, usecols=4, ndmin=1)
+                session.update(sweeps=len(frequency), frequency_min=frequency.min(), frequency_max=frequency.max())
+            found.append(session)
+    return found
+
+
+def timed(function, *args, **kwargs):
+    start = perf_counter()
+    result = function(*args, **kwargs)
+    return 1e3 * (perf_counter() - start), len(result)
+
+
+if __name__ == '__main__':
+    path = tempfile.mkdtemp()
+    (catalog, start) = populate(path)
+    (since, until) = (start + SESSIONS * 3600 / 2, start + SESSIONS * 3600 / 2 + 7 * 86400)
+    results = [("folder scan", "names") + timed(scan, path, since, until, "fundamental", False),
+               ("folder scan", "+ statistics") + timed(scan, path, since, until, "fundamental", True),
+               ("catalog", "names + statistics") + timed(catalog.find, since=since, until=until, overtone_value=5003000.0)]
+    # the Worker: one session, START to STOP
+    costs = []
+    for k in range(20):
+        t0 = perf_counter()
+        session_id = catalog.begin({'session': "bench", 'device': 0, 'port': "COM3", 'source': "serial", 'overtones': [0]}, {})
+        t1 = perf_counter()
+        catalog.add_files(session_id, 1, {'csv': "bench.csv", 'session_file': "bench.h5"})
+        t2 = perf_counter()
+        catalog.finish(session_id, {'sweeps': 1}, [(time(), 1.0, 2.0, 1.5, 1)])
+        costs.append((t1 - t0, t2 - t1, perf_counter() - t2))
+    print("\n{} sessions, a week at 5 MHz".format(SESSIONS))
+    print("{:<14}{:<22}{:>12}{:>10}".format("method", "result", "time [ms]", "sessions"))
+    for (method, result, elapsed, found) in results:
+        print("{:<14}{:<22}{:>12.1f}{:>10}".format(method, result, elapsed, found))
+    (begin, files, finish) = 1e3 * np.median(costs, axis=0)
+    print("\nWorker: begin {:.2f} ms, files {:.2f} ms, finish {:.2f} ms (median)".format(begin, files, finish))
@@ -0,0 +1,80 @@
+"""
+Overlaying SESSIONS sessions (ROWS rows each) in the Compare Sessions
+dialog: load time with 1 loader thread against Constants.compare_loaders
+(parallel gain depends on the cores: reported), memory of the samples kept
+against MEMORY_MB, and the time of a view change with every session
+overlaid (query, curves updated and drawn).
+
+Run from the repository root (no display needed):
+    QT_QPA_PLATFORM=offscreen python -m benchmarks.bench_compare
+"""
+
+import os
+import tempfile
+from time import perf_counter
+
+import numpy as np
+from PyQt5 import QtCore, QtWidgets
+
+from benchmarks.bench_data_viewer import session
+from openQCM.core.constants import Constants
+from openQCM.ui.mainWindow_ui import CompareViewerDialog
+
+SESSIONS = 12
+ROWS = 200000
+MEMORY_MB = 64
+LOADERS = (1, Constants.compare_loaders)
+
+
+def wait(application, viewer):
+    while viewer._loaders or viewer._queue:
+        application.processEvents(QtCore.QEventLoop.WaitForMoreEvents, 50)
+    application.processEvents()
+
+
+if __name__ == '__main__':
+    application = QtWidgets.QApplication([])
+    folder = tempfile.mkdtemp()
+    paths = [os.path.join(folder, "session{:02d}.csv".format(k)) for k in range(SESSIONS)]
+    for path in paths:
+        session(path, 0, ROWS)
+    Constants.compare_memory_mb = MEMORY_MB
+    print("\n{} sessions of {} rows, {} CPU(s), samples kept within {} MB".format(SESSIONS, ROWS, os.cpu_count(), MEMORY_MB))
+    print("{:<10}{:>16}{:>16}{:>20}{:>22}".format("loaders", "cold load [s]", "cached [s]", "samples kept [MB]", "all samples [MB]"))
+    for loaders in LOADERS:
+        Constants.compare_loaders = loaders
+        times = []
+        for cached in (False, True):
+            if not cached:
+                for path in paths:
+                    if os.path.exists(path + ".npz"):
+                        os.remove(path + ".npz")
+            start = perf_counter()
+            viewer = CompareViewerDialog(paths=paths)
+            viewer.show()
+            wait(application, viewer)
+            times.append(perf_counter() - start)
+            # the view releases what does not fit
+            viewer._update_curves()
+            (kept, total) = (viewer._comparison.memory(), sum(s.nbytes for s in viewer._comparison.sessions))
+            viewer.close()
+        print("{:<10}{:>16.2f}{:>16.2f}{:>20.0f}{:>22.0f}".format(loaders, times[0], times[1], kept / 1e6, total / 1e6))
+        assert kept <= MEMORY_MB * 1e6
+
+    # view change with every session overlaid (zoomed sessions loaded again as memory allows)
+    viewer = CompareViewerDialog(paths=paths)
+    viewer.show()
+    wait(application, viewer)
+    span = ROWS / 2.3
+    for zoom in (1.0, 0.01):
+        elapsed = []
+        for start in np.linspace(0, span * (1 - zoom), 10):
+            t0 = perf_counter()
+            viewer._plt_freq.setXRange(start, start + zoom * span, padding=0)
+            application.processEvents()
+            viewer._plot_widget.grab()
+            elapsed.append(perf_counter() - t0)
+        wait(application, viewer)
+        print("view change, {:g} of the span: {:.1f} ms (median), samples kept {:.0f} MB".format(
+            zoom, 1e3 * np.median(elapsed), viewer._comparison.memory() / 1e6))
+    viewer.close()
@@ -0,0 +1,98 @@
+"""
+Opening a long session in the Data View: the previous loader (csv.reader
+on the GUI thread, a tuple per row) against the background loader
+(DataLoader thread, CSVLoader chunks and cache).
+
+The file is a session of DAYS days at 2.3 sweeps/s. Reports the time to
+load it, the time until the first rows are plotted and the longest stall
+of the GUI thread (a 10 ms timer), for a first opening, a second one (the
+cache) and after the session has grown by an hour (rows appended). The
+rows must be the same as with the previous loader.
+
+Run from the repository root (no display needed):
+    QT_QPA_PLATFORM=offscreen python -m benchmarks.bench_data_viewer
+"""
+
+import csv
+import os
+import tempfile
+from time import perf_counter, time
+
+import numpy as np
+from PyQt5 import QtCore, QtWidgets
+
+from openQCM.common.csvBlockWriter import CSVBlockWriter
+from openQCM.ui.mainWindow_ui import DataViewerDialog
+
+DAYS = 3
+RATE = 2.3
+
+
+def session(path, start, rows):
+    # rows as written by the Worker, appended to the file
+    n = np.arange(start, start + rows)
+    t = time() * 1e6 + n / RATE * 1e6
+    frequency = 5e6 - 1e-4 * n + np.random.normal(0, 0.05, rows)
+    dissipation = 1e-5 + np.random.normal(0, 1e-8, rows)
+    with open(path, 'a', newline='') as f:
+        if start == 0:
+            f.write("Date,Time,Relative_time,Temperature,Resonance_Frequency,Dissipation\r\n")
+        writer = CSVBlockWriter(f, rows=rows)
+        for k in range(rows):
+            writer.append(float(n[k] / RATE), 25.0, float(frequency[k]), float(dissipation[k]), int(t[k]))
+        writer.flush()
+
+
+def legacy(path):
+    # the previous DataViewerDialog._load_csv
+    data = []
+    with open(path, 'r') as f:
+        reader = csv.reader(f)
+        next(reader)
+        for row in reader:
+            try:
+                data.append((float(row[2]), float(row[4]), float(row[5])))
+            except (ValueError, IndexError):
+                continue
+    return np.array(data)
+
+
+def open_viewer(application, path):
+    # GUI thread: 10 ms timer, the longest gap between two ticks is the stall
+    ticks = [perf_counter()]
+    timer = QtCore.QTimer()
+    timer.timeout.connect(lambda: ticks.append(perf_counter()))
+    timer.start(10)
+    first = []
+    start = perf_counter()
+    viewer = DataViewerDialog(csv_path=path)
+    viewer._loader.chunk.connect(lambda data, fraction: first.append(perf_counter()) if not first else None)
+    while viewer._loader is not None:
+        application.processEvents(QtCore.QEventLoop.WaitForMoreEvents, 50)
+    elapsed = perf_counter() - start
+    ticks.append(perf_counter())
+    timer.stop()
+    data = viewer._pyramid.samples()
+    viewer.close()
+    return elapsed, first[0] - start, np.max(np.diff(ticks)), data
+
+
+if __name__ == '__main__':
+    application = QtWidgets.QApplication([])
+    path = os.path.join(tempfile.mkdtemp(), "session.csv")
+    rows = int(DAYS * 86400 * RATE)
+    session(path, 0, rows)
+    print("\n{} days, {} rows, {:.1f} MB".format(DAYS, rows, os.path.getsize(path) / 1e6))
+    start = perf_counter()
+    reference = legacy(path)
+    results = [("csv.reader (GUI thread)",) + (perf_counter() - start,) * 3]
+    for name in ("first opening", "cached", "+1 hour appended"):
+        if name == "+1 hour appended":
+            session(path, rows, int(3600 * RATE))
+            reference = legacy(path)
+        (elapsed, first, stall, data) = open_viewer(application, path)
+        assert np.array_equal(data, reference), "rows differ"
+        results.append(("loader: " + name, elapsed, first, stall))
+    print("{:<28}{:>10}{:>16}{:>18}".format("loader", "load [s]", "first rows [s]", "longest stall [s]"))
+    for (name, elapsed, first, stall) in results:
+        print("{:<28}{:>10.3f}{:>16.3f}{:>18.3f}".format(name, elapsed, first, stall))
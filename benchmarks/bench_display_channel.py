@@ -0,0 +1,89 @@
+"""
+GUI stall with the amplitude/phase arrays in the sweep records (every sweep
+queued and unpickled) against the display channel (newest sweep only).
+A child process publishes sweeps at the device rate while the GUI stalls,
+then the GUI drains everything as on a timer tick.
+
+Reports the memory of the publishing and router processes at the end of
+the stall, the time the GUI takes to consume everything published during
+the stall and the backpressure metrics of the Worker.
+
+Run from the repository root (Linux, the memory is read from /proc):
+    python -m benchmarks.bench_display_channel
+"""
+
+import multiprocessing
+from time import perf_counter, sleep
+
+import numpy as np
+
+from openQCM.core.constants import Constants
+from openQCM.core.displayChannel import DisplayChannel
+from openQCM.core.sweepRecord import SweepRecord
+from openQCM.core.worker import Worker
+from openQCM.processors.Parser import ParserProcess
+
+SAMPLES = Constants.auto_window_max_samples
+SWEEP_RATE = 200.0
+STALL = (1.0, 5.0, 20.0)
+
+
+def rss(pid):
+    # resident set size of a process (MB)
+    with open("/proc/{}/status".format(pid)) as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def publish(parser, exit):
+    # acquisition process: one record per sweep with the full window arrays
+    k = 0
+    while not exit.is_set():
+        record = SweepRecord()
+        record.sweep = k
+        record.timestamp = k
+        (record.frequency, record.dissipation, record.temperature) = (5e6, 1e-5, 25.0)
+        record.amplitude = np.random.random(SAMPLES)
+        record.phase = np.random.random(SAMPLES)
+        parser.add_sweep(record)
+        k += 1
+        sleep(1 / SWEEP_RATE)
+    parser.close()
+
+
+def run(coalesce, stall):
+    worker = Worker()
+    worker._overtones = [0]
+    worker.reset_buffers(SAMPLES)
+    worker._display_channel = DisplayChannel(SAMPLES) if coalesce else None
+    parser = ParserProcess(worker._queue1, worker._queue2, worker._queue3, worker._queue4, worker._queue5,
+                           worker._queue6, worker._queue_sweep, worker._display_channel)
+    worker._parser_process = parser
+    parser.start()
+    exit = multiprocessing.Event()
+    process = multiprocessing.Process(target=publish, args=(parser, exit))
+    process.start()
+    # GUI stall
+    sleep(stall)
+    memory = rss(process.pid) + rss(parser.pid)
+    # catch-up: until all the sweeps published during the stall are consumed
+    exit.set()
+    t = perf_counter()
+    while process.is_alive() or parser.is_alive():
+        worker.consume_queue_sweep()
+        process.join(0.001)
+    worker.consume_queue_sweep()
+    catch_up = perf_counter() - t
+    return (memory, catch_up) + worker.get_backpressure()
+
+
+if __name__ == '__main__':
+    print("{:<10}{:<12}{:>16}{:>16}{:>10}{:>10}{:>11}".format(
+        "stall [s]", "arrays", "pub+router [MB]", "catch-up [ms]", "shown", "dropped", "max depth"))
+    for stall in STALL:
+        for (coalesce, mode) in ((False, "records"), (True, "channel")):
+            (memory, catch_up, frames, dropped, depth) = run(coalesce, stall)
+            print("{:<10}{:<12}{:>16.1f}{:>16.1f}{:>10}{:>10}{:>11}".format(
+                stall, mode, memory, 1e3 * catch_up, frames if coalesce else "all", dropped, depth))
@@ -0,0 +1,62 @@
+"""
+Latency and errors (f0, dissipation) of the resonance estimators on
+synthetic sweeps. The dissipation is 1/Q, Q from the bandwidth at 70.7% of
+the peak: the same definition for every estimator.
+
+Run from the repository root:
+    python -m benchmarks.bench_estimators
+"""
+
+from time import perf_counter
+
+import numpy as np
+
+from openQCM.core.constants import Constants
+from openQCM.core.estimators import LorentzianEstimator, PhaseSlopeEstimator
+from openQCM.processors.Serial import savitzky_golay, spline_estimation
+from benchmarks.synthetic import sweep
+
+
+def run(sweeps=200, drift=0.5, bandwidth=400.0):
+    lorentzian = LorentzianEstimator()
+    phase_slope = PhaseSlopeEstimator(Constants.SG_window_size5_fundamental)
+    samples = Constants.argument_default_samples
+    spline_points = Constants.L5_fundamental + Constants.R5_fundamental + 1
+    timings = {"spline": [], "lorentzian": [], "phase": []}
+    errors = {"spline": [], "lorentzian": [], "phase": []}
+    d_errors = {"spline": [], "lorentzian": [], "phase": []}
+    for k in range(sweeps):
+        f0 = 5.0e6 + k * drift
+        freq, mag, phase = sweep(f0=f0, center=5.0e6, bandwidth=bandwidth, samples=samples, seed=k)
+        d = bandwidth / f0
+
+        start = perf_counter()
+        filtered = savitzky_golay(mag, window_size=Constants.SG_window_size5_fundamental, order=Constants.SG_order)
+        (f_spline, _, q_spline, _, _) = spline_estimation(freq, filtered, spline_points, Constants.Spline_factor5_fundamental)
+        timings["spline"].append(perf_counter() - start)
+        errors["spline"].append(f_spline - f0)
+        d_errors["spline"].append(1 / q_spline - d)
+
+        start = perf_counter()
+        (f_fit, _, q_fit, _) = lorentzian.estimate(freq, mag)
+        timings["lorentzian"].append(perf_counter() - start)
+        errors["lorentzian"].append(f_fit - f0)
+        d_errors["lorentzian"].append(1 / q_fit - d)
+
+        start = perf_counter()
+        (f_phase, _, q_phase, _) = phase_slope.estimate(freq, phase)
+        timings["phase"].append(perf_counter() - start)
+        errors["phase"].append(f_phase - f0)
+        d_errors["phase"].append(1 / q_phase - d)
+
+    print("{:<12}{:>14}{:>14}{:>16}{:>18}{:>18}".format(
+        "estimator", "mean [ms]", "p95 [ms]", "f0 rms err [Hz]", "D bias [1e-6]", "D rms err [1e-6]"))
+    for name in timings:
+        t = np.array(timings[name]) * 1e3
+        print("{:<12}{:>14.3f}{:>14.3f}{:>16.3f}{:>18.3f}{:>18.3f}".format(
+            name, np.mean(t), np.percentile(t, 95), np.sqrt(np.mean(np.square(errors[name]))),
+            1e6 * np.mean(d_errors[name]), 1e6 * np.sqrt(np.mean(np.square(d_errors[name])))))
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,113 @@
+"""
+Crash of the Worker during a session, with and without the journal: a
+process writes rows through Worker._write_csv_row at RATE rows/s and is
+killed (SIGKILL) after DURATION seconds, then the data folder is recovered
+as at the next start (sessionJournal.recover_sessions).
+
+Reports the rows acknowledged by the Worker before the kill, the rows in
+the CSV file after recovery and the rows lost, checks that the recovered
+rows are the rows written (same text as an uninterrupted session), and
+the time a row blocks the caller (median, 99th percentile, max).
+
+POSIX only (SIGKILL). Run from the repository root:
+    python -m benchmarks.bench_journal
+"""
+
+import io
+import multiprocessing
+import os
+import signal
+import tempfile
+from time import perf_counter, sleep, time
+
+import numpy as np
+
+from openQCM.common import sessionJournal
+from openQCM.common.csvBlockWriter import CSVBlockWriter
+from openQCM.core.constants import Constants
+from openQCM.core.worker import Worker
+
+DURATION = 5.0
+RATES = (10, 100, 1000)
+ROWS = 20000  # at most
+
+
+def rows(n, start):
+    # sweeps of a session, the same in the writer and the check
+    random = np.random.RandomState(1)
+    t = (start + np.arange(n) * 1e6 / 1000).astype(np.int64)
+    frequency = 5e6 + random.normal(0, 50, ROWS)
+    dissipation = 1e-5 + random.normal(0, 1e-8, ROWS)
+    temperature = 25.0 + random.normal(0, 0.5, ROWS)
+    return [(float(i / 1000), float(temperature[i]), float(frequency[i]), float(dissipation[i]), int(t[i]))
+            for i in range(n)]
+
+
+def open_worker(path, journal):
+    Constants.csv_export_path = path
+    Constants.journal_enabled = journal
+    worker = Worker()
+    (worker._csv_filename, worker._overtone_name, worker._overtones) = ("bench", "fundamental", [0])
+    worker._open_csv_file()
+    return worker
+
+
+def write(path, journal, rate, start, written):
+    worker = open_worker(path, journal)
+    begin = time()
+    for (i, row) in enumerate(rows(int(rate * DURATION * 2), start)):
+        worker._write_csv_row(*row)
+        written.value = i + 1
+        sleep(max(0.0, begin + (i + 1) / rate - time()))
+
+
+def crash(journal, rate):
+    path = os.path.join(tempfile.mkdtemp(), "")
+    start = int(time() * 1e6)
+    written = multiprocessing.RawValue('l', 0)
+    process = multiprocessing.Process(target=write, args=(path, journal, rate, start, written))
+    process.start()
+    sleep(DURATION)
+    os.kill(process.pid, signal.SIGKILL)
+    process.join()
+    acknowledged = written.value
+    Constants.csv_export_path = path
+    sessionJournal.recover_sessions(path)
+    filename = [f for f in os.listdir(path) if f.endswith(".csv")][0]
+    with open(os.path.join(path, filename), newline='') as f:
+        lines = f.read().split("\r\n")
+    # the rows recovered, as written by an uninterrupted session
+    expected = io.StringIO(newline='')
+    writer = CSVBlockWriter(expected, rows=acknowledged + 1)
+    for row in rows(acknowledged, start):
+        writer.append(*row)
+    writer.flush()
+    complete = [line for line in lines[1:] if line.count(",") == 5]
+    assert complete == expected.getvalue().split("\r\n")[:len(complete)], "recovered rows differ"
+    return acknowledged, len(complete), acknowledged - len(complete)
+
+
+def blocking(journal):
+    path = os.path.join(tempfile.mkdtemp(), "")
+    worker = open_worker(path, journal)
+    durations = []
+    for row in rows(ROWS, int(time() * 1e6)):
+        t = perf_counter()
+        worker._write_csv_row(*row)
+        durations.append(perf_counter() - t)
+    worker._close_csv_file()
+    durations = 1e6 * np.array(durations)
+    return np.median(durations), np.percentile(durations, 99), durations.max()
+
+
+if __name__ == '__main__':
+    results = [(journal, rate) + crash(journal, rate) for journal in (False, True) for rate in RATES]
+    latencies = [(journal,) + blocking(journal) for journal in (False, True)]
+    print("\nkilled after {:.0f} s, journal commit every {:.1f} s".format(DURATION, Constants.journal_commit_interval))
+    print("{:<9}{:>8}{:>14}{:>12}{:>8}".format("journal", "rows/s", "acknowledged", "recovered", "lost"))
+    for (journal, rate, acknowledged, recovered, lost) in results:
+        print("{:<9}{:>8}{:>14}{:>12}{:>8}".format("on" if journal else "off", rate, acknowledged, recovered, lost))
+    print("\nrow written by the Worker ({} rows)".format(ROWS))
+    print("{:<9}{:>10}{:>10}{:>10}".format("journal", "p50 [us]", "p99 [us]", "max [us]"))
+    for (journal, p50, p99, longest) in latencies:
+        print("{:<9}{:>10.1f}{:>10.1f}{:>10.0f}".format("on" if journal else "off", p50, p99, longest))
@@ -0,0 +1,114 @@
+"""
+Panning and zooming a long session in the Data View: every sample handed
+to the curves (pyqtgraph peak downsampling and clip to view, the previous
+viewer) against the min/max pyramid queried for the visible span.
+
+SAMPLES samples of frequency and dissipation (about DAYS days at 2.3
+sweeps/s). Reports the time to build the curves (pyramid: appended in
+chunks, as by the loader), then for each zoom level the time of a view
+change: query, curves updated and the plot drawn (offscreen grab), median
+of a pan across the span. The pyramid must keep the min and max of the
+visible samples.
+
+Run from the repository root (no display needed):
+    QT_QPA_PLATFORM=offscreen python -m benchmarks.bench_lod_viewer
+"""
+
+from time import perf_counter
+
+import numpy as np
+import pyqtgraph as pg
+from PyQt5 import QtWidgets
+
+from openQCM.common.minMaxPyramid import MinMaxPyramid
+
+SAMPLES = 20000000
+RATE = 2.3
+CHUNK = 16384
+# visible fraction of the session, from all of it to a few hundred samples
+ZOOMS = (1.0, 0.1, 1e-3, 1e-5)
+PANS = 10
+
+
+def session():
+    t = np.arange(SAMPLES) / RATE
+    frequency = 5e6 - 1e-4 * np.arange(SAMPLES) + np.random.normal(0, 0.05, SAMPLES)
+    dissipation = 1e-5 + np.random.normal(0, 1e-8, SAMPLES)
+    return np.column_stack((t, frequency, dissipation))
+
+
+def window():
+    widget = pg.GraphicsLayoutWidget()
+    widget.resize(1000, 700)
+    (freq, diss) = (widget.addPlot(row=0, col=0), widget.addPlot(row=1, col=0))
+    diss.setXLink(freq)
+    widget.show()
+    return widget, freq, diss
+
+
+def pan(application, widget, freq, update, span):
+    times = []
+    for zoom in ZOOMS:
+        width = zoom * span
+        elapsed = []
+        for start in np.linspace(0, span - width, PANS):
+            t0 = perf_counter()
+            freq.setXRange(start, start + width, padding=0)
+            update()
+            application.processEvents()
+            widget.grab()
+            elapsed.append(perf_counter() - t0)
+        times.append(np.median(elapsed))
+    return times
+
+
+if __name__ == '__main__':
+    application = QtWidgets.QApplication([])
+    data = session()
+    span = data[-1, 0]
+
+    # previous viewer: all samples in the curves
+    (widget, freq, diss) = window()
+    start = perf_counter()
+    for plot in (freq, diss):
+        plot.setDownsampling(auto=True, mode='peak')
+        plot.setClipToView(True)
+    curves = (freq.plot(data[:, 0], data[:, 1]), diss.plot(data[:, 0], data[:, 2]))
+    application.processEvents()
+    widget.grab()
+    legacy = [perf_counter() - start] + pan(application, widget, freq, lambda: None, span)
+    widget.close()
+
+    # pyramid: visible span queried on each view change
+    (widget, freq, diss) = window()
+    start = perf_counter()
+    pyramid = MinMaxPyramid(columns=2)
+    for k in range(0, SAMPLES, CHUNK):
+        pyramid.append(data[k:k + CHUNK])
+    build = perf_counter() - start
+    curves = (freq.plot(), diss.plot())
+
+    def update():
+        (t, values) = pyramid.query(*freq.getViewBox().viewRange()[0], freq.getViewBox().width())
+        curves[0].setData(t, values[:, 0])
+        curves[1].setData(t, values[:, 1])
+
+    update()
+    application.processEvents()
+    widget.grab()
+    lod = [perf_counter() - start] + pan(application, widget, freq, update, span)
+    widget.close()
+
+    # envelope of the visible samples kept
+    for zoom in ZOOMS:
+        (a, b) = (0.3 * span, 0.3 * span + zoom * span)
+        (t, values) = pyramid.query(a, b, 1000)
+        visible = data[(data[:, 0] >= a) & (data[:, 0] <= b)]
+        assert values[:, 0].max() >= visible[:, 1].max() and values[:, 0].min() <= visible[:, 1].min()
+        assert values[:, 1].max() >= visible[:, 2].max() and values[:, 1].min() <= visible[:, 2].min()
+
+    print("\n{} samples ({:.0f} days), pyramid built in {:.2f} s".format(SAMPLES, span / 86400, build))
+    print("{:<30}{:>16}{:>16}".format("", "all samples [ms]", "pyramid [ms]"))
+    print("{:<30}{:>16.0f}{:>16.0f}".format("curves built and drawn", 1e3 * legacy[0], 1e3 * lod[0]))
+    for (zoom, old, new) in zip(ZOOMS, legacy[1:], lod[1:]):
+        print("{:<30}{:>16.1f}{:>16.1f}".format("view change, {:g} of the span".format(zoom), 1e3 * old, 1e3 * new))
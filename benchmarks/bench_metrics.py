@@ -0,0 +1,67 @@
+"""
+Cost of the metrics: what the acquisition pays per sweep to count the
+record and observe its stage latencies, and what a scrape of the exporter
+costs for 1 to 8 devices (collect and render in the GUI process, and the
+whole HTTP request on localhost).
+
+Run from the repository root:
+    python -m benchmarks.bench_metrics
+"""
+
+import urllib.request
+from time import perf_counter
+
+import numpy as np
+
+from openQCM.core.constants import Constants
+from openQCM.core.metrics import Metrics, MetricsServer, render
+from openQCM.core.sweepRecord import SweepRecord
+
+SWEEPS = 100000
+SCRAPES = 200
+DEVICES = (1, 4, 8)
+PORT = Constants.metrics_port + 100
+
+
+def record_cost():
+    metrics = Metrics()
+    record = SweepRecord()
+    (record.read_time, record.process_time, record.sampling_time) = (0.2, 0.004, 0.25)
+    t = perf_counter()
+    for k in range(SWEEPS):
+        metrics.add_sweep(record)
+        metrics.observe("route", 1e-4)
+    return 1e6 * (perf_counter() - t) / SWEEPS
+
+
+def scrape_cost(n):
+    devices = [Metrics(i) for i in range(n)]
+    record = SweepRecord()
+    for metrics in devices:
+        for k in range(1000):
+            (record.read_time, record.process_time) = np.random.random(2)
+            metrics.add_sweep(record)
+
+    def collect():
+        return [sample for metrics in devices for sample in metrics.collect()]
+
+    t = perf_counter()
+    for k in range(SCRAPES):
+        text = render(collect())
+    render_time = 1e3 * (perf_counter() - t) / SCRAPES
+    server = MetricsServer(collect, port=PORT)
+    server.start()
+    t = perf_counter()
+    for k in range(SCRAPES):
+        urllib.request.urlopen("http://127.0.0.1:{}/metrics".format(PORT)).read()
+    http_time = 1e3 * (perf_counter() - t) / SCRAPES
+    server.stop()
+    return render_time, http_time, len(text)
+
+
+if __name__ == '__main__':
+    print("per sweep (count + 3 latencies): {:.2f} us".format(record_cost()))
+    print("\n{:<10}{:>14}{:>14}{:>10}".format("devices", "render [ms]", "scrape [ms]", "bytes"))
+    for n in DEVICES:
+        (render_time, http_time, size) = scrape_cost(n)
+        print("{:<10}{:>14.2f}{:>14.2f}{:>10}".format(n, render_time, http_time, size))
@@ -0,0 +1,90 @@
+"""
+Per-device overhead of the multi-device acquisition: N simulated Q-1 devices
+under one Worker, with the queues drained by one 50 ms timer as in the GUI.
+Reports, for each N, the sweeps per second of each device, the CPU time of
+the acquisition processes and the time spent by the GUI timer consuming the
+queues, with the acquisition processes sleeping or busy polling while the
+device sweeps.
+
+Run from the repository root (Linux, the CPU time is read from /proc):
+    python -m benchmarks.bench_multi_device
+"""
+
+import os
+import shutil
+import tempfile
+from time import perf_counter, sleep
+
+import numpy as np
+import serial
+
+from benchmarks.fake_device import FakeDevice
+from openQCM.core.constants import Constants
+from openQCM.core.worker import Worker
+from openQCM.processors.Serial import SerialProcess
+
+DURATION = 10.0
+DEVICES = (1, 2, 4, 8)
+TICK = Constants.plot_update_ms / 1000
+
+
+def cpu_time(pid):
+    # user + system CPU time of a process (s)
+    with open("/proc/{}/stat".format(pid)) as f:
+        fields = f.read().rsplit(')', 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+
+def consume(worker):
+    # what MainWindow._update_plot does on each tick
+    worker.consume_queue1()
+    worker.consume_queue2()
+    worker.consume_queue3()
+    worker.consume_queue4()
+    worker.consume_queue5()
+    worker.consume_queue6()
+    worker.consume_queue_sweep()
+    worker.consume_devices()
+
+
+def run(n, poll_interval):
+    Constants.serial_poll_interval = poll_interval
+    worker = Worker(port="FAKE0", speed=str(SerialProcess.load_frequencies_file()[0]),
+                    device_ports=["FAKE{}".format(i) for i in range(1, n)])
+    worker.start()
+    workers = [worker] + worker.get_devices()
+    ticks = []
+    t_end = perf_counter() + DURATION
+    while perf_counter() < t_end:
+        t = perf_counter()
+        consume(worker)
+        ticks.append(perf_counter() - t)
+        sleep(max(0.0, TICK - (perf_counter() - t)))
+    cpu = [cpu_time(w._acquisition_process.pid) for w in workers]
+    worker.stop()
+    worker.wait_for_process()
+    consume(worker)
+    sweeps = [w.get_ser_error()[2] + 1 for w in workers]
+    return np.mean(sweeps) / DURATION, np.mean(cpu) / DURATION, np.mean(ticks), np.max(ticks)
+
+
+if __name__ == '__main__':
+    # simulated devices in place of the serial ports
+    serial.Serial = FakeDevice
+    SerialProcess._is_port_available = lambda self, port: True
+    path = tempfile.mkdtemp()
+    # (trailing separator: FileManager joins with a backslash on Linux)
+    Constants.csv_export_path = os.path.join(path, "")
+    poll_interval = Constants.serial_poll_interval
+    try:
+        # the table is printed at the end, after the logs of the processes
+        results = [(n, mode) + run(n, interval)
+                   for (interval, mode) in ((poll_interval, "sleep"), (0, "busy"))
+                   for n in DEVICES]
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+    print("\n{:<9}{:<10}{:>20}{:>24}{:>18}{:>18}".format(
+        "devices", "polling", "sweeps/s per device", "CPU per device [%]", "tick mean [ms]", "tick max [ms]"))
+    for (n, mode, rate, cpu, tick, tick_max) in results:
+        print("{:<9}{:<10}{:>20.1f}{:>24.1f}{:>18.2f}{:>18.2f}".format(
+            n, mode, rate, 100 * cpu, 1e3 * tick, 1e3 * tick_max))
@@ -0,0 +1,82 @@
+"""
+Cost of routing the sweep records through the ParserProcess: records put
+straight on the GUI queue against records fanned out by the router, alone
+and with subscribers that never read their queue (stalled storage or
+network outputs). A child process publishes the sweeps at the device rate,
+the parent drains the GUI queue as on the timer ticks.
+
+Reports the time the acquisition spends adding a record, the latency from
+the acquisition to the GUI and the records dropped by the stalled
+subscribers.
+
+Run from the repository root:
+    python -m benchmarks.bench_parser_router
+"""
+
+import multiprocessing
+from time import perf_counter, sleep, time
+
+import numpy as np
+
+from openQCM.core.constants import Constants, DropPolicy
+from openQCM.core.sweepRecord import SweepRecord
+from openQCM.processors.Parser import ParserProcess, Subscriber
+
+SWEEPS = 2000
+SWEEP_RATE = 200.0
+STALLED = 3
+TICK = Constants.plot_update_ms / 1000
+
+
+def publish(parser, gui, costs):
+    # acquisition process: one record per sweep, timestamped when added
+    for k in range(SWEEPS):
+        record = SweepRecord()
+        record.sweep = k
+        (record.frequency, record.dissipation, record.temperature) = (5e6, 1e-5, 25.0)
+        t = perf_counter()
+        record.timestamp = int(time() * 1e6)
+        if parser is None:
+            gui.put(record)
+        else:
+            parser.add_sweep(record)
+        costs[k] = perf_counter() - t
+        sleep(1 / SWEEP_RATE)
+    if parser is not None:
+        parser.close()
+
+
+def run(routed, stalled):
+    gui = multiprocessing.Queue()
+    parser = None
+    subscribers = [Subscriber("stalled {}".format(i), DropPolicy.drop_oldest) for i in range(stalled)]
+    if routed:
+        parser = ParserProcess(*[multiprocessing.Queue() for i in range(6)], data_queue_sweep=gui)
+        for subscriber in subscribers:
+            parser.subscribe(subscriber)
+        parser.start()
+    costs = multiprocessing.RawArray('d', SWEEPS)
+    process = multiprocessing.Process(target=publish, args=(parser, gui, costs))
+    process.start()
+    latency = []
+    while len(latency) < SWEEPS:
+        while not gui.empty():
+            latency.append(time() - gui.get(False).timestamp / 1e6)
+        sleep(TICK)
+    process.join()
+    if parser is not None:
+        parser.join()
+    dropped = sum(s.get_stats()[1] for s in subscribers)
+    # latency of the routing only: the records waiting for the tick are excluded
+    return 1e6 * np.median(costs), 1e3 * np.min(latency), 1e3 * np.percentile(latency, 99), dropped
+
+
+if __name__ == '__main__':
+    # the table is printed at the end, after the logs of the processes
+    results = [(mode,) + run(routed, stalled)
+               for (routed, stalled, mode) in ((False, 0, "direct"), (True, 0, "router"),
+                                               (True, STALLED, "router + {} stalled".format(STALLED)))]
+    print("\n{:<22}{:>18}{:>22}{:>22}{:>10}".format(
+        "records", "add [us]", "min latency [ms]", "p99 latency [ms]", "dropped"))
+    for (mode, cost, minimum, p99, dropped) in results:
+        print("{:<22}{:>18.1f}{:>22.2f}{:>22.1f}{:>10}".format(mode, cost, minimum, p99, dropped))
@@ -0,0 +1,111 @@
+"""
+Load test of the query API: a Worker acquires from a simulated device
+(pseudo-terminal) with full history buffers, the main thread runs the GUI
+ticks (queues drained, history buffers read for the plots) and client
+processes poll /status and /history?points=POINTS&last=3600, paced at
+RATE requests per second each or as fast as they can.
+
+Reports the sweeps acquired per second, the duration of the GUI ticks
+(median and 99th percentile), the requests answered per second and their
+latency. The acquisition and the ticks must not change with the load.
+
+POSIX only (pseudo-terminal). Run from the repository root:
+    python -m benchmarks.bench_query_api
+"""
+
+import http.client
+import multiprocessing
+import os
+import tempfile
+from time import perf_counter, sleep, time
+
+import numpy as np
+
+from benchmarks.bench_multi_device import consume
+from benchmarks.fake_device import PtyDevice
+from openQCM.core.constants import Constants
+from openQCM.core.worker import Worker
+from openQCM.processors.Serial import SerialProcess
+
+DURATION = 10.0
+POINTS = 1000
+RATE = 10.0
+PORT = Constants.api_port + 100
+SCENARIOS = ((0, RATE), (4, RATE), (16, RATE), (4, None))
+TICK = Constants.plot_update_ms / 1000
+
+
+def poll(rate, exit, requests, latencies, i):
+    # dashboard: status and history alternately
+    connection = http.client.HTTPConnection("127.0.0.1", PORT)
+    paths = ("/status", "/history?points={}&last=3600".format(POINTS))
+    k = 0
+    start = time()
+    while not exit.is_set():
+        t = perf_counter()
+        connection.request("GET", paths[k % 2])
+        connection.getresponse().read()
+        latencies[i] = max(latencies[i], perf_counter() - t)
+        k += 1
+        requests[i] = k
+        if rate is not None:
+            sleep(max(0.0, start + k / rate - time()))
+
+
+def fill_history(worker):
+    # an hour of sweeps before the session: full ring buffers
+    n = Constants.ring_buffer_samples
+    t = (time() - 3600 + np.arange(n) * 3600 / n) * 1e6
+    with worker._history_lock:
+        for (k, value) in enumerate(t):
+            worker._queue_data3([value, 5e6 + np.sin(k / 100)])
+            worker._queue_data4([value, 1e-5])
+            worker._queue_data5([value, 25.0])
+
+
+def run(device, clients, rate):
+    worker = Worker(port=device.port, speed=str(SerialProcess.load_frequencies_file()[0]))
+    worker.start()
+    fill_history(worker)
+    exit = multiprocessing.Event()
+    requests = multiprocessing.RawArray('L', max(1, clients))
+    latencies = multiprocessing.RawArray('d', max(1, clients))
+    pollers = [multiprocessing.Process(target=poll, args=(rate, exit, requests, latencies, i)) for i in range(clients)]
+    for poller in pollers:
+        poller.start()
+    # the GUI timer
+    ticks = []
+    sweep_start = worker.get_ser_error()[2]
+    start = time()
+    while time() - start < DURATION:
+        t = perf_counter()
+        consume(worker)
+        worker.get_t1_buffer()
+        worker.get_d1_buffer()
+        worker.get_d2_buffer()
+        ticks.append(perf_counter() - t)
+        sleep(max(0.0, TICK - ticks[-1]))
+    sweeps = (worker.get_ser_error()[2] - sweep_start) / DURATION
+    served = sum(requests[:clients]) / DURATION
+    exit.set()
+    for poller in pollers:
+        poller.join()
+    worker.stop()
+    worker.wait_for_process()
+    return sweeps, 1e3 * np.median(ticks), 1e3 * np.percentile(ticks, 99), served, 1e3 * max(latencies)
+
+
+if __name__ == '__main__':
+    SerialProcess._is_port_available = lambda self, port: True
+    Constants.csv_export_path = os.path.join(tempfile.mkdtemp(), "")
+    Constants.api_enabled = True
+    Constants.api_port = PORT
+    device = PtyDevice()
+    # the table is printed at the end, after the logs of the processes
+    results = [(clients, rate) + run(device, clients, rate) for (clients, rate) in SCENARIOS]
+    device.close()
+    print("\n{:<9}{:>10}{:>10}{:>16}{:>16}{:>14}{:>20}".format(
+        "clients", "req/s", "sweeps/s", "tick p50 [ms]", "tick p99 [ms]", "answered/s", "max latency [ms]"))
+    for (clients, rate, sweeps, p50, p99, served, latency) in results:
+        print("{:<9}{:>10}{:>10.2f}{:>16.2f}{:>16.2f}{:>14.0f}{:>20.1f}".format(
+            clients, "-" if clients == 0 else "max" if rate is None else "{:.0f}".format(rate), sweeps, p50, p99, served, latency))
@@ -0,0 +1,177 @@
+"""
+Remote acquisition over TCP: a producer process delivers whole sweep
+records (amplitude and phase of SAMPLES points) to the subscriber of a node,
+a SocketProcess receives them through a local proxy and adds them to a
+counting parser. Halfway through, the proxy drops the connection and
+refuses new ones for OUTAGE seconds, as a network outage would.
+
+Reports the sweeps produced and received per second, the throughput of the
+record frames, the sweeps lost or received twice (both must be 0: the
+client resumes after the last sweep received and the node replays the
+following ones) and the largest delay of a sweep, which includes the
+outage.
+
+Run from the repository root:
+    python -m benchmarks.bench_remote_node
+"""
+
+import multiprocessing
+import socket
+import threading
+from time import sleep, time
+
+import numpy as np
+
+from openQCM.core.constants import Constants, DropPolicy
+from openQCM.core.sweepRecord import SweepRecord
+from openQCM.processors.Node import NodeProcess
+from openQCM.processors.Parser import Subscriber
+from openQCM.processors.Publisher import encode_record
+from openQCM.processors.SocketClient import SocketProcess
+
+DURATION = 6.0
+OUTAGE = 1.0
+SWEEP_RATES = (100.0, 1000.0)
+SAMPLES = 501
+NODE_PORT = Constants.SocketClient.port_default[0] + 100
+PROXY_PORT = NODE_PORT + 1
+
+
+class CountingParser(object):
+    # stands for the ParserProcess of the GUI: checks the order of the sweeps
+    def __init__(self):
+        self.received = multiprocessing.RawValue('L', 0)
+        self.duplicates = multiprocessing.RawValue('L', 0)
+        self.lost = multiprocessing.RawValue('L', 0)
+        self.last = multiprocessing.RawValue('l', -1)
+        self.delay = multiprocessing.RawValue('d', 0.0)
+
+    def add_sweep(self, record):
+        if record.sweep <= self.last.value:
+            self.duplicates.value += 1
+            return
+        self.lost.value += record.sweep - self.last.value - 1
+        self.last.value = record.sweep
+        self.received.value += 1
+        self.delay.value = max(self.delay.value, time() - record.timestamp / 1e6)
+
+    def close(self):
+        pass
+
+
+def sweep(k):
+    record = SweepRecord()
+    (record.sweep, record.timestamp) = (k, int(time() * 1e6))
+    (record.frequency, record.dissipation, record.temperature) = (5e6, 1e-5, 25.0)
+    record.amplitude = np.random.random(SAMPLES)
+    record.phase = np.random.random(SAMPLES)
+    return record
+
+
+def produce(subscriber, rate, exit, produced):
+    # acquisition side of the node: records delivered as the router does
+    k = 0
+    start = time()
+    while not exit.is_set():
+        subscriber.deliver(sweep(k))
+        k += 1
+        produced.value = k
+        sleep(max(0.0, start + k / rate - time()))
+
+
+def pipe(source, target):
+    try:
+        while True:
+            data = source.recv(1 << 16)
+            if not data:
+                break
+            target.sendall(data)
+    except OSError:
+        pass
+    for sock in (source, target):
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+class Proxy(object):
+    # network between the GUI and the node, which can be cut
+    def __init__(self):
+        self._connections = []
+        self._server = None
+
+    def up(self):
+        self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._server.bind(("127.0.0.1", PROXY_PORT))
+        self._server.listen(4)
+        threading.Thread(target=self._accept, args=(self._server,), daemon=True).start()
+
+    def down(self):
+        # shutdown wakes the thread waiting in accept, the port is free again
+        for sock in [self._server] + self._connections:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self._server.close()
+        self._connections = []
+
+    def _accept(self, server):
+        while True:
+            try:
+                client, address = server.accept()
+            except OSError:
+                return
+            node = socket.create_connection(("127.0.0.1", NODE_PORT))
+            self._connections += [client, node]
+            threading.Thread(target=pipe, args=(client, node), daemon=True).start()
+            threading.Thread(target=pipe, args=(node, client), daemon=True).start()
+
+
+def run(rate):
+    subscriber = Subscriber("remote", DropPolicy.lossless)
+    session = {'session': "bench", 'sweep': -1, 'overtones': [0], 'tracking': None}
+    node = NodeProcess(subscriber, session, "127.0.0.1", NODE_PORT)
+    node.start()
+    proxy = Proxy()
+    proxy.up()
+    parser = CountingParser()
+    client = SocketProcess(parser)
+    while not client.open(port="127.0.0.1", speed=PROXY_PORT):
+        sleep(0.1)
+    client.start()
+    exit = multiprocessing.Event()
+    produced = multiprocessing.RawValue('L', 0)
+    producer = multiprocessing.Process(target=produce, args=(subscriber, rate, exit, produced))
+    producer.start()
+    sleep(DURATION / 2)
+    proxy.down()
+    sleep(OUTAGE)
+    proxy.up()
+    sleep(DURATION / 2 - OUTAGE)
+    exit.set()
+    producer.join()
+    # the last sweeps in flight
+    deadline = time() + 10.0
+    while parser.received.value + parser.lost.value < produced.value and time() < deadline:
+        sleep(0.1)
+    client.stop()
+    client.join()
+    node.stop()
+    node.join()
+    proxy.down()
+    throughput = parser.received.value * len(encode_record(sweep(0))) / DURATION / 1e6
+    return (produced.value / DURATION, parser.received.value / DURATION, throughput,
+            parser.lost.value, parser.duplicates.value, 1e3 * parser.delay.value)
+
+
+if __name__ == '__main__':
+    # the table is printed at the end, after the logs of the processes
+    results = [(rate,) + run(rate) for rate in SWEEP_RATES]
+    print("\n{:<12}{:>14}{:>14}{:>10}{:>8}{:>12}{:>16}".format(
+        "rate [1/s]", "produced/s", "received/s", "MB/s", "lost", "duplicate", "max delay [ms]"))
+    for (rate, produced, received, throughput, lost, duplicates, delay) in results:
+        print("{:<12.0f}{:>14.0f}{:>14.0f}{:>10.2f}{:>8}{:>12}{:>16.0f}".format(
+            rate, produced, received, throughput, lost, duplicates, delay))
@@ -0,0 +1,78 @@
+"""
+CSV against the HDF5 session file for a long session (ROWS sweeps): cost
+of a row for the Worker (CSV row as written during the acquisition, and
+the append to the session file), size of the files, time to load them back
+in the Data View (DataViewerDialog) and error of the frequency read back.
+
+Requires h5py. Run from the repository root:
+    python -m benchmarks.bench_session_file
+"""
+
+import os
+import tempfile
+from time import perf_counter, time
+
+import numpy as np
+
+from openQCM.common.sessionFile import SessionWriter
+from openQCM.core.constants import Constants
+from openQCM.core.worker import Worker
+from openQCM.ui.mainWindow_ui import DataViewerDialog
+
+ROWS = 200000
+
+
+def sweeps():
+    # a day of sweeps at 2.3 sweeps/s: drift and noise on 5 MHz
+    t = (time() + np.arange(ROWS) * 0.43) * 1e6
+    relative = (t - t[0]) / 1e6
+    frequency = 5e6 - 1e-4 * relative + np.random.normal(0, 0.05, ROWS)
+    dissipation = 1e-5 + np.random.normal(0, 1e-8, ROWS)
+    temperature = 25.0 + np.random.normal(0, 0.01, ROWS)
+    return t.astype(np.int64), relative, temperature, frequency, dissipation
+
+
+def write_csv(path, values):
+    # the Worker writing its rows (session file disabled)
+    worker = Worker()
+    (worker._csv_filename, worker._overtone_name, worker._overtones) = ("bench", "fundamental", [0])
+    Constants.csv_export_path = path
+    worker._open_csv_file()
+    filename = worker._csv_file.name
+    start = perf_counter()
+    for (t, relative, temperature, frequency, dissipation) in zip(*values):
+        worker._write_csv_row(relative, temperature, frequency, dissipation, int(t))
+    worker._close_csv_file()
+    return 1e6 * (perf_counter() - start) / ROWS, filename
+
+
+def write_session(path, values):
+    filename = os.path.join(path, "bench.h5")
+    writer = SessionWriter(filename, {'overtone_name': "fundamental", 'overtones': [0]})
+    start = perf_counter()
+    for (t, relative, temperature, frequency, dissipation) in zip(*values):
+        writer.append(int(t), relative, temperature, frequency, dissipation)
+    writer.close()
+    return 1e6 * (perf_counter() - start) / ROWS, filename
+
+
+def load(loader, filename):
+    start = perf_counter()
+    (data, title) = loader(filename)
+    return perf_counter() - start, data
+
+
+if __name__ == '__main__':
+    path = os.path.join(tempfile.mkdtemp(), "")
+    values = sweeps()
+    results = []
+    for (name, write, loader) in (("CSV", write_csv, DataViewerDialog._load_csv),
+                                  ("HDF5", write_session, DataViewerDialog._load_session)):
+        (row_cost, filename) = write(path, values)
+        (load_time, data) = load(loader, filename)
+        error = np.max(np.abs(data[:, 1] - values[3]))
+        results.append((name, row_cost, os.path.getsize(filename) / 1e6, load_time, error))
+    print("\n{} rows".format(ROWS))
+    print("{:<8}{:>12}{:>12}{:>12}{:>22}".format("format", "row [us]", "size [MB]", "load [s]", "frequency error [Hz]"))
+    for (name, row_cost, size, load_time, error) in results:
+        print("{:<8}{:>12.2f}{:>12.2f}{:>12.3f}{:>22.2e}".format(name, row_cost, size, load_time, error))
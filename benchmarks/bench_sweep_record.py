@@ -0,0 +1,66 @@
+"""
+Cost per sweep of the messages from the acquisition process to the Worker:
+the former six messages on six queues (amplitude, phase, frequency,
+dissipation, temperature, errors) against one SweepRecord on one queue.
+A child process puts the messages, the parent drains the queues as the
+Worker does.
+
+Run from the repository root:
+    python -m benchmarks.bench_sweep_record
+"""
+
+import multiprocessing
+from time import perf_counter, time
+
+import numpy as np
+
+from openQCM.core.sweepRecord import SweepRecord
+
+SWEEPS = 2000
+SAMPLES = 501
+
+
+def _put_lists(queues, sweeps):
+    amplitude = np.zeros(SAMPLES)
+    for k in range(sweeps):
+        w = int(time() * 1e6)
+        queues[0].put(amplitude)
+        queues[1].put(amplitude)
+        queues[2].put([w, 5e6])
+        queues[3].put([w, 1e-5])
+        queues[4].put([w, 25.0])
+        queues[5].put([0, 0, k, 0, 0.25, 0.0])
+
+
+def _put_records(queues, sweeps):
+    amplitude = np.zeros(SAMPLES)
+    for k in range(sweeps):
+        record = SweepRecord()
+        record.sweep = k
+        record.timestamp = int(time() * 1e6)
+        (record.frequency, record.dissipation, record.temperature) = (5e6, 1e-5, 25.0)
+        record.sampling_time = 0.25
+        (record.amplitude, record.phase) = (amplitude, amplitude)
+        queues[0].put(record)
+
+
+def run(producer, n_queues, messages_per_sweep):
+    queues = [multiprocessing.Queue() for i in range(n_queues)]
+    process = multiprocessing.Process(target=producer, args=(queues, SWEEPS))
+    t = perf_counter()
+    process.start()
+    received = 0
+    while received < SWEEPS * messages_per_sweep:
+        for queue in queues:
+            while not queue.empty():
+                queue.get(False)
+                received += 1
+    elapsed = perf_counter() - t
+    process.join()
+    return 1e6 * elapsed / SWEEPS
+
+
+if __name__ == '__main__':
+    print("{:<16}{:>20}{:>20}".format("messages", "queues per sweep", "us per sweep"))
+    print("{:<16}{:>20}{:>20.1f}".format("lists", 6, run(_put_lists, 6, 6)))
+    print("{:<16}{:>20}{:>20.1f}".format("SweepRecord", 1, run(_put_records, 1, 1)))
@@ -0,0 +1,110 @@
+"""
+Throughput of the TCP publisher on localhost: a producer process delivers
+sweep records to the subscriber of the publisher as fast as it can, N
+reference clients read the stream and one more client never reads (a
+stalled dashboard). Run with and without the magnitude sweeps.
+
+Reports the sweeps delivered by the producer, the sweeps and bytes each
+reading client received per second (mean of the clients), the sweeps the
+router dropped because the publisher fell behind and the sweeps dropped for
+the stalled client (send buffer of CLIENT_BUFFER bytes per client).
+
+Run from the repository root:
+    python -m benchmarks.bench_tcp_publisher
+"""
+
+import multiprocessing
+from time import sleep
+
+import numpy as np
+
+from openQCM.core.constants import Constants, DropPolicy
+from openQCM.core.sweepRecord import SweepRecord
+from openQCM.processors.Parser import Subscriber
+from openQCM.processors.Publisher import FRAME_VALUES, PublisherClient, PublisherProcess, encode_sweep
+
+DURATION = 5.0
+CLIENTS = (1, 4, 16)
+SAMPLES = 501
+PORT = Constants.publisher_port + 100
+CLIENT_BUFFER = 1 << 16
+
+
+def sweep(k, magnitude):
+    record = SweepRecord()
+    (record.sweep, record.timestamp) = (k, k)
+    (record.frequency, record.dissipation, record.temperature) = (5e6, 1e-5, 25.0)
+    record.amplitude = np.random.random(SAMPLES) if magnitude else None
+    return record
+
+
+def produce(subscriber, magnitude, exit, produced):
+    # acquisition side: records delivered as the router does
+    record = sweep(0, magnitude)
+    while not exit.is_set():
+        subscriber.deliver(record)
+        record.sweep += 1
+        produced.value = record.sweep
+
+
+def connect():
+    # waits for the publisher to listen
+    while True:
+        try:
+            client = PublisherClient(port=PORT)
+            client.connect()
+            return client
+        except ConnectionRefusedError:
+            sleep(0.05)
+
+
+def receive(sweeps, connected, i):
+    # reference client: counts the sweeps received
+    client = connect()
+    connected[i] = 1
+    for frame in client.frames():
+        if frame['type'] == FRAME_VALUES:
+            sweeps[i] += 1
+
+
+def run(n, magnitude):
+    subscriber = Subscriber("tcp", DropPolicy.drop_oldest)
+    publisher = PublisherProcess(subscriber, port=PORT, magnitude=magnitude)
+    publisher.start()
+    sweeps = multiprocessing.RawArray('d', n)
+    connected = multiprocessing.RawArray('b', n)
+    clients = [multiprocessing.Process(target=receive, args=(sweeps, connected, i)) for i in range(n)]
+    for client in clients:
+        client.start()
+    # stalled client: connected, never reads
+    stalled = connect()
+    while not all(connected):
+        sleep(0.05)
+    exit = multiprocessing.Event()
+    produced = multiprocessing.RawValue('L', 0)
+    producer = multiprocessing.Process(target=produce, args=(subscriber, magnitude, exit, produced))
+    start = list(sweeps)
+    producer.start()
+    sleep(DURATION)
+    exit.set()
+    producer.join()
+    rate = np.mean(np.array(sweeps) - start) / DURATION
+    throughput = rate * len(encode_sweep(sweep(0, magnitude), magnitude)) / 1e6
+    publisher.stop()
+    publisher.join()
+    for client in clients:
+        client.terminate()
+        client.join()
+    stalled.close()
+    return produced.value / DURATION, rate, throughput, subscriber.get_stats()[1], publisher.get_dropped()
+
+
+if __name__ == '__main__':
+    Constants.publisher_client_buffer = CLIENT_BUFFER
+    # the table is printed at the end, after the logs of the processes
+    results = [(n, magnitude) + run(n, magnitude) for magnitude in (False, True) for n in CLIENTS]
+    print("\n{:<9}{:<11}{:>14}{:>22}{:>20}{:>16}{:>16}".format(
+        "clients", "magnitude", "produced/s", "sweeps/s per client", "MB/s per client", "router drops", "stalled drops"))
+    for (n, magnitude, produced, rate, throughput, router, stalled) in results:
+        print("{:<9}{:<11}{:>14.0f}{:>22.0f}{:>20.2f}{:>16}{:>16}".format(
+            n, str(magnitude), produced, rate, throughput, router, stalled))
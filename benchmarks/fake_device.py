@@ -0,0 +1,123 @@
+"""
+Simulated openQCM Q-1 devices: sweep commands "start;stop;step\\n" are
+answered after a simulated acquisition time with the raw amplitude/phase
+samples, the temperature and the end-of-sweep marker "s".
+
+FakeDevice has the interface of serial.Serial used by the acquisition
+process; PtyDevice serves a pseudo-terminal (POSIX), so the acquisition
+process opens a real serial port.
+
+The resonance is a Lorentzian on top of the calibration baseline, so the
+sweeps go through the same processing as the real ones.
+"""
+
+import os
+import threading
+from time import sleep, time
+
+import numpy as np
+
+from openQCM.core.baseline import BaselineService
+from openQCM.processors.Serial import SerialProcess
+
+# fixed overhead and acquisition time per sample of a sweep (s)
+SWEEP_OVERHEAD = 10e-3
+SAMPLE_TIME = 0.5e-3
+BANDWIDTH = 400.0
+NOISE = 0.02
+ADC = 3.3 / 8192
+
+
+class _Sweeps:
+    # replies of the device to the sweep commands
+
+    def __init__(self):
+        # calibration baseline and resonances of the installed sensor
+        process = SerialProcess.__new__(SerialProcess)
+        self._baseline = BaselineService(*process.load_calibration_file())
+        self._peaks = SerialProcess.load_frequencies_file()
+        self._rng = np.random.default_rng()
+
+    def reply(self, command):
+        # reply to a sweep command and acquisition time (s)
+        (start, stop, step) = [float(v) for v in command.split(';')]
+        n = int(round((stop - start) / step)) + 1
+        freq = start + np.arange(n) * step
+        f0 = min(self._peaks, key=lambda f: abs(f - (start + stop) / 2)) + 300.0
+        u = (freq - f0) / (BANDWIDTH / 2 / np.sqrt(1 / 0.707 - 1))
+        (mag_base, phase_base) = self._baseline.get(freq)
+        mag = 6 / (1 + u * u) + mag_base + self._rng.normal(0, NOISE, n)
+        phase = -np.degrees(np.arctan(u)) + phase_base + self._rng.normal(0, NOISE, n)
+        raw_mag = (mag * 0.03 + 0.9) * 2 / ADC
+        raw_phase = (phase * 0.01 + 0.9) * 1.5 / ADC
+        lines = ''.join('{:.0f};{:.0f}\n'.format(m, p) for (m, p) in zip(raw_mag, raw_phase))
+        return (lines + '25.0\ns').encode(), SWEEP_OVERHEAD + n * SAMPLE_TIME
+
+
+class FakeDevice:
+
+    def __init__(self, *args, **kwargs):
+        self.port = kwargs.get('port')
+        self.baudrate = self.stopbits = self.bytesize = None
+        self.timeout = self.writetimeout = None
+        self.sweeps = 0
+        self._open = False
+        self._reply = b''
+        self._ready = 0.0
+        self._device = None
+
+    def isOpen(self):
+        return self._open
+
+    def open(self):
+        self._device = _Sweeps()
+        self._open = True
+
+    def close(self):
+        self._open = False
+
+    def write(self, data):
+        (self._reply, duration) = self._device.reply(data.decode())
+        self._ready = time() + duration
+        self.sweeps += 1
+
+    def inWaiting(self):
+        # nothing to read until the sweep is acquired
+        return len(self._reply) if time() >= self._ready else 0
+
+    def read(self, size=1):
+        (data, self._reply) = (self._reply[:size], self._reply[size:])
+        return data
+
+
+class PtyDevice:
+
+    def __init__(self):
+        import tty
+        (self._master, slave) = os.openpty()
+        tty.setraw(slave)
+        self.port = os.ttyname(slave)
+        self._slave = slave
+        self.sweeps = 0
+        self._device = _Sweeps()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def _serve(self):
+        command = b''
+        while True:
+            try:
+                command += os.read(self._master, 64)
+            except OSError:
+                return
+            while b'\n' in command:
+                (line, command) = command.split(b'\n', 1)
+                (reply, duration) = self._device.reply(line.decode())
+                sleep(duration)
+                while reply:
+                    reply = reply[os.write(self._master, reply):]
+                self.sweeps += 1
+
+    def close(self):
+        os.close(self._master)
+        os.close(self._slave)
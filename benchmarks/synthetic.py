@@ -0,0 +1,32 @@
+"""
+Synthetic openQCM sweeps for the benchmarks.
+
+The sweeps mimic the baseline corrected amplitude (dB) and phase (deg) of a
+quartz crystal resonance acquired by the openQCM Q-1 device.
+"""
+
+import numpy as np
+
+
+def sweep(f0=5.0e6, center=None, bandwidth=400.0, left=15000, right=5000, samples=501,
+          amplitude=6.0, noise=0.02, seed=None):
+    """
+    :param f0: Resonance frequency (Hz) :type f0: float.
+    :param center: Reference frequency of the sweep window, default f0 (Hz) :type center: float.
+    :param bandwidth: Bandwidth at 70.7% of the peak (Hz) :type bandwidth: float.
+    :param left: Left interval of the sweep window (Hz) :type left: float.
+    :param right: Right interval of the sweep window (Hz) :type right: float.
+    :param samples: Number of samples :type samples: int.
+    :param amplitude: Peak height (dB) :type amplitude: float.
+    :param noise: Standard deviation of the additive noise (dB) :type noise: float.
+    :return: frequencies, amplitude and phase of the sweep :rtype: tuple.
+    """
+    rng = np.random.default_rng(seed)
+    center = f0 if center is None else center
+    freq = np.linspace(center - left, center + right, samples)
+    # half width of a Lorentzian whose 70.7% level is at +-bandwidth/2
+    gamma = bandwidth / 2 / np.sqrt(1 / 0.707 - 1)
+    u = (freq - f0) / gamma
+    mag = amplitude / (1 + u * u) + rng.normal(0, noise, samples)
+    phase = -np.degrees(np.arctan(u)) + rng.normal(0, noise, samples)
+    return freq, mag, phase
@@ -6,6 +6,7 @@ from openQCM.common.architecture import Architecture,OSType
 from openQCM.common.arguments import Arguments
 from openQCM.common.logger import Logger as Log
 from openQCM.common.resources import get_resource_path
+from openQCM.common import sessionJournal, sessionCatalog
 from openQCM.core.constants import MinimalPython, Constants
 from openQCM.ui import mainWindow
 
@@ -73,6 +74,9 @@ class OPENQCM:
             print('')
             print(TAG,"Application started")
             Log.i(TAG, "Application started")
+            # sessions interrupted by a crash: files written again from their journal
+            sessionJournal.recover_sessions()
+            sessionCatalog.mark_interrupted_sessions()
             win = mainWindow.MainWindow(samples=self._args.get_user_samples())
             #win.setWindowTitle("{} - {}".format(Constants.app_title, Constants.app_version))
             #win.move(500, 20) #GUI position (x,y) on the screen 
@@ -0,0 +1,173 @@
+import datetime
+from time import strftime, localtime, time
+
+import numpy as np
+
+from openQCM.core.constants import Constants
+
+TAG = ""#"[CSVBlockWriter]"
+
+
+###############################################################################
+# Formatting of whole columns, as the rows written by csv.writer. A column is
+# a matrix of ASCII codes, one row per line, padded with zeros: the file text
+# is the matrices side by side without the zeros.
+###############################################################################
+COMMA = ord(",")
+POWERS = 10 ** np.arange(12, -1, -1, dtype=np.int64)
+
+
+def _bytes(strings, width):
+    # strings (ASCII) as a matrix of codes, padded with zeros
+    return np.asarray(strings, dtype='S{}'.format(width)).reshape(-1).view(np.uint8).reshape(-1, width)
+
+
+def _strings(values):
+    # float(value) written by csv.writer: shortest repr of the float
+    values = values.astype('S32')
+    return _bytes(values, values.dtype.itemsize)
+
+
+def _decimals(values):
+    """
+    Same text as str(float("{0:.2f}".format(value))) for each value: two
+    decimals, trailing zero removed ("12.3", "25.0", "-0.0"). Values too
+    close to a rounding tie for the float product, or not finite, or of 1e13
+    or more, are formatted one by one.
+    :param values: Values :type values: float array.
+    :return: text of the values :rtype: uint8 matrix.
+    """
+    magnitude = np.abs(values) * 100
+    with np.errstate(invalid='ignore'):
+        cents = np.floor(magnitude + 0.5)
+        tie = np.abs(magnitude - np.floor(magnitude) - 0.5) <= 4 * np.finfo(float).eps * magnitude + 1e-9
+        exact = np.isfinite(values) & (magnitude < 1e15) & ~tie
+    cents = np.where(exact, cents, 0).astype(np.int64)
+    units = cents // 100
+    fraction = cents % 100
+    others = [str(float("{0:.2f}".format(values[i]))) for i in np.flatnonzero(~exact)]
+    # sign, 13 digits (leading zeros dropped), point, 2 decimals (a trailing zero dropped)
+    text = np.zeros((len(values), max([17] + [len(other) for other in others])), dtype=np.uint8)
+    text[:, 1:14] = (units[:, None] // POWERS) % 10 + ord("0")
+    text[:, 1:13][units[:, None] < POWERS[:-1]] = 0
+    text[:, 0] = np.where(np.signbit(values), ord("-"), 0)
+    text[:, 14] = ord(".")
+    text[:, 15] = fraction // 10 + ord("0")
+    text[:, 16] = np.where(fraction % 10 == 0, 0, fraction % 10 + ord("0"))
+    if others:
+        text[~exact] = _bytes(others, text.shape[1])
+    return text
+
+
+###############################################################################
+# Block CSV writer: rows buffered in arrays, formatted and written per block
+###############################################################################
+class CSVBlockWriter:
+    """
+    Writes the rows of the CSV data file (Date, Time, Relative_time,
+    Temperature, Resonance_Frequency, Dissipation[, Harmonic]) with the
+    exact text of csv.writer. The rows are kept in preallocated arrays and
+    a block is formatted column by column, then written with one write()
+    when full or Constants.csv_flush_interval seconds after its first row.
+    """
+
+    ###########################################################################
+    # Buffers of a block
+    ###########################################################################
+    def __init__(self, file, harmonic=False, rows=None):
+        """
+        :param file: Text file opened with newline='' :type file: file.
+        :param harmonic: True to write the Harmonic column :type harmonic: bool.
+        :param rows: Rows per block (default Constants.csv_block_rows) :type rows: int.
+        """
+        self._file = file
+        self._harmonic = harmonic
+        rows = rows or Constants.csv_block_rows
+        self._timestamp = np.empty(rows, dtype=np.int64)
+        self._values = np.empty((4, rows))
+        self._harmonics = np.empty(rows, dtype=np.int64)
+        self._newline = np.tile(np.frombuffer(b"\r\n", dtype=np.uint8), (rows, 1))
+        self._rows = 0
+        self._block_time = 0
+        self.written = 0
+        self.size = 0
+
+    ###########################################################################
+    # Adds a row, writes the block when full
+    ###########################################################################
+    def append(self, relative_time, temperature, frequency, dissipation, acq_timestamp_us=None, harmonic=None):
+        """
+        :param relative_time: Time from the start of the session (s) :type relative_time: float.
+        :param acq_timestamp_us: Acquisition timestamp in microseconds since epoch, write time if None :type acq_timestamp_us: int.
+        :param harmonic: Harmonic number, multi-overtone mode only (1, 3, 5...) :type harmonic: int.
+        :return: True if a block was written :rtype: bool.
+        """
+        i = self._rows
+        if i == 0:
+            self._block_time = time()
+        if acq_timestamp_us is None:
+            # write time, with no milliseconds: formatted now, as a marker
+            self._timestamp[i] = -int(time())
+        else:
+            self._timestamp[i] = acq_timestamp_us
+        values = self._values
+        values[0, i] = relative_time
+        values[1, i] = temperature
+        values[2, i] = frequency
+        values[3, i] = dissipation
+        if self._harmonic:
+            self._harmonics[i] = harmonic
+        self._rows = i + 1
+        if self._rows == len(self._timestamp) or time() - self._block_time > Constants.csv_flush_interval:
+            self.flush()
+            return True
+        return False
+
+    ###########################################################################
+    # Formats and writes the buffered rows
+    ###########################################################################
+    def flush(self):
+        rows = self._rows
+        if rows == 0:
+            return
+        comma = np.full((rows, 1), COMMA, dtype=np.uint8)
+        columns = [self._date_time(self._timestamp[:rows])]
+        # relative time, temperature and frequency formatted together
+        decimals = _decimals(self._values[:3, :rows].ravel()).reshape(3, rows, -1)
+        for k in range(3):
+            columns += [comma, decimals[k]]
+        columns += [comma, _strings(self._values[3, :rows])]
+        if self._harmonic:
+            columns += [comma, _bytes(self._harmonics[:rows].astype('S3'), 3)]
+        columns.append(self._newline[:rows])
+        text = np.hstack(columns)
+        text = text[text != 0]
+        self._file.write(text.tobytes().decode("ascii"))
+        self._rows = 0
+        self.size += len(text)
+        self.written += rows
+
+    ########################
+    @staticmethod
+    def _date_time(timestamps):
+        """
+        Local date and time (milliseconds truncated) of the acquisition
+        timestamps, as datetime.fromtimestamp. The UTC offset is computed per
+        block, and per row if it changes within the block (daylight saving).
+        :param timestamps: Microseconds since epoch, -seconds for the write time :type timestamps: int array.
+        :return: dates and times (%Y-%m-%d,%H:%M:%S.mmm) :rtype: uint8 matrix.
+        """
+        seconds = np.floor_divide(timestamps, 1000000)
+        offsets = [datetime.datetime.fromtimestamp(s).astimezone().utcoffset() for s in (seconds[0], seconds[-1])]
+        if offsets[0] == offsets[-1]:
+            shift = np.full(len(timestamps), int(offsets[0].total_seconds()) * 1000000, dtype=np.int64)
+        else:
+            shift = np.array([int(datetime.datetime.fromtimestamp(s).astimezone().utcoffset().total_seconds()) * 1000000
+                              for s in seconds], dtype=np.int64)
+        local = (timestamps + shift).astype('datetime64[us]')
+        text = _bytes(np.datetime_as_string(local, unit='ms'), 23).copy()
+        text[:, 10] = COMMA
+        # rows without acquisition timestamp: write time, no milliseconds
+        for i in np.flatnonzero(timestamps < 0):
+            text[i] = _bytes(strftime("%Y-%m-%d,%H:%M:%S", localtime(-timestamps[i])), 23)
+        return text
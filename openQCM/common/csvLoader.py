@@ -0,0 +1,146 @@
+import io
+import os
+import zlib
+
+import numpy as np
+
+from openQCM.core.constants import Constants
+
+TAG = ""#"[CSVLoader]"
+
+# Relative_time, Resonance_Frequency, Dissipation (and Harmonic) of the data file
+COLUMNS = (2, 4, 5)
+HARMONIC_COLUMN = 6
+# bytes before the end of the cached rows, checked to reuse the cache
+_CHECK_BYTES = 4096
+
+
+###############################################################################
+# Parses a block of complete CSV lines
+###############################################################################
+def parse(block, harmonic):
+    """
+    Columns of the lines at once (C parser), line by line if a line is not
+    valid (skipped, as a row torn by a crash).
+    :param block: Complete lines, without header :type block: bytes.
+    :param harmonic: True if the file has the Harmonic column :type harmonic: bool.
+    :return: relative time, frequency, dissipation (and harmonic) :rtype: float array (N, 3 or 4).
+    """
+    columns = COLUMNS + (HARMONIC_COLUMN,) if harmonic else COLUMNS
+    try:
+        return np.loadtxt(io.BytesIO(block), delimiter=",", usecols=columns, comments=None, ndmin=2)
+    except ValueError:
+        rows = []
+        for line in block.split(b"\n"):
+            fields = line.split(b",")
+            try:
+                rows.append([float(fields[k]) for k in columns])
+            except (ValueError, IndexError):
+                continue
+        return np.array(rows, dtype=float).reshape(-1, len(columns))
+
+
+###############################################################################
+# Loads a data file in chunks, from its cache if the file did not change
+###############################################################################
+class CSVLoader:
+    """
+    Reads the relative time, resonance frequency and dissipation of a data
+    file in chunks of Constants.viewer_chunk_bytes: each chunk is parsed at
+    once and handed to the caller, so the rows can be shown as they come.
+    The rows are saved in a binary cache next to the file: opened again,
+    the cached rows are read at once and only the rows appended since (a
+    session still acquired) are parsed. Multi-overtone files: the rows of
+    the harmonic of the first row.
+    """
+
+    ###########################################################################
+    # File and cache
+    ###########################################################################
+    def __init__(self, path):
+        """
+        :param path: Full path of the CSV file :type path: str.
+        """
+        self.path = path
+        self.cache = "{}.{}".format(path, Constants.viewer_cache_extension)
+        self.size = os.path.getsize(path)
+        self.cached = 0
+        self._harmonic = None
+
+    ###########################################################################
+    # Rows of the file, a chunk at a time
+    ###########################################################################
+    def chunks(self):
+        """
+        :return: rows (relative time, frequency, dissipation) and bytes read so far, per chunk :rtype: generator of tuple.
+        """
+        rows = []
+        with open(self.path, 'rb') as f:
+            header = f.readline()
+            harmonic = b"Harmonic" in header
+            offset = f.tell()
+            cached = self._read_cache(f)
+            if cached is not None:
+                (data, offset, self._harmonic) = cached
+                self.cached = offset
+                rows.append(data)
+                yield data, offset
+            f.seek(offset)
+            rest = b""
+            while True:
+                block = f.read(Constants.viewer_chunk_bytes)
+                if not block:
+                    break
+                block = rest + block
+                end = block.rfind(b"\n") + 1
+                (block, rest) = (block[:end], block[end:])
+                if not block:
+                    continue
+                data = self._select(parse(block, harmonic), harmonic)
+                offset += end
+                rows.append(data)
+                yield data, offset
+        # torn last line (session still written): parsed again next time
+        data = np.concatenate(rows) if rows else np.empty((0, 3))
+        if offset > self.cached:
+            self._write_cache(data, offset)
+
+    ########################
+    def _select(self, data, harmonic):
+        # MULTI-OVERTONE: rows of one harmonic
+        if not harmonic:
+            return data
+        if self._harmonic is None and len(data):
+            self._harmonic = data[0, 3]
+        return data[data[:, 3] == self._harmonic, :3]
+
+    ###########################################################################
+    # Cache: rows, offset of the next line, end of the cached bytes
+    ###########################################################################
+    def _read_cache(self, f):
+        #:return: rows, offset and harmonic, None if the cache is missing or the file changed :rtype: tuple.
+        try:
+            with np.load(self.cache) as cache:
+                (data, offset, check, harmonic) = (cache['data'], int(cache['offset']), int(cache['check']), float(cache['harmonic']))
+        except (OSError, KeyError, ValueError):
+            return None
+        if offset > self.size:
+            return None
+        f.seek(max(0, offset - _CHECK_BYTES))
+        if zlib.crc32(f.read(offset - max(0, offset - _CHECK_BYTES))) != check:
+            return None
+        return data, offset, None if np.isnan(harmonic) else harmonic
+
+    ########################
+    def _write_cache(self, data, offset):
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(max(0, offset - _CHECK_BYTES))
+                check = zlib.crc32(f.read(offset - max(0, offset - _CHECK_BYTES)))
+            temporary = "{}.tmp".format(self.cache)
+            with open(temporary, 'wb') as f:
+                np.savez(f, data=data, offset=offset, check=check,
+                         harmonic=np.nan if self._harmonic is None else self._harmonic)
+            os.replace(temporary, self.cache)
+        except OSError:
+            pass  # read-only folder: no cache
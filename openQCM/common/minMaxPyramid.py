@@ -0,0 +1,195 @@
+import threading
+
+import numpy as np
+
+from openQCM.core.constants import Constants
+
+TAG = ""#"[MinMaxPyramid]"
+
+
+###############################################################################
+# Rows of one level: capacity doubled as the rows are appended
+###############################################################################
+class _Level:
+    def __init__(self, width):
+        self.data = np.empty((1024, width))
+        self.length = 0
+
+
+###############################################################################
+# Level of detail of a long series: min/max of the samples, level by level
+###############################################################################
+class MinMaxPyramid:
+    """
+    Time and values of a series (level 0) and, for each level k, the minimum
+    and maximum of the values over buckets of factor**k samples. A query
+    returns the visible time span at screen resolution: the coarsest level
+    with about one bucket per pixel (min and max of each bucket, so peaks
+    are kept), the samples themselves once zoomed in enough.
+    Rows are appended by one thread (the loader) while another one (the
+    GUI) queries: the levels are only written past their committed length
+    and the lengths are committed under a lock.
+    """
+
+    ###########################################################################
+    # Empty pyramid
+    ###########################################################################
+    def __init__(self, columns=1, factor=None):
+        """
+        :param columns: Number of values of each sample (after the time) :type columns: int.
+        :param factor: Samples per bucket of the next level (default Constants.viewer_lod_factor) :type factor: int.
+        """
+        self._columns = columns
+        self._factor = factor or Constants.viewer_lod_factor
+        self._lock = threading.Lock()
+        # level 0: time, values - level k: time of the first sample, min of the values, max of the values
+        self._levels = [_Level(1 + columns)]
+
+    def __len__(self):
+        return self._levels[0].length
+
+    ###########################################################################
+    # Appends samples, reduces the buckets they complete
+    ###########################################################################
+    def append(self, rows):
+        """
+        :param rows: Time (increasing) and values of the samples :type rows: float array (N, 1 + columns) or wider.
+        """
+        rows = np.asarray(rows, dtype=float)[:, :1 + self._columns]
+        (new, k) = ([rows], 1)
+        while len(new[-1]):
+            # rows of the level below not reduced yet (less than a bucket) and the new ones
+            pending = new[-1]
+            if k - 1 < len(self._levels):
+                (lower, reduced) = (self._levels[k - 1], self._levels[k].length if k < len(self._levels) else 0)
+                pending = np.concatenate((lower.data[reduced * self._factor:lower.length], pending))
+            complete = len(pending) // self._factor * self._factor
+            # level 0: values - level k: min then max of the values
+            (low, high) = (slice(1, 1 + self._columns), slice(1 if k == 1 else 1 + self._columns, None))
+            # min/max of the buckets element-wise, a sample of the bucket at a time (faster than along an axis)
+            buckets = pending[:complete:self._factor]
+            (minimum, maximum) = (buckets[:, low].copy(), buckets[:, high].copy())
+            for j in range(1, self._factor):
+                np.minimum(minimum, pending[j:complete:self._factor, low], out=minimum)
+                np.maximum(maximum, pending[j:complete:self._factor, high], out=maximum)
+            new.append(np.column_stack((buckets[:, 0], minimum, maximum)))
+            k += 1
+        new.pop()
+        # rows written past the committed lengths (readers see the old ones)
+        (arrays, levels) = ([], list(self._levels))
+        for (k, rows) in enumerate(new):
+            if k == len(levels):
+                levels.append(_Level(1 + 2 * self._columns))
+            level = levels[k]
+            data = level.data
+            if level.length + len(rows) > len(data):
+                data = np.empty((max(2 * len(data), level.length + len(rows)), data.shape[1]))
+                data[:level.length] = level.data[:level.length]
+            data[level.length:level.length + len(rows)] = rows
+            arrays.append(data)
+        with self._lock:
+            for (k, rows) in enumerate(new):
+                levels[k].data = arrays[k]
+                levels[k].length += len(rows)
+            self._levels = levels
+
+    ###########################################################################
+    # Visible span at screen resolution
+    ###########################################################################
+    def query(self, start, stop, pixels):
+        """
+        :param start: Start of the visible span (time) :type start: float.
+        :param stop: End of the visible span (time) :type stop: float.
+        :param pixels: Width of the plot in pixels :type pixels: int.
+        :return: time and values to draw, one sample before and after the span included :rtype: tuple of float arrays (M,) and (M, columns).
+        """
+        with self._lock:
+            levels = [(level.data, level.length) for level in self._levels]
+        (data, length) = levels[0]
+        first = max(0, int(np.searchsorted(data[:length, 0], start, side='right')) - 1)
+        last = min(length, int(np.searchsorted(data[:length, 0], stop, side='left')) + 1)
+        visible = max(0, last - first)
+        pixels = max(1, int(pixels))
+        if visible <= Constants.viewer_lod_points * pixels or len(levels) == 1:
+            return data[first:last, 0], data[first:last, 1:]
+        # coarsest level with at least a bucket per pixel
+        k = 1
+        while k + 1 < len(levels) and visible // self._factor ** (k + 1) >= pixels:
+            k += 1
+        size = self._factor ** k
+        (buckets, count) = levels[k]
+        buckets = buckets[first // size:min(count, -(-last // size))]
+        # samples after the last complete bucket of the level: one more bucket
+        tail = data[max(first, count * size):last]
+        (time, low, high) = (buckets[:, 0], buckets[:, 1:1 + self._columns], buckets[:, 1 + self._columns:])
+        if len(tail):
+            time = np.append(time, tail[0, 0])
+            low = np.vstack((low, tail[:, 1:].min(axis=0)))
+            high = np.vstack((high, tail[:, 1:].max(axis=0)))
+        values = np.empty((2 * len(time), self._columns))
+        (values[0::2], values[1::2]) = (low, high)
+        return np.repeat(time, 2), values
+
+    ###########################################################################
+    # Extent and samples
+    ###########################################################################
+    def span(self):
+        """
+        :return: time of the first and last samples, None if empty :rtype: tuple.
+        """
+        with self._lock:
+            (data, length) = (self._levels[0].data, self._levels[0].length)
+        return (data[0, 0], data[length - 1, 0]) if length else None
+
+    def samples(self):
+        """
+        :return: time and values of all samples (copy) :rtype: float array (N, 1 + columns).
+        """
+        with self._lock:
+            (data, length) = (self._levels[0].data, self._levels[0].length)
+        return data[:length].copy()
+
+    def value_at(self, time):
+        """
+        :param time: Time (first sample if before it) :type time: float.
+        :return: values of the last sample at or before the time, None if empty :rtype: float array (columns,).
+        """
+        with self._lock:
+            (data, length) = (self._levels[0].data, self._levels[0].length)
+        if not length:
+            return None
+        return data[max(0, int(np.searchsorted(data[:length, 0], time, side='right')) - 1), 1:].copy()
+
+    def overview(self, buckets):
+        """
+        :param buckets: Buckets at most :type buckets: int.
+        :return: time, min and max of the finest level with at most buckets buckets (copies) :rtype: tuple of float arrays.
+        """
+        with self._lock:
+            levels = [(level.data, level.length) for level in self._levels]
+        for (k, (data, length)) in enumerate(levels):
+            if length <= buckets or k == len(levels) - 1:
+                break
+        (time, low, high) = (data[:length, 0], data[:length, 1:1 + self._columns], data[:length, 1 + self._columns:])
+        if k == 0:
+            high = low
+        # samples after the last complete bucket of the level: one more bucket
+        tail = levels[0][0][length * self._factor ** k:levels[0][1]]
+        if k and len(tail):
+            (time, low, high) = (np.append(time, tail[0, 0]), np.vstack((low, tail[:, 1:].min(axis=0))),
+                                 np.vstack((high, tail[:, 1:].max(axis=0))))
+        return time.copy(), low.copy(), high.copy()
+
+    def compact(self):
+        # frees the capacity of the levels past their rows (once all rows are appended)
+        with self._lock:
+            for level in self._levels:
+                level.data = level.data[:max(1, level.length)].copy()
+
+    def nbytes(self):
+        """
+        :return: memory of the levels (allocated) :rtype: int.
+        """
+        with self._lock:
+            return sum(level.data.nbytes for level in self._levels)
+
@@ -0,0 +1,283 @@
+import ctypes
+import json
+import os
+import socket
+import sqlite3
+import sys
+from time import time
+
+from openQCM.core.constants import Constants
+from openQCM.common.fileManager import FileManager
+from openQCM.common.logger import Logger as Log
+
+TAG = ""#"[Catalog]"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    session TEXT NOT NULL,
+    device INTEGER,
+    port TEXT,
+    source TEXT,
+    status TEXT NOT NULL,
+    host TEXT,
+    pid INTEGER,
+    started REAL NOT NULL,
+    stopped REAL,
+    duration REAL,
+    overtone_name TEXT,
+    overtone_value REAL,
+    overtones TEXT,
+    window_start REAL,
+    window_stop REAL,
+    samples INTEGER,
+    calibration_file TEXT,
+    estimator TEXT,
+    sg_window_size INTEGER,
+    spline_points INTEGER,
+    spline_factor REAL,
+    sweeps INTEGER,
+    frequency_min REAL,
+    frequency_max REAL,
+    dissipation_min REAL,
+    dissipation_max REAL,
+    cutoff_errors_left INTEGER,
+    cutoff_errors_right INTEGER,
+    usb_errors INTEGER,
+    tracking_events INTEGER,
+    settings TEXT);
+CREATE INDEX IF NOT EXISTS sessions_started ON sessions (started);
+CREATE INDEX IF NOT EXISTS sessions_session ON sessions (session);
+CREATE INDEX IF NOT EXISTS sessions_overtone ON sessions (overtone_value, started);
+CREATE TABLE IF NOT EXISTS files (
+    session_id INTEGER NOT NULL REFERENCES sessions (id),
+    segment INTEGER,
+    kind TEXT NOT NULL,
+    path TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS files_session ON files (session_id);
+CREATE TABLE IF NOT EXISTS tracking (
+    session_id INTEGER NOT NULL REFERENCES sessions (id),
+    time REAL,
+    start REAL,
+    stop REAL,
+    reference REAL,
+    count INTEGER);
+CREATE INDEX IF NOT EXISTS tracking_session ON tracking (session_id);
+"""
+
+# session settings (Worker metadata) stored in their own column
+_SETTINGS = {'overtone_name': 'overtone_name', 'overtone_value': 'overtone_value', 'start': 'window_start',
+             'stop': 'window_stop', 'samples': 'samples', 'calibration_file': 'calibration_file',
+             'estimator': 'estimator', 'SG_window_size': 'sg_window_size', 'spline_points': 'spline_points',
+             'spline_factor': 'spline_factor'}
+
+# columns added after the first catalogs (added to an existing catalog when opened)
+_ADDED = (("host", "TEXT"), ("pid", "INTEGER"))
+
+
+###############################################################################
+# Catalog of the sessions of the data folder (SQLite)
+###############################################################################
+class SessionCatalog:
+    """
+    One row per session and device: settings, status (running, complete,
+    interrupted), summary statistics written at STOP, the files of each
+    segment and the auto-tracking events. A running session records the
+    host and the process recording it (its owner): only sessions whose
+    owner is gone are interrupted. A connection per call (short
+    transactions, WAL journal): the GUI, the Workers of the devices and any
+    reader may use the catalog at the same time.
+    """
+
+    ###########################################################################
+    # Opens (creates) the catalog
+    ###########################################################################
+    def __init__(self, path=None):
+        """
+        :param path: Full path of the catalog (default in Constants.csv_export_path) :type path: str.
+        """
+        self.path = path or FileManager.create_full_path(Constants.catalog_filename, extension=Constants.catalog_extension,
+                                                         path=Constants.csv_export_path)
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+            existing = {row['name'] for row in connection.execute("PRAGMA table_info(sessions)")}
+            for (column, kind) in _ADDED:
+                if column not in existing:
+                    try:
+                        connection.execute("ALTER TABLE sessions ADD COLUMN {} {}".format(column, kind))
+                    except sqlite3.OperationalError:
+                        # added meanwhile by another instance
+                        pass
+
+    ########################
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=Constants.catalog_timeout)
+        connection.row_factory = sqlite3.Row
+        return _Connection(connection)
+
+    ###########################################################################
+    # Worker: START, files of each segment, STOP
+    ###########################################################################
+    def begin(self, info, settings):
+        """
+        :param info: Session, device, port and source (Worker.get_session_info) :type info: dict.
+        :param settings: Settings of the session (JSON-serializable) :type settings: dict.
+        :return: id of the session :rtype: int.
+        """
+        columns = {'session': info['session'], 'device': info['device'], 'port': info['port'],
+                   'source': info['source'], 'status': "running", 'host': socket.gethostname(),
+                   'pid': os.getpid(), 'started': time(),
+                   'overtones': json.dumps(info['overtones']), 'settings': json.dumps(settings)}
+        for (key, column) in _SETTINGS.items():
+            if key in settings:
+                columns[column] = settings[key]
+        with self._connect() as connection:
+            cursor = connection.execute("INSERT INTO sessions ({}) VALUES ({})".format(
+                ", ".join(columns), ", ".join("?" * len(columns))), tuple(columns.values()))
+            return cursor.lastrowid
+
+    ########################
+    def add_files(self, session_id, segment, files):
+        """
+        :param session_id: id of the session :type session_id: int.
+        :param segment: Segment number, from 1 (None for the files of the session) :type segment: int.
+        :param files: Full path of each kind of file (csv, session_file, sweeps, manifest), None if not written :type files: dict.
+        """
+        with self._connect() as connection:
+            connection.executemany("INSERT INTO files (session_id, segment, kind, path) VALUES (?, ?, ?, ?)",
+                                   [(session_id, segment, kind, path) for (kind, path) in files.items() if path])
+
+    ########################
+    def finish(self, session_id, summary, tracking=()):
+        """
+        :param session_id: id of the session :type session_id: int.
+        :param summary: sweeps, frequency/dissipation ranges, error counts (column: value) :type summary: dict.
+        :param tracking: Auto-tracking events (time, start, stop, reference, count) :type tracking: list.
+        """
+        with self._connect() as connection:
+            (started,) = connection.execute("SELECT started FROM sessions WHERE id = ?", (session_id,)).fetchone()
+            stopped = time()
+            columns = dict(summary, status="complete", stopped=stopped, duration=stopped - started,
+                           tracking_events=len(tracking))
+            connection.execute("UPDATE sessions SET {} WHERE id = ?".format(", ".join("{} = ?".format(c) for c in columns)),
+                               tuple(columns.values()) + (session_id,))
+            connection.executemany("INSERT INTO tracking (session_id, time, start, stop, reference, count) VALUES (?, ?, ?, ?, ?, ?)",
+                                   [(session_id,) + tuple(event) for event in tracking])
+
+    ########################
+    def mark_interrupted(self):
+        """
+        Sessions never stopped (crash) whose owner is gone: recorded on this
+        host by a process no longer running, or with no owner (catalogs of
+        previous versions). Sessions of other hosts are left to them.
+        :return: number of sessions :rtype: int.
+        """
+        host = socket.gethostname()
+        with self._connect() as connection:
+            rows = connection.execute("SELECT id, host, pid FROM sessions WHERE status = 'running'").fetchall()
+            gone = [(row['id'],) for row in rows
+                    if row['pid'] is None or (row['host'] == host and not _is_running(row['pid']))]
+            connection.executemany("UPDATE sessions SET status = 'interrupted' WHERE id = ? AND status = 'running'", gone)
+            return len(gone)
+
+    ###########################################################################
+    # Queries
+    ###########################################################################
+    def find(self, since=None, until=None, overtone_value=None, session=None, status=None, limit=100):
+        """
+        Sessions started in a period, newest first (indexed queries).
+        :param since: Started at or after (s since epoch) :type since: float.
+        :param until: Started before (s since epoch) :type until: float.
+        :param overtone_value: Overtone frequency (Hz) :type overtone_value: float.
+        :param session: Session name, SQL LIKE pattern (e.g. "2024-Mar%") :type session: str.
+        :param status: running, complete or interrupted :type status: str.
+        :param limit: Sessions returned at most :type limit: int.
+        :return: sessions (column: value) :rtype: list.
+        """
+        (conditions, values) = ([], [])
+        for (condition, value) in (("started >= ?", since), ("started < ?", until), ("overtone_value = ?", overtone_value),
+                                   ("session LIKE ?", session), ("status = ?", status)):
+            if value is not None:
+                conditions.append(condition)
+                values.append(value)
+        query = "SELECT * FROM sessions {} ORDER BY started DESC LIMIT ?".format(
+            "WHERE " + " AND ".join(conditions) if conditions else "")
+        with self._connect() as connection:
+            return [dict(row) for row in connection.execute(query, tuple(values) + (limit,))]
+
+    ########################
+    def get(self, session_id):
+        """
+        :param session_id: id of the session :type session_id: int.
+        :return: session with its files and tracking events, None if unknown :rtype: dict.
+        """
+        with self._connect() as connection:
+            row = connection.execute("SELECT * FROM sessions WHERE id = ?", (session_id,)).fetchone()
+            if row is None:
+                return None
+            session = dict(row)
+            session['files'] = [dict(f) for f in connection.execute(
+                "SELECT segment, kind, path FROM files WHERE session_id = ? ORDER BY segment", (session_id,))]
+            session['tracking'] = [dict(t) for t in connection.execute(
+                "SELECT time, start, stop, reference, count FROM tracking WHERE session_id = ? ORDER BY time", (session_id,))]
+        return session
+
+
+def _is_running(pid):
+    # :return: True if a process of this host has the pid (a reused pid keeps the session running) :rtype: bool.
+    if sys.platform == 'win32':
+        # os.kill would terminate it: the exit code of the process is checked instead
+        kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            # ERROR_ACCESS_DENIED: running, another user's process
+            return ctypes.get_last_error() == 5
+        try:
+            code = ctypes.c_ulong()
+            return bool(kernel32.GetExitCodeProcess(handle, ctypes.byref(code))) and code.value == 259  # STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # another user's process
+        return True
+    return True
+
+
+class _Connection:
+    # commits (rolls back on error) and closes: "with connection" only commits
+    def __init__(self, connection):
+        self._connection = connection
+
+    def __enter__(self):
+        return self._connection
+
+    def __exit__(self, kind, value, traceback):
+        try:
+            if kind is None:
+                self._connection.commit()
+            else:
+                self._connection.rollback()
+        finally:
+            self._connection.close()
+
+
+###############################################################################
+# Sessions left running by a crash (called at the start of the application)
+###############################################################################
+def mark_interrupted_sessions():
+    if not Constants.catalog_enabled:
+        return
+    try:
+        count = SessionCatalog().mark_interrupted()
+    except (sqlite3.Error, OSError) as e:
+        print(TAG, "Warning: catalog not available ({})".format(e))
+        Log.w(TAG, "Catalog not available ({})".format(e))
+        return
+    if count:
+        print(TAG, "{} interrupted session(s) in the catalog".format(count))
+        Log.w(TAG, "{} interrupted session(s) in the catalog".format(count))
@@ -0,0 +1,192 @@
+import os
+from time import time
+
+import numpy as np
+
+from openQCM.core.constants import Constants
+from openQCM.common.sessionSegments import session_files
+
+TAG = ""#"[Compare]"
+
+
+###############################################################################
+# A session of the comparison: samples, overview, event and alignment
+###############################################################################
+class ComparedSession:
+    """
+    Frequency and dissipation of a session (all its segments). The samples
+    (MinMaxPyramid) are kept while memory allows; once loaded, an overview
+    of the session (Constants.compare_overview_buckets min/max buckets) is
+    always kept, to draw it when its samples are released.
+    """
+
+    ###########################################################################
+    # Session of a data file (not loaded)
+    ###########################################################################
+    def __init__(self, path):
+        """
+        :param path: CSV, session file or manifest of the session :type path: str.
+        """
+        self.path = path
+        self.label = os.path.splitext(os.path.basename(path))[0]
+        self.files = session_files(path)
+        self.pyramid = None
+        self.pending = None
+        self.overview = None
+        self.exact = False
+        self.nbytes = 0
+        self.event = None
+        self.visible = True
+        self.used = 0
+
+    ###########################################################################
+    # Samples loaded (overview kept) and released
+    ###########################################################################
+    def load(self, pyramid):
+        """
+        :param pyramid: Samples of the session, filled by a loader (drawn meanwhile if no overview) :type pyramid: MinMaxPyramid.
+        """
+        self.pending = pyramid
+
+    def loaded(self):
+        (self.pyramid, self.pending) = (self.pending, None)
+        self.pyramid.compact()
+        self.nbytes = self.pyramid.nbytes()
+        if len(self.pyramid):
+            self.overview = self.pyramid.overview(Constants.compare_overview_buckets)
+            self.exact = len(self.pyramid) <= Constants.compare_overview_buckets
+        self.used = time()
+
+    def release(self):
+        self.pyramid = None
+
+    ###########################################################################
+    # Alignment: relative time or the marked event
+    ###########################################################################
+    def origin(self, on_event):
+        """
+        :param on_event: Aligned on the marked event :type on_event: bool.
+        :return: time of the session at 0 of the comparison :rtype: float.
+        """
+        return self.event if on_event and self.event is not None else 0.0
+
+    def baseline(self, on_event):
+        """
+        Values at the origin of the alignment, subtracted as the reference of
+        the live plots is.
+        :param on_event: Aligned on the marked event :type on_event: bool.
+        :return: frequency and dissipation, None if not loaded :rtype: float array (2,).
+        """
+        origin = self.origin(on_event)
+        if self.pyramid is not None and len(self.pyramid):
+            return self.pyramid.value_at(origin)
+        if self.overview is None:
+            return None
+        (t, low, high) = self.overview
+        k = max(0, int(np.searchsorted(t, origin, side='right')) - 1)
+        return (low[k] + high[k]) / 2
+
+    ###########################################################################
+    # Visible span, aligned
+    ###########################################################################
+    def query(self, start, stop, pixels, on_event):
+        """
+        :param start: Start of the visible span (aligned time) :type start: float.
+        :param stop: End of the visible span (aligned time) :type stop: float.
+        :param pixels: Width of the plot in pixels :type pixels: int.
+        :param on_event: Aligned on the marked event :type on_event: bool.
+        :return: aligned time and values (frequency, dissipation) :rtype: tuple of float arrays (M,) and (M, 2).
+        """
+        origin = self.origin(on_event)
+        pyramid = self.pyramid if self.pyramid is not None or self.overview is not None else self.pending
+        if pyramid is not None:
+            self.used = time()
+            (t, values) = pyramid.query(start + origin, stop + origin, pixels)
+            return t - origin, values
+        if self.overview is None:
+            return np.empty(0), np.empty((0, 2))
+        (t, low, high) = self.overview
+        (first, last) = self._buckets(start + origin, stop + origin)
+        values = np.empty((2 * (last - first), low.shape[1]))
+        (values[0::2], values[1::2]) = (low[first:last], high[first:last])
+        return np.repeat(t[first:last], 2) - origin, values
+
+    def needs_samples(self, start, stop, pixels, on_event):
+        """
+        :return: True if the overview has less than a bucket per pixel in the visible span :rtype: bool.
+        """
+        if self.overview is None or self.exact:
+            return False
+        origin = self.origin(on_event)
+        (first, last) = self._buckets(start + origin, stop + origin)
+        return 0 < last - first < pixels
+
+    def _buckets(self, start, stop):
+        # buckets of the overview in the span, one before and after
+        t = self.overview[0]
+        return (max(0, int(np.searchsorted(t, start, side='right')) - 1),
+                min(len(t), int(np.searchsorted(t, stop, side='left')) + 1))
+
+    def span(self, on_event):
+        # :return: first and last time, aligned, None if nothing loaded :rtype: tuple.
+        if self.pyramid is not None and len(self.pyramid):
+            span = self.pyramid.span()
+        elif self.overview is not None:
+            span = (self.overview[0][0], self.overview[0][-1])
+        elif self.pending is not None and len(self.pending):
+            span = self.pending.span()
+        else:
+            return None
+        origin = self.origin(on_event)
+        return span[0] - origin, span[1] - origin
+
+
+###############################################################################
+# Sessions compared, samples kept within Constants.compare_memory_mb
+###############################################################################
+class SessionComparison:
+    """
+    Sessions of the comparison. The samples of the least recently drawn
+    sessions are released when the memory of the loaded sessions goes over
+    Constants.compare_memory_mb: they are drawn from their overview, and
+    loaded again when zoomed in (if they fit).
+    """
+
+    def __init__(self):
+        self.sessions = []
+
+    def add(self, path):
+        """
+        :param path: CSV, session file or manifest of the session :type path: str.
+        :return: the session, None if already compared :rtype: ComparedSession.
+        """
+        if any(session.path == path for session in self.sessions):
+            return None
+        session = ComparedSession(path)
+        self.sessions.append(session)
+        return session
+
+    def remove(self, session):
+        self.sessions.remove(session)
+        session.release()
+
+    def memory(self):
+        # :return: memory of the loaded samples :rtype: int.
+        return sum(session.nbytes for session in self.sessions if session.pyramid is not None)
+
+    ###########################################################################
+    # Releases least recently drawn samples
+    ###########################################################################
+    def release(self, needed=(), extra=0):
+        """
+        :param needed: Sessions drawn from their samples in the current view (kept) :type needed: list.
+        :param extra: Memory to make room for (a session to load) :type extra: int.
+        :return: True if the loaded samples and extra fit in memory :rtype: bool.
+        """
+        budget = Constants.compare_memory_mb * 1e6
+        candidates = sorted((s for s in self.sessions if s.pyramid is not None and s not in needed), key=lambda s: s.used)
+        for session in candidates:
+            if self.memory() + extra <= budget:
+                break
+            session.release()
+        return self.memory() + extra <= budget
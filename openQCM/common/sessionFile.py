@@ -0,0 +1,148 @@
+import json
+from time import time
+
+import numpy as np
+
+from openQCM.core.constants import Constants
+from openQCM.common.logger import Logger as Log
+
+# optional: HDF5 session files need h5py
+try:
+    import h5py
+except ImportError:
+    h5py = None
+
+TAG = ""#"[SessionFile]"
+
+# columns of a session: acquisition time (us since epoch), relative time (s),
+# temperature, resonance frequency, dissipation, harmonic (1, 3, 5...)
+COLUMNS = (("timestamp", np.int64), ("relative_time", np.float64), ("temperature", np.float64),
+           ("frequency", np.float64), ("dissipation", np.float64), ("harmonic", np.int8))
+
+
+###############################################################################
+# Columnar session file (HDF5): full precision, chunked and compressed
+###############################################################################
+class SessionWriter:
+    """
+    Appends the values of each sweep in full precision to chunked,
+    compressed columns, with the session metadata as attributes. Rows are
+    buffered and written a chunk at a time (and every
+    Constants.session_flush_interval seconds, as the CSV file), so a row
+    costs a few array assignments. Readers may open the file while it is
+    written (single writer, multiple readers).
+    """
+
+    ###########################################################################
+    # Creates the file and its columns
+    ###########################################################################
+    def __init__(self, path, metadata):
+        """
+        :param path: Full path of the file :type path: str.
+        :param metadata: Session settings (JSON-serializable values) :type metadata: dict.
+        """
+        if h5py is None:
+            raise RuntimeError("HDF5 session files require h5py")
+        self.path = path
+        chunk = Constants.session_chunk_rows
+        self._file = h5py.File(path, 'w', libver='latest')
+        self._columns = []
+        for (name, dtype) in COLUMNS:
+            self._columns.append(self._file.create_dataset(
+                name, shape=(0,), maxshape=(None,), dtype=dtype, chunks=(chunk,),
+                compression=Constants.session_compression, compression_opts=Constants.session_compression_level,
+                shuffle=True))
+        for (key, value) in metadata.items():
+            self._file.attrs[key] = json.dumps(value)
+        self._file.attrs['version'] = json.dumps(Constants.app_version)
+        self._file.swmr_mode = True
+        self._buffers = [np.empty(chunk, dtype=dtype) for (name, dtype) in COLUMNS]
+        self._rows = 0
+        self._size = 0
+        self._flush_time = time()
+
+    ###########################################################################
+    # Appends the values of a sweep
+    ###########################################################################
+    def append(self, timestamp, relative_time, temperature, frequency, dissipation, harmonic=1):
+        """
+        :param timestamp: Acquisition time in microseconds since epoch :type timestamp: int.
+        :param relative_time: Time from the start of the session (s) :type relative_time: float.
+        :param temperature: Temperature :type temperature: float.
+        :param frequency: Resonance frequency (Hz) :type frequency: float.
+        :param dissipation: Dissipation :type dissipation: float.
+        :param harmonic: Harmonic number (1, 3, 5...) :type harmonic: int.
+        """
+        i = self._rows
+        (b0, b1, b2, b3, b4, b5) = self._buffers
+        b0[i] = timestamp
+        b1[i] = relative_time
+        b2[i] = temperature
+        b3[i] = frequency
+        b4[i] = dissipation
+        b5[i] = harmonic
+        self._rows = i + 1
+        if self._rows == len(b0) or time() - self._flush_time > Constants.session_flush_interval:
+            self.flush()
+
+    ###########################################################################
+    # Writes the buffered rows
+    ###########################################################################
+    def flush(self):
+        rows = self._rows
+        if rows > 0:
+            size = self._size + rows
+            for (column, buffer) in zip(self._columns, self._buffers):
+                column.resize((size,))
+                column[self._size:size] = buffer[:rows]
+                column.flush()
+            self._size = size
+            self._rows = 0
+        self._flush_time = time()
+
+    ###########################################################################
+    # Writes the last rows and closes the file
+    ###########################################################################
+    def close(self):
+        self.flush()
+        self._file.close()
+
+
+###############################################################################
+# Reads a session file: columns and metadata
+###############################################################################
+def read_session(path):
+    """
+    :param path: Full path of the file :type path: str.
+    :return: columns (name: array) and metadata (name: value) :rtype: tuple.
+    """
+    if h5py is None:
+        raise RuntimeError("HDF5 session files require h5py")
+    with h5py.File(path, 'r', libver='latest', swmr=True) as f:
+        columns = {name: f[name][()] for (name, dtype) in COLUMNS if name in f}
+        metadata = {key: json.loads(value) for (key, value) in f.attrs.items()}
+    return columns, metadata
+
+
+def is_available():
+    #:return: True if the session files can be written and read :rtype: bool.
+    return h5py is not None
+
+
+def open_writer(path, metadata):
+    """
+    Creates a session writer, None (with a warning) if it cannot be created.
+    :param path: Full path of the file :type path: str.
+    :param metadata: Session settings :type metadata: dict.
+    :return: SessionWriter or None.
+    """
+    if h5py is None:
+        print(TAG, "WARNING: HDF5 session file not written, h5py is not installed")
+        Log.w(TAG, "HDF5 session file not written, h5py is not installed")
+        return None
+    try:
+        return SessionWriter(path, metadata)
+    except (OSError, ValueError, TypeError) as e:
+        print(TAG, "ERROR: Failed to open session file: {}".format(e))
+        Log.e(TAG, "Failed to open session file: {}".format(e))
+        return None
@@ -0,0 +1,257 @@
+import glob
+import json
+import os
+import struct
+import threading
+import zlib
+from time import time
+
+import numpy as np
+
+from openQCM.core.constants import Constants
+from openQCM.common.csvBlockWriter import CSVBlockWriter
+from openQCM.common import sessionFile
+from openQCM.common.fileManager import FileManager
+from openQCM.common.logger import Logger as Log
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+TAG = ""#"[Journal]"
+
+# file: MAGIC, length of the metadata (uint32), metadata (JSON), records
+MAGIC = b"OQCMWAL1"
+# record: acquisition time (us since epoch), relative time, temperature,
+# frequency, dissipation, harmonic (0 if none), CRC-32 of the previous fields
+RECORD = struct.Struct("<qddddh")
+RECORD_DTYPE = np.dtype([("timestamp", "<i8"), ("relative_time", "<f8"), ("temperature", "<f8"),
+                         ("frequency", "<f8"), ("dissipation", "<f8"), ("harmonic", "<i2"), ("crc", "<u4")])
+
+
+###############################################################################
+# Write-ahead journal of a session: fixed-size binary records, group commit
+###############################################################################
+class JournalWriter(threading.Thread):
+    """
+    Appends the values of each row to a journal next to the CSV file. The
+    rows are packed in memory by append() (no I/O for the caller) and a
+    thread writes and fsyncs them every Constants.journal_commit_interval
+    seconds, all at once: the rows of a crashed session are on disk but for
+    the last interval. The journal is deleted when the session is closed;
+    one left behind is an interrupted session, see recover_sessions(). The
+    journal is locked while it is open: the session of a running instance
+    is never recovered by another one.
+    """
+
+    ###########################################################################
+    # Creates the journal, header on disk before the first row
+    ###########################################################################
+    def __init__(self, path, metadata):
+        """
+        :param path: Full path of the journal :type path: str.
+        :param metadata: Session: csv path, harmonic column, session file path (JSON-serializable) :type metadata: dict.
+        """
+        threading.Thread.__init__(self, daemon=True)
+        self.path = path
+        self._file = open(path, 'wb', buffering=0)
+        _lock(self._file)
+        header = json.dumps(metadata).encode()
+        self._file.write(MAGIC + struct.pack("<I", len(header)) + header)
+        os.fsync(self._file.fileno())
+        self._pending = bytearray()
+        self._lock = threading.Lock()
+        self._exit = threading.Event()
+        self.commits = 0
+        self.rows = 0
+
+    ###########################################################################
+    # Adds a row (memory only)
+    ###########################################################################
+    def append(self, timestamp, relative_time, temperature, frequency, dissipation, harmonic=None):
+        """
+        :param timestamp: Acquisition time in microseconds since epoch, write time if None :type timestamp: int.
+        :param harmonic: Harmonic number, multi-overtone mode only (1, 3, 5...) :type harmonic: int.
+        """
+        if timestamp is None:
+            # the CSV has no milliseconds for these rows
+            timestamp = int(time()) * 1000000
+        record = RECORD.pack(timestamp, relative_time, temperature, frequency, dissipation,
+                             0 if harmonic is None else harmonic)
+        with self._lock:
+            self._pending += record
+            self._pending += struct.pack("<I", zlib.crc32(record))
+
+    ###########################################################################
+    # Group commit: writes and fsyncs the pending rows every interval
+    ###########################################################################
+    def run(self):
+        while not self._exit.wait(Constants.journal_commit_interval):
+            self.commit()
+        self.commit()
+
+    ########################
+    def commit(self):
+        with self._lock:
+            (pending, self._pending) = (self._pending, bytearray())
+        if pending:
+            try:
+                self._file.write(pending)
+                os.fsync(self._file.fileno())
+                self.commits += 1
+                self.rows += len(pending) // RECORD_DTYPE.itemsize
+            except (OSError, ValueError) as e:
+                print(TAG, "ERROR: Failed to write journal: {}".format(e))
+                Log.e(TAG, "Failed to write journal: {}".format(e))
+
+    ###########################################################################
+    # Stops the commits: the journal is kept (discard=False) or deleted
+    ###########################################################################
+    def close(self, discard=True):
+        """
+        :param discard: True once the session files are complete :type discard: bool.
+        """
+        self._exit.set()
+        if self.is_alive():
+            self.join()
+        else:
+            self.commit()
+        _unlock(self._file)
+        self._file.close()
+        if discard:
+            os.remove(self.path)
+
+
+###############################################################################
+# Lock of an open journal, held by its writer (non-blocking)
+###############################################################################
+def _lock(f):
+    """
+    :param f: Journal open at its first byte :type f: file.
+    :return: False if another process holds the lock :rtype: bool.
+    """
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        elif msvcrt is not None:
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+
+def _unlock(f):
+    # released on close as well
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        elif msvcrt is not None:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+    except (OSError, ValueError):
+        pass
+
+
+###############################################################################
+# Reads a journal: metadata and the valid records
+###############################################################################
+def read_journal(path, data=None):
+    """
+    Records are read up to the first one torn or corrupted by the crash.
+    :param path: Full path of the journal :type path: str.
+    :param data: Content of the journal if already read :type data: bytes.
+    :return: metadata and records (RECORD_DTYPE) :rtype: tuple.
+    """
+    if data is None:
+        with open(path, 'rb') as f:
+            data = f.read()
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError("{} is not a session journal".format(path))
+    start = len(MAGIC) + 4
+    (length,) = struct.unpack_from("<I", data, len(MAGIC))
+    metadata = json.loads(data[start:start + length].decode())
+    start += length
+    count = (len(data) - start) // RECORD_DTYPE.itemsize
+    records = np.frombuffer(data, dtype=RECORD_DTYPE, count=count, offset=start)
+    for (i, record) in enumerate(records):
+        if zlib.crc32(record.tobytes()[:RECORD.size]) != record["crc"]:
+            records = records[:i]
+            break
+    return metadata, records
+
+
+###############################################################################
+# Rebuilds the files of the sessions interrupted by a crash
+###############################################################################
+def recover_sessions(path=None):
+    """
+    For each journal left in the data folder, writes the CSV file again
+    from the journal (unless the CSV file already holds more rows, e.g. the
+    last block written after the last commit), and the session file if it
+    was written, then deletes the journal. Journals locked by their writer
+    (a session another instance is recording) are skipped.
+    :param path: Data folder (default Constants.csv_export_path) :type path: str.
+    :return: CSV files recovered :rtype: list.
+    """
+    recovered = []
+    path = path or Constants.csv_export_path
+    # where the Worker creates them
+    pattern = FileManager.create_full_path("*", extension=Constants.journal_extension, path=path)
+    for journal in sorted(glob.glob(pattern)):
+        try:
+            with open(journal, 'rb') as f:
+                if not _lock(f):
+                    Log.i(TAG, "Session journal in use by another instance: {}".format(journal))
+                    continue
+                (metadata, records) = read_journal(journal, f.read())
+                csv_path = metadata["csv"]
+                if len(records) > _count_rows(csv_path):
+                    _write_csv(csv_path, metadata, records)
+                if metadata.get("session_file") and sessionFile.is_available():
+                    _write_session(metadata["session_file"], metadata, records)
+                _unlock(f)
+            os.remove(journal)
+            recovered.append(csv_path)
+            print(TAG, "Recovered interrupted session: {} ({} rows)".format(csv_path, len(records)))
+            Log.w(TAG, "Recovered interrupted session: {} ({} rows)".format(csv_path, len(records)))
+        except (OSError, ValueError, KeyError) as e:
+            print(TAG, "ERROR: Failed to recover {}: {}".format(journal, e))
+            Log.e(TAG, "Failed to recover {}: {}".format(journal, e))
+    return recovered
+
+
+def _count_rows(csv_path):
+    # complete data rows of a CSV file (header and torn last line excluded)
+    if not os.path.isfile(csv_path):
+        return 0
+    with open(csv_path, 'rb') as f:
+        return max(0, f.read().count(b"\n") - 1)
+
+
+def _write_csv(csv_path, metadata, records):
+    # new file next to the old one, then replaces it
+    temporary = "{}.recovering".format(csv_path)
+    with open(temporary, 'w', newline='') as f:
+        f.write(",".join(metadata["header"]) + "\r\n")
+        writer = CSVBlockWriter(f, harmonic=metadata["harmonic"])
+        for record in records:
+            writer.append(float(record["relative_time"]), float(record["temperature"]), float(record["frequency"]),
+                          float(record["dissipation"]), int(record["timestamp"]), int(record["harmonic"]))
+        writer.flush()
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, csv_path)
+
+
+def _write_session(session_path, metadata, records):
+    writer = sessionFile.SessionWriter(session_path, metadata.get("session_metadata", {}))
+    default = metadata.get("default_harmonic", 1)
+    for record in records:
+        writer.append(int(record["timestamp"]), float(record["relative_time"]), float(record["temperature"]),
+                      float(record["frequency"]), float(record["dissipation"]), int(record["harmonic"]) or default)
+    writer.close()
@@ -0,0 +1,75 @@
+import json
+import os
+import re
+
+from openQCM.core.constants import Constants
+from openQCM.common.fileManager import FileManager
+
+TAG = ""#"[Segments]"
+
+# name of segment 2, 3... : <session>_part0002
+_SEGMENT = re.compile(r"^(.*)_part\d{4}$")
+
+
+###############################################################################
+# Names of the segments of a session and of its manifest
+###############################################################################
+def segment_name(base, segment):
+    """
+    :param base: Name of the session file, without extension :type base: str.
+    :param segment: Segment number, from 1 :type segment: int.
+    :return: name of the segment files: segment 1 keeps the session name :rtype: str.
+    """
+    return base if segment == 1 else base + Constants.csv_segment_suffix.format(segment)
+
+
+def manifest_path(base, path=None):
+    """
+    :param base: Name of the session file, without extension :type base: str.
+    :param path: Folder of the session :type path: str.
+    :return: full path of the manifest of the segments :rtype: str.
+    """
+    return FileManager.create_full_path("{}_manifest".format(base), extension="json", path=path)
+
+
+###############################################################################
+# Writes the manifest (replaced at once: readers never see half a file)
+###############################################################################
+def write_manifest(base, path, segments, complete):
+    """
+    :param base: Name of the session file, without extension :type base: str.
+    :param path: Folder of the session :type path: str.
+    :param segments: Files and extent of each segment (csv, session_file, sweeps, rows, start, end, bytes) :type segments: list.
+    :param complete: False while the session is acquired :type complete: bool.
+    """
+    full_path = manifest_path(base, path)
+    temporary = "{}.tmp".format(full_path)
+    with open(temporary, 'w') as f:
+        json.dump({'session': base, 'complete': complete, 'segments': segments}, f, indent=1)
+    os.replace(temporary, full_path)
+
+
+###############################################################################
+# Files of a session, in order: segments of the session of a file
+###############################################################################
+def session_files(file_path):
+    """
+    A segmented session is one logical stream: any of its files (or its
+    manifest) gives all its files of the same type, in order.
+    :param file_path: CSV, session file or manifest of a session :type file_path: str.
+    :return: full paths of the files of the session (file_path alone if not segmented) :rtype: list.
+    """
+    (folder, name) = os.path.split(file_path)
+    (base, extension) = os.path.splitext(name)
+    if base.endswith("_manifest"):
+        (base, extension) = (base[:-len("_manifest")], "." + Constants.csv_extension)
+    match = _SEGMENT.match(base)
+    if match is not None:
+        base = match.group(1)
+    manifest = os.path.join(folder, "{}_manifest.json".format(base))
+    if not os.path.isfile(manifest):
+        return [file_path]
+    with open(manifest) as f:
+        segments = json.load(f)['segments']
+    key = 'session_file' if extension.lower() == "." + Constants.session_extension else 'csv'
+    return [os.path.join(folder, segment[key]) for segment in segments if segment.get(key)]
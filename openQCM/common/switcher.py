@@ -24,21 +24,21 @@ class Overtone_Switcher_10MHz:
         name = "fundamental"
         start = self.peak_frequencies[0] - Constants.L10_fundamental
         stop  = self.peak_frequencies[0] + Constants.R10_fundamental
-        return name ,self.peak_frequencies[0], start, stop, Constants.SG_window_size10_fundamental, Constants.Spline_factor10_fundamental
+        return name ,self.peak_frequencies[0], start, stop, Constants.SG_window_size10_fundamental, Constants.Spline_factor10_fundamental, Constants.Estimator10_fundamental
  
     def overtone_1(self):
         # 3th Overtone
         name = "3th Overtone"
         start = self.peak_frequencies[1] - Constants.L10_3th_overtone
         stop  = self.peak_frequencies[1] + Constants.R10_3th_overtone
-        return name, self.peak_frequencies[1], start, stop, Constants.SG_window_size10_3th_overtone, Constants.Spline_factor10_3th_overtone
+        return name, self.peak_frequencies[1], start, stop, Constants.SG_window_size10_3th_overtone, Constants.Spline_factor10_3th_overtone, Constants.Estimator10_3th_overtone
     
     def overtone_2(self):
         # 5th Overtone
         name = "5th Overtone"
         start = self.peak_frequencies[2] - Constants.L10_5th_overtone
         stop  = self.peak_frequencies[2] + Constants.R10_5th_overtone
-        return name, self.peak_frequencies[2], start, stop, Constants.SG_window_size10_5th_overtone, Constants.Spline_factor10_5th_overtone
+        return name, self.peak_frequencies[2], start, stop, Constants.SG_window_size10_5th_overtone, Constants.Spline_factor10_5th_overtone, Constants.Estimator10_5th_overtone
 
 
 ###############################################################################
@@ -62,32 +62,32 @@ class Overtone_Switcher_5MHz:
         name = "fundamental"
         start = self.peak_frequencies[0] - Constants.L5_fundamental
         stop  = self.peak_frequencies[0] + Constants.R5_fundamental
-        return name, self.peak_frequencies[0], start, stop, Constants.SG_window_size5_fundamental, Constants.Spline_factor5_fundamental
+        return name, self.peak_frequencies[0], start, stop, Constants.SG_window_size5_fundamental, Constants.Spline_factor5_fundamental, Constants.Estimator5_fundamental
  
     def overtone_1(self):
         # 3th Overtone
         name = "3th Overtone"
         start = self.peak_frequencies[1] - Constants.L5_3th_overtone
         stop  = self.peak_frequencies[1] + Constants.R5_3th_overtone
-        return name, self.peak_frequencies[1], start, stop, Constants.SG_window_size5_3th_overtone, Constants.Spline_factor5_3th_overtone
+        return name, self.peak_frequencies[1], start, stop, Constants.SG_window_size5_3th_overtone, Constants.Spline_factor5_3th_overtone, Constants.Estimator5_3th_overtone
     
     def overtone_2(self):
         # 5th Overtone
         name = "5th Overtone"
         start = self.peak_frequencies[2] - Constants.L5_5th_overtone
         stop  = self.peak_frequencies[2] + Constants.R5_5th_overtone
-        return name, self.peak_frequencies[2],start,stop, Constants.SG_window_size5_5th_overtone, Constants.Spline_factor5_5th_overtone
+        return name, self.peak_frequencies[2],start,stop, Constants.SG_window_size5_5th_overtone, Constants.Spline_factor5_5th_overtone, Constants.Estimator5_5th_overtone
 
     def overtone_3(self):
         # 7th Overtone
         name = "7th Overtone"
         start = self.peak_frequencies[3] - Constants.L5_7th_overtone
         stop  = self.peak_frequencies[3] + Constants.R5_7th_overtone
-        return name, self.peak_frequencies[3],start,stop, Constants.SG_window_size5_7th_overtone, Constants.Spline_factor5_7th_overtone
+        return name, self.peak_frequencies[3],start,stop, Constants.SG_window_size5_7th_overtone, Constants.Spline_factor5_7th_overtone, Constants.Estimator5_7th_overtone
 
     def overtone_4(self):
         # 9th Overtone
         name = "9th Overtone"
         start = self.peak_frequencies[4] - Constants.L5_9th_overtone
         stop  = self.peak_frequencies[4] + Constants.R5_9th_overtone
-        return name, self.peak_frequencies[4], start, stop, Constants.SG_window_size5_9th_overtone, Constants.Spline_factor5_9th_overtone
+        return name, self.peak_frequencies[4], start, stop, Constants.SG_window_size5_9th_overtone, Constants.Spline_factor5_9th_overtone, Constants.Estimator5_9th_overtone
@@ -0,0 +1,80 @@
+from collections import OrderedDict
+
+from numpy.polynomial import Chebyshev
+
+from openQCM.core.constants import Constants
+
+
+###############################################################################
+# Baseline service
+# Fits the calibration sweep (amplitude and phase) with Chebyshev series on a
+# scaled frequency axis and caches the baseline evaluated on recent sweep
+# windows, so that the per-sweep baseline correction is a lookup.
+###############################################################################
+class BaselineService:
+
+    ###########################################################################
+    # Initializing values for the service
+    ###########################################################################
+    def __init__(self, freq_all, mag_all, phase_all,
+                       degree=Constants.baseline_degree,
+                       cache_size=Constants.baseline_cache_size):
+        """
+        :param freq_all: Frequencies of the calibration sweep (Hz) :type freq_all: float list.
+        :param mag_all: Amplitude of the calibration sweep (dB) :type mag_all: float list.
+        :param phase_all: Phase of the calibration sweep (deg) :type phase_all: float list.
+        :param degree: Degree of the baseline series :type degree: int.
+        :param cache_size: Number of sweep windows kept in the cache :type cache_size: int.
+        """
+        # Chebyshev.fit maps the frequency domain onto [-1, 1] (well conditioned)
+        self.mag_series = Chebyshev.fit(freq_all, mag_all, degree)
+        self.phase_series = Chebyshev.fit(freq_all, phase_all, degree)
+        self._cache_size = cache_size
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    ###########################################################################
+    # Key of a sweep window: start, stop and number of samples
+    ###########################################################################
+    @staticmethod
+    def _key(freq):
+        return (round(float(freq[0]), 3), round(float(freq[-1]), 3), len(freq))
+
+    ###########################################################################
+    # Gets the amplitude and phase baselines of a sweep window
+    ###########################################################################
+    def get(self, freq):
+        """
+        :param freq: Frequencies of the sweep window (Hz) :type freq: float list.
+        :return: amplitude and phase baselines (read-only arrays) :rtype: tuple.
+        """
+        key = self._key(freq)
+        baselines = self._cache.get(key)
+        if baselines is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return baselines
+        self.misses += 1
+        mag = self.mag_series(freq)
+        phase = self.phase_series(freq)
+        mag.flags.writeable = False
+        phase.flags.writeable = False
+        baselines = (mag, phase)
+        self._cache[key] = baselines
+        # discards the least recently used window
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+        return baselines
+
+    ###########################################################################
+    # Computes the baselines of a window in advance (e.g. on a window change)
+    ###########################################################################
+    def prefetch(self, freq):
+        self.get(freq)
+
+    ###########################################################################
+    # Empties the cache
+    ###########################################################################
+    def clear(self):
+        self._cache.clear()
@@ -18,6 +18,24 @@ class SourceType(Enum):
     SocketClient = 2
     
 
+###############################################################################
+# Enum for the resonance estimators available to the measurement process
+###############################################################################
+class EstimatorType(Enum):
+    spline = 0
+    lorentzian = 1
+    phase = 2
+
+
+###############################################################################
+# Enum for what a subscriber of the sweep records loses when it falls behind
+###############################################################################
+class DropPolicy(Enum):
+    lossless = 0     # unbounded queue, nothing is dropped
+    drop_oldest = 1  # bounded queue, the oldest queued record makes room
+    drop_newest = 2  # bounded queue, the new record is dropped
+
+
 ###############################################################################
 # Specifies the minimal Python version required
 ###############################################################################
@@ -37,7 +55,7 @@ class Constants:
     ##########################
     app_title = "Real-Time openQCM GUI"
     app_version = '2.1'
-    app_sources = ["Measurement", "Peak Detection"]#, "Socket Client"]
+    app_sources = ["Measurement", "Peak Detection", "Remote Node"]
     app_encoding = "utf-8"
     
     
@@ -53,6 +71,57 @@ class Constants:
     #  SAMPLES NUMBER  #
     ####################
     argument_default_samples = 501#1001
+
+    # Adaptive sweep: a full window sweep every 'adaptive_full_sweep_interval'
+    # sweeps, in between short dense sweeps of 'adaptive_fine_samples' samples
+    # centred on the tracked peak +-'adaptive_fine_bandwidths' bandwidths.
+    # Amplitude and phase plots are refreshed by the full window sweeps only.
+    # The model based estimators (lorentzian, phase) are recommended: the spline
+    # maximum is biased towards the sample grid, which the fine sweeps keep fixed.
+    adaptive_sweep = False
+    adaptive_full_sweep_interval = 10
+    adaptive_fine_samples = 101
+    adaptive_fine_bandwidths = 4
+
+    # Automatic window sizing: the median bandwidth of the first
+    # 'auto_window_sweeps' sweeps sets the sweep window to 'auto_window_bandwidths'
+    # bandwidths (same left/right ratio as the overtone window), sampled with
+    # 'auto_window_samples_per_bandwidth' samples per bandwidth. The SG window
+    # is scaled to keep its frequency span. The window is sized again when the
+    # median bandwidth of the last 'auto_window_sweeps' sweeps leaves the band
+    # [1/auto_window_hysteresis, auto_window_hysteresis] x the sized bandwidth
+    # (e.g. liquid injected), and widened by auto_window_hysteresis after
+    # 'auto_window_cutoff_sweeps' consecutive cut-off full sweeps, up to
+    # 'auto_window_max_width' times the overtone window.
+    auto_window = False
+    auto_window_sweeps = 5
+    auto_window_bandwidths = 10
+    auto_window_samples_per_bandwidth = 20
+    auto_window_min_samples = 101
+    auto_window_max_samples = 1001
+    auto_window_hysteresis = 2.0
+    auto_window_cutoff_sweeps = 3
+    auto_window_max_width = 4
+
+    # Multi-overtone mode: overtones swept in turn with the selected one, as
+    # {index: weight} (0=fundamental, 1=3th overtone...). The sweep time is shared
+    # in proportion to the weights (selected overtone: 1 if not listed).
+    # Empty: the selected overtone only.
+    multi_overtones = {}
+
+    # Multi-device mode: serial ports of additional Q-1 devices acquired with
+    # the selected one (same overtone and settings, one process and one CSV
+    # file per device, one GUI timer). Empty: the selected device only.
+    multi_device_ports = []
+
+    # Asynchronous acquisition: all the devices are driven by one process with
+    # an asyncio event loop (non-blocking reads on the tty), the spline
+    # estimation runs in a pool of async_dsp_workers processes shared by the
+    # devices (0: in the event loop). The event loop wakes up every
+    # async_read_timeout seconds to check for a stop request.
+    async_acquisition = False
+    async_dsp_workers = 1
+    async_read_timeout = 0.5
     
     
     ####################################
@@ -64,10 +133,23 @@ class Constants:
     # Savitzky-Golay order of the polynomial fit
     # Number of spline points: same as the frequency band +1 (es.5001)
     # Spline smoothing factor
+    # Resonance estimator: spline (oversampled maximum), lorentzian (model fit)
+    # or phase (maximum phase slope, no oversampling)
     
     # Savitzky-Golay order of the polynomial fit (common for all)
     SG_order = 3
 
+    # Lorentzian fit estimator (common for all)
+    # maximum number of function evaluations per sweep: the fit is warm-started
+    # from the previous sweep and usually converges in a few iterations
+    lorentzian_max_nfev = 50
+    # sweeps with a relative fit residual above this value cold-start the next fit
+    lorentzian_max_residual = 0.2
+
+    # Low-CPU mode: uses the phase slope estimator for all the overtones
+    # (suited to high sampling rates on slower PCs or many devices per host)
+    low_cpu_mode = False
+
     #--------------
     # 5MHz 
     #--------------
@@ -78,6 +160,8 @@ class Constants:
     SG_window_size5_fundamental = 9
     # Spline smoothing factor
     Spline_factor5_fundamental = 0.05
+    # Resonance estimator
+    Estimator5_fundamental = EstimatorType.spline
     # left and right frequencies
     L5_3th_overtone = 15000
     R5_3th_overtone = 5000
@@ -85,6 +169,8 @@ class Constants:
     SG_window_size5_3th_overtone = 11
     # Spline smoothing factor
     Spline_factor5_3th_overtone = 0.01
+    # Resonance estimator
+    Estimator5_3th_overtone = EstimatorType.spline
     
     # left and right frequencies
     L5_5th_overtone = 15000
@@ -93,6 +179,8 @@ class Constants:
     SG_window_size5_5th_overtone = 11
     # Spline smoothing factor
     Spline_factor5_5th_overtone = 0.01
+    # Resonance estimator
+    Estimator5_5th_overtone = EstimatorType.spline
     
     # left and right frequencies
     L5_7th_overtone = 50000
@@ -101,6 +189,8 @@ class Constants:
     SG_window_size5_7th_overtone = 33
     # Spline smoothing factor
     Spline_factor5_7th_overtone = 0.01
+    # Resonance estimator
+    Estimator5_7th_overtone = EstimatorType.spline
     
     # TODO
     # left and right frequencies 
@@ -110,6 +200,8 @@ class Constants:
     SG_window_size5_9th_overtone = 5
     # Spline smoothing factor
     Spline_factor5_9th_overtone = 0.5
+    # Resonance estimator
+    Estimator5_9th_overtone = EstimatorType.spline
     
     #--------------
     # 10MHz 
@@ -121,6 +213,8 @@ class Constants:
     SG_window_size10_fundamental = 11
     # Spline smoothing factor
     Spline_factor10_fundamental = 0.01
+    # Resonance estimator
+    Estimator10_fundamental = EstimatorType.spline
     
     # left and right frequencies
     L10_3th_overtone = 15000
@@ -129,6 +223,8 @@ class Constants:
     SG_window_size10_3th_overtone = 11    
     # Spline smoothing factor
     Spline_factor10_3th_overtone = 0.01
+    # Resonance estimator
+    Estimator10_3th_overtone = EstimatorType.spline
     
     # left and right frequencies
     L10_5th_overtone = 23000
@@ -137,6 +233,8 @@ class Constants:
     SG_window_size10_5th_overtone = 19
     # Spline smoothing factor
     Spline_factor10_5th_overtone = 0.01
+    # Resonance estimator
+    Estimator10_5th_overtone = EstimatorType.spline
 
 
     ##########################
@@ -147,12 +245,58 @@ class Constants:
     serial_default_QCS = "@10MHz"
     serial_writetimeout_ms = 0
     serial_timeout_ms = None#0.01
+    # Polling interval while waiting for a sweep (s): the acquisition process
+    # sleeps instead of spinning a core (0: busy polling)
+    serial_poll_interval = 0.001
 
     
     ######################
     # Process parameters #
     ######################
     process_join_timeout_ms = 2000
+    # Parser router: the sweep records are fanned out to subscribers (GUI,
+    # storage, network...), each with its own queue and drop policy, so a
+    # stalled subscriber never slows the acquisition or the others. Bounded
+    # queues hold parser_subscriber_maxsize records. If the acquisition does
+    # not close the router, it stops when no record arrives for
+    # parser_drain_timeout seconds after a stop request.
+    parser_subscriber_maxsize = 256
+    parser_drain_timeout = 1.0
+
+    # TCP publisher: a local server streams the frequency, dissipation and
+    # temperature of each sweep (and the magnitude sweep if
+    # publisher_magnitude) to any number of clients, on publisher_port
+    # (additional devices on the next ports). Each client has a send buffer of
+    # publisher_client_buffer bytes: a slow client loses its oldest sweeps.
+    # New sweeps are sent every publisher_poll_interval seconds at most, in
+    # writes of up to publisher_send_size bytes.
+    publisher_enabled = False
+    publisher_host = "127.0.0.1"
+    publisher_port = 5560
+    publisher_magnitude = False
+    publisher_client_buffer = 1 << 20
+    publisher_send_size = 1 << 16
+    publisher_poll_interval = 0.01
+
+    # Metrics: a local HTTP exporter serves the acquisition health (sweep
+    # rate, stage latencies, queue depths, drops, errors, tracking events)
+    # at http://metrics_host:metrics_port/metrics in the text exposition
+    # format, for a scraper charting unattended runs. Latency histograms
+    # have buckets up to metrics_latency_buckets seconds.
+    metrics_enabled = False
+    metrics_host = "127.0.0.1"
+    metrics_port = 9560
+    metrics_latency_buckets = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+    # Query API: a local HTTP/JSON server answers the latest values, the
+    # session metadata, the sweep window and the history of the ring
+    # buffers, at http://api_host:api_port. Histories are decimated to
+    # api_default_points points (api_max_points at most).
+    api_enabled = False
+    api_host = "127.0.0.1"
+    api_port = 8560
+    api_default_points = 1000
+    api_max_points = 20000
     simulator_default_speed = 0.1 # not used
     parser_timeout_ms = 0.005
     
@@ -182,6 +326,61 @@ class Constants:
     csv_filename = (strftime(csv_default_prefix, localtime()))#+'_DataLog')
     csv_sweeps_export_path = os.path.join(csv_export_path, csv_filename)
     csv_sweeps_filename = "sweep"
+    # CSV rows are buffered and formatted a block at a time: the block is
+    # written (then flushed to disk) when csv_block_rows rows are buffered or
+    # csv_flush_interval seconds after its first row
+    csv_block_rows = 256
+    csv_flush_interval = 30.0
+    # Journal (write-ahead log) of the rows next to the CSV file: fixed-size
+    # binary records written and fsynced together every
+    # journal_commit_interval seconds by a thread (the rows of a crash are on
+    # disk but for the last interval). Deleted at STOP; a journal left behind
+    # is recovered into the CSV (and session) file at the next start.
+    journal_enabled = True
+    journal_extension = "wal"
+    journal_commit_interval = 1.0
+    # Rollover: the files of a session (CSV, session file, journal, sweep
+    # files folder) are cut in segments of csv_segment_max_mb MB of CSV or
+    # csv_segment_hours hours, whichever first (0: no limit). Segment 1 keeps
+    # the session name, the next ones end with csv_segment_suffix; the
+    # <session>_manifest.json file lists the segments.
+    csv_segment_max_mb = 256
+    csv_segment_hours = 24
+    csv_segment_suffix = "_part{:04d}"
+    # Catalog of the sessions (SQLite, in the data folder): settings, summary
+    # statistics and files of each session, written at START and STOP
+    catalog_enabled = True
+    catalog_filename = "sessions"
+    catalog_extension = "db"
+    catalog_timeout = 5.0
+    # Data View: data files parsed in a thread, viewer_chunk_bytes at a time
+    # (rows plotted as they come), rows cached in a binary file next to the
+    # CSV file (<file>.csv.npz): reopened at once, appended rows parsed only
+    viewer_chunk_bytes = 1 << 20
+    viewer_cache_extension = "npz"
+    # Data View: min/max pyramid of the rows (each level viewer_lod_factor
+    # times coarser), the visible time span drawn at screen resolution: raw
+    # rows once at most viewer_lod_points rows per pixel are visible
+    viewer_lod_factor = 4
+    viewer_lod_points = 2
+    # Session comparison: sessions overlaid on relative time or on a marked
+    # event, loaded by compare_loaders threads at once. The samples of the
+    # sessions are kept within compare_memory_mb (least recently drawn
+    # released first, loaded again when zoomed in); an overview of
+    # compare_overview_buckets min/max buckets of each session is kept
+    compare_loaders = 4
+    compare_memory_mb = 512
+    compare_overview_buckets = 4096
+    # Session file (HDF5, requires h5py): f/D/T and time in full precision,
+    # written alongside the CSV file in chunks of session_chunk_rows rows,
+    # compressed, with the session settings as attributes. Buffered rows are
+    # written at least every session_flush_interval seconds.
+    session_file_enabled = False
+    session_extension = "h5"
+    session_chunk_rows = 4096
+    session_compression = "gzip"
+    session_compression_level = 4
+    session_flush_interval = 30.0
 
     # Calibration: scan (WRITE for @5MHz and @10MHz QCS) path: 'openQCM\'
     csv_calibration_filename    = "Calibration_5MHz"
@@ -199,6 +398,11 @@ class Constants:
     #csv_peakfrequencies_filename10 = "PeakFrequencies_10MHz"
     cvs_peakfrequencies_path    = os.path.join(csv_calibration_export_path, "{}.{}".format(csv_peakfrequencies_filename, txt_extension))
     #cvs_peakfrequencies_path10 = os.path.join(csv_calibration_export_path, "{}.{}".format(csv_peakfrequencies_filename10, txt_extension))    
+
+    # Baseline correction: degree of the Chebyshev series fitted to the calibration
+    # sweep and number of sweep windows whose baseline is cached
+    baseline_degree = 8
+    baseline_cache_size = 16
     #########################    
     '''
     # Calibration: baseline correction (READ for @5MHz and @10MHz QCS) path: 'common\'
@@ -243,20 +447,52 @@ class Constants:
     # When measured frequency deviates from reference by more than this value,
     # the sweep window is automatically recalculated
     auto_tracking_threshold = 100  # Hz
-    
+    # Predictive tracking: a Kalman tracker of frequency and drift rate moves the
+    # window to where the resonance will be (False: re-centre on the averaged frequency)
+    auto_tracking_predictive = True
+    # the window is re-centred ahead of the peak by the drift over these sweeps
+    tracking_lead_sweeps = 10
+    # hysteresis: minimum sweeps between two re-centres, unless the predicted
+    # peak is closer than 'tracking_edge_margin' (fraction of L/R) to an edge
+    tracking_min_interval = 5
+    tracking_edge_margin = 0.25
+    # Kalman tracker noise: drift rate random walk (Hz/s^1.5), single sweep
+    # estimate std (Hz), initial drift std (Hz/s), outlier gate (sigma)
+    tracking_process_noise = 1.0
+    tracking_measurement_noise = 5.0
+    tracking_initial_drift = 100.0
+    tracking_gate = 5.0
+    # re-acquisition: after tracking_reacquire consecutive rejected sweeps (a
+    # step, e.g. fast mass loading) the tracker restarts on the measurement
+    tracking_reacquire = 3
+    # peaks cut off at the window edges are measurements too, with the
+    # estimate std multiplied by tracking_edge_noise
+    tracking_edge_noise = 10.0
+
     ##############################
     # Parameters for the average #
     ##############################  
+    # Sweeps averaged by the streaming smoothers of frequency, dissipation and
+    # temperature (equivalent moving average, constant cost per sweep).
+    # Results are published after the first 'environment' sweeps.
     environment = 10 # TESTING ONLY! Restore to 50 for production release
-    SG_order_environment = 1
-    SG_window_environment = 3
     
     ###################
-    class SocketClient: #unused
-        timeout = 0.01
+    # Remote acquisition: a headless node next to the device (python -m
+    # openQCM.processors.Node) streams the sweep records to the GUI. The node
+    # keeps the last replay_bytes of records, so a GUI reconnecting after a
+    # network failure (every reconnect_interval seconds) resumes without
+    # losing sweeps; a GUI more than client_buffer bytes behind (larger than
+    # replay_bytes) is disconnected and resumes the same way. No data for
+    # timeout seconds: the connection is considered lost.
+    class SocketClient:
+        timeout = 5.0
         host_default = "localhost"
-        port_default = [5555, 8080, 9090]
-        buffer_recv_size = 1024
+        port_default = [5570]
+        buffer_recv_size = 1 << 16
+        reconnect_interval = 1.0
+        replay_bytes = 32 << 20
+        client_buffer = 64 << 20
     ###################  
 
 
@@ -0,0 +1,61 @@
+import multiprocessing
+
+import numpy as np
+
+
+############################################################################
+# DisplayChannel: latest amplitude/phase sweep in shared memory
+############################################################################
+
+class DisplayChannel(object):
+    """
+    Display-only data from the acquisition process to the GUI: the writer
+    overwrites the newest sweep, the reader gets it once. Sweeps the reader
+    did not see are dropped and counted, so a stalled GUI costs one sweep of
+    memory and catches up with a single read.
+    """
+
+    #######################
+    def __init__(self, size_max, fields=2):
+        """
+        :param size_max: Maximum number of samples of a sweep :type size_max: int.
+        :param fields: Arrays per sweep (amplitude, phase) :type fields: int.
+        """
+        # shared between the processes
+        self.size_max = size_max
+        self._fields = fields
+        self._data = multiprocessing.RawArray('d', fields * size_max)
+        self._size = multiprocessing.RawValue('i', 0)
+        self._sequence = multiprocessing.RawValue('L', 0)
+        self._lock = multiprocessing.Lock()
+        # reader side: last sweep read, sweeps read and dropped
+        self._sequence_read = 0
+        self.frames = 0
+        self.dropped = 0
+
+    ########################
+    def put(self, *arrays):
+        # writer: replaces the newest sweep
+        size = len(arrays[0])
+        if size > self.size_max:
+            raise ValueError("sweep of {} samples, the channel holds {}".format(size, self.size_max))
+        data = np.frombuffer(self._data, dtype=np.float64).reshape(self._fields, self.size_max)
+        with self._lock:
+            for (row, array) in zip(data, arrays):
+                row[:size] = array
+            self._size.value = size
+            self._sequence.value += 1
+
+    ########################
+    def get(self):
+        # reader: newest sweep as a tuple of arrays, None if already read
+        data = np.frombuffer(self._data, dtype=np.float64).reshape(self._fields, self.size_max)
+        with self._lock:
+            sequence = self._sequence.value
+            if sequence == self._sequence_read:
+                return None
+            arrays = tuple(row[:self._size.value].copy() for row in data)
+        self.dropped += sequence - self._sequence_read - 1
+        self.frames += 1
+        self._sequence_read = sequence
+        return arrays
@@ -0,0 +1,208 @@
+import numpy as np
+from scipy.optimize import least_squares
+
+from openQCM.core.constants import Constants
+
+
+###############################################################################
+# Lorentzian resonance estimator
+# Fits a Lorentzian peak on a linear background to the baseline corrected
+# amplitude of a sweep. The fit is warm-started from the previous sweep.
+###############################################################################
+class LorentzianEstimator:
+
+    ###########################################################################
+    # Initializing values for the estimator
+    ###########################################################################
+    def __init__(self, percent=0.707,
+                       max_nfev=Constants.lorentzian_max_nfev,
+                       max_residual=Constants.lorentzian_max_residual):
+        """
+        :param percent: Fraction of the peak at which the bandwidth is measured :type percent: float.
+        :param max_nfev: Maximum number of function evaluations per fit :type max_nfev: int.
+        :param max_residual: Relative residual above which the next fit is cold-started :type max_residual: float.
+        """
+        self._percent = percent
+        self._max_nfev = max_nfev
+        self._max_residual = max_residual
+        # previous sweep parameters in absolute units:
+        # [amplitude, f0 (Hz), half width (Hz), background at f0, background slope (1/Hz)]
+        self._previous = None
+        self.nfev = 0
+
+    ###########################################################################
+    # Discards the warm start parameters (e.g. after a sweep window change)
+    ###########################################################################
+    def reset(self):
+        self._previous = None
+
+    ###########################################################################
+    # Lorentzian model on a linear background and its jacobian
+    ###########################################################################
+    @staticmethod
+    def _model(p, x):
+        u = (x - p[1]) / p[2]
+        return p[0] / (1 + u * u) + p[3] + p[4] * x
+
+    @staticmethod
+    def _jacobian(p, x):
+        u = (x - p[1]) / p[2]
+        lor = 1 / (1 + u * u)
+        jac = np.empty((len(x), 5))
+        jac[:, 0] = lor
+        jac[:, 1] = 2 * p[0] * lor * lor * u / p[2]
+        jac[:, 2] = 2 * p[0] * lor * lor * u * u / p[2]
+        jac[:, 3] = 1
+        jac[:, 4] = x
+        return jac
+
+    ###########################################################################
+    # Initial guess from the sweep itself (no previous fit available)
+    ###########################################################################
+    def _cold_start(self, freq, signal):
+        i_max = np.argmax(signal)
+        background = np.median(signal)
+        amplitude = signal[i_max] - background
+        # half width from the number of samples above half height
+        above = np.count_nonzero(signal > background + amplitude / 2)
+        half_width = max(above, 2) * abs(freq[1] - freq[0]) / 2
+        return np.array([amplitude, freq[i_max], half_width, background, 0.0])
+
+    ###########################################################################
+    # Estimates resonance frequency, bandwidth, Q-factor and fit residual
+    ###########################################################################
+    def estimate(self, freq, signal):
+        """
+        :param freq: Frequencies of the sweep (Hz) :type freq: float list.
+        :param signal: Baseline corrected amplitude :type signal: float list.
+        :return: f0 (Hz), bandwidth (Hz), Q-factor, relative RMS residual :rtype: tuple.
+        """
+        freq = np.asarray(freq, dtype=float)
+        signal = np.asarray(signal, dtype=float)
+        # normalized frequency axis for a well conditioned problem
+        center = (freq[0] + freq[-1]) / 2
+        scale = (freq[-1] - freq[0]) / 2
+        x = (freq - center) / scale
+
+        if self._previous is None:
+            guess = self._cold_start(freq, signal)
+        else:
+            guess = self._previous.copy()
+        # absolute -> normalized units (the background is referred to f0)
+        p0 = np.array([guess[0],
+                       (guess[1] - center) / scale,
+                       guess[2] / scale,
+                       guess[3] - guess[4] * (guess[1] - center),
+                       guess[4] * scale])
+
+        fit = least_squares(self._residuals, p0, jac=self._residuals_jacobian,
+                            args=(x, signal), method='lm', max_nfev=self._max_nfev)
+        p = fit.x
+        self.nfev = fit.nfev
+        amplitude, half_width = p[0], abs(p[2])
+        f0 = center + p[1] * scale
+        residual = np.sqrt(np.mean(fit.fun ** 2)) / abs(amplitude) if amplitude != 0 else np.inf
+
+        # bandwidth at the same fraction of the peak used by the spline estimator
+        background = p[3] + p[4] * p[1]
+        level = self._percent * (amplitude + background) - background
+        if amplitude <= 0 or level <= 0 or level >= amplitude:
+            self._previous = None
+            raise ValueError("Lorentzian fit: cut-off level not found")
+        bandwidth = 2 * half_width * scale * np.sqrt(amplitude / level - 1)
+        Qfac = f0 / bandwidth
+
+        # keeps the parameters for the next sweep only if the fit is reliable
+        if fit.success and residual < self._max_residual:
+            self._previous = np.array([amplitude, f0, half_width * scale,
+                                       background, p[4] / scale])
+        else:
+            self._previous = None
+        return f0, bandwidth, Qfac, residual
+
+    ###########################################################################
+    def _residuals(self, p, x, y):
+        return self._model(p, x) - y
+
+    def _residuals_jacobian(self, p, x, y):
+        return self._jacobian(p, x)
+
+
+###############################################################################
+# Phase slope resonance estimator
+# Locates the resonance at the maximum slope of the baseline corrected phase,
+# found by a sliding local linear regression in O(samples).
+# Near resonance phase = -atan(2Q(f-f0)/f0), hence the slope at f0 is 2Q/f0.
+# The bandwidth is reported at the same fraction of the peak as the spline
+# and Lorentzian estimators (not the -3 dB FWHM), so D does not depend on
+# the estimator.
+###############################################################################
+class PhaseSlopeEstimator:
+
+    ###########################################################################
+    # Initializing values for the estimator
+    ###########################################################################
+    def __init__(self, window_size, percent=0.707):
+        """
+        :param window_size: Samples of the local regression window (odd) :type window_size: int.
+        :param percent: Fraction of the peak at which the bandwidth is measured :type percent: float.
+        """
+        self._half = max(int(window_size) // 2, 1)
+        # Lorentzian line: width at percent of the peak = FWHM * sqrt(1/percent - 1)
+        self._width_factor = np.sqrt(1 / percent - 1)
+
+    ###########################################################################
+    # Local linear regression slope of uniformly sampled data (per sample)
+    ###########################################################################
+    def local_slope(self, y):
+        """
+        :param y: Uniformly sampled signal :type y: float list.
+        :return: slope at the centre of each full window (len(y)-2*half values) :rtype: float list.
+        """
+        h = self._half
+        n = len(y)
+        j = np.arange(n)
+        # window sums of y and j*y from cumulative sums: sum_k k*y[i+k] = S(j*y) - i*S(y)
+        c0 = np.concatenate(([0.0], np.cumsum(y)))
+        c1 = np.concatenate(([0.0], np.cumsum(j * y)))
+        i = np.arange(h, n - h)
+        s0 = c0[i + h + 1] - c0[i - h]
+        s1 = c1[i + h + 1] - c1[i - h]
+        return (s1 - i * s0) / (h * (h + 1) * (2 * h + 1) / 3)
+
+    ###########################################################################
+    # Estimates resonance frequency, bandwidth and Q-factor
+    ###########################################################################
+    def estimate(self, freq, phase):
+        """
+        :param freq: Uniformly spaced frequencies of the sweep (Hz) :type freq: float list.
+        :param phase: Baseline corrected phase (deg) :type phase: float list.
+        :return: f0 (Hz), bandwidth (Hz), Q-factor, index of the maximum slope :rtype: tuple.
+        """
+        step = (freq[-1] - freq[0]) / (len(freq) - 1)
+        slope = np.abs(self.local_slope(np.asarray(phase, dtype=float)))
+        i = int(np.argmax(slope))
+        # parabolic interpolation of the slope maximum
+        delta = 0.0
+        if 0 < i < len(slope) - 1:
+            den = slope[i - 1] - 2 * slope[i] + slope[i + 1]
+            if den < 0:
+                delta = 0.5 * (slope[i - 1] - slope[i + 1]) / den
+        index = i + self._half
+        f0 = freq[0] + (index + delta) * step
+        # deg/sample -> rad/Hz
+        slope_max = np.radians(slope[i]) / step
+        # the regression over the window flattens the slope of the arctan:
+        # half width gamma such that the regression slope of atan(f/gamma) is slope_max
+        # (Newton iterations, from the unflattened half width 1/slope_max)
+        offsets = np.arange(-self._half, self._half + 1) * step
+        norm = np.sum(offsets * offsets)
+        gamma = 1 / slope_max
+        for _ in range(6):
+            g = np.sum(offsets * np.arctan(offsets / gamma)) / norm - slope_max
+            dg = -np.sum(offsets * offsets / (gamma * gamma + offsets * offsets)) / norm
+            gamma = max(gamma - g / dg, 1e-3 / slope_max)
+        # FWHM = 2 gamma, converted to the width at percent of the peak
+        bandwidth = 2 * gamma * self._width_factor
+        Qfac = f0 / bandwidth
+        return f0, bandwidth, Qfac, index
@@ -0,0 +1,234 @@
+import multiprocessing
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from openQCM.core.constants import Constants
+from openQCM.common.logger import Logger as Log
+
+
+TAG = ""#"[Metrics]"
+
+# stages of a sweep: serial read and DSP (acquisition process), fan-out to
+# the subscribers (router), acquisition to GUI tick and CSV row (GUI)
+STAGES = ("read", "process", "route", "display", "storage")
+
+
+############################################################################
+# Histogram: latency distribution in shared memory
+############################################################################
+
+class Histogram(object):
+    """
+    Counts of the observations per bucket (upper bounds, inclusive) and their
+    sum, shared between the processes. Each histogram has a single writer,
+    the counters are not locked.
+    """
+
+    #######################
+    def __init__(self, buckets):
+        """
+        :param buckets: Upper bounds of the buckets, increasing :type buckets: float list.
+        """
+        self.buckets = tuple(buckets)
+        self._counts = multiprocessing.RawArray('L', len(self.buckets) + 1)
+        self._sum = multiprocessing.RawValue('d', 0.0)
+
+    ########################
+    def observe(self, value):
+        self._counts[bisect_left(self.buckets, value)] += 1
+        self._sum.value += value
+
+    ########################
+    def get(self):
+        #:return: cumulative counts per bucket (+Inf last), sum and count :rtype: tuple.
+        cumulative = []
+        total = 0
+        for count in self._counts:
+            total += count
+            cumulative.append(total)
+        return cumulative, self._sum.value, total
+
+
+############################################################################
+# Metrics: acquisition health of a device
+############################################################################
+
+class Metrics(object):
+    """
+    Counters of a device written where the values are produced: the sweep
+    records are counted when the acquisition adds them to the router (so
+    a stalled GUI does not hide them), the stage latencies in the process
+    running the stage. Read by the exporter at each scrape.
+    """
+
+    #######################
+    def __init__(self, device=0, buckets=None):
+        """
+        :param device: Device index (label of the samples) :type device: int.
+        :param buckets: Upper bounds of the latency buckets in seconds (default Constants.metrics_latency_buckets) :type buckets: float list.
+        """
+        self.device = device
+        buckets = buckets or Constants.metrics_latency_buckets
+        self._latency = {stage: Histogram(buckets) for stage in STAGES}
+        self._sweeps = multiprocessing.RawValue('L', 0)
+        self._cutoff_left = multiprocessing.RawValue('L', 0)
+        self._cutoff_right = multiprocessing.RawValue('L', 0)
+        self._usb_errors = multiprocessing.RawValue('L', 0)
+        self._tracking = multiprocessing.RawValue('L', 0)
+        self._sampling_time = multiprocessing.RawValue('d', 0.0)
+
+    ########################
+    def add_sweep(self, record):
+        # acquisition side: counters and stage latencies of the sweep
+        self._sweeps.value += 1
+        self._cutoff_left.value += record.err1
+        self._cutoff_right.value += record.err2
+        self._usb_errors.value = record.usb_errors
+        if record.tracking is not None:
+            self._tracking.value += 1
+        self._sampling_time.value = record.sampling_time
+        if record.read_time > 0:
+            self._latency["read"].observe(record.read_time)
+            self._latency["process"].observe(record.process_time)
+
+    ########################
+    def observe(self, stage, seconds):
+        #:param stage: One of STAGES :type stage: str. :param seconds: Latency of the stage :type seconds: float.
+        self._latency[stage].observe(seconds)
+
+    ########################
+    def collect(self):
+        #:return: samples of the device, as expected by render :rtype: list.
+        labels = {'device': self.device}
+        sampling_time = self._sampling_time.value
+        samples = [
+            ("openqcm_sweeps_total", "counter", "Sweeps added to the router.", "", labels, self._sweeps.value),
+            ("openqcm_sweep_rate", "gauge", "Sweeps per second, from the last sampling time.", "", labels,
+             1.0 / sampling_time if sampling_time > 0 else 0.0),
+            ("openqcm_sampling_time_seconds", "gauge", "Time between the last two sweeps.", "", labels, sampling_time),
+            ("openqcm_cutoff_errors_total", "counter", "Sweeps whose cut-off frequency was not found.", "",
+             dict(labels, side="left"), self._cutoff_left.value),
+            ("openqcm_cutoff_errors_total", "counter", "Sweeps whose cut-off frequency was not found.", "",
+             dict(labels, side="right"), self._cutoff_right.value),
+            ("openqcm_usb_errors_total", "counter", "Sweeps that could not be read or converted.", "", labels,
+             self._usb_errors.value),
+            ("openqcm_tracking_events_total", "counter", "Sweep window moves of the auto-tracking.", "", labels,
+             self._tracking.value),
+        ]
+        for stage in STAGES:
+            histogram = self._latency[stage]
+            (cumulative, total, count) = histogram.get()
+            stage_labels = dict(labels, stage=stage)
+            family = ("openqcm_stage_latency_seconds", "histogram", "Latency of the processing stages of a sweep.")
+            for (bound, value) in zip(histogram.buckets + (float("inf"),), cumulative):
+                samples.append(family + ("_bucket", dict(stage_labels, le=bound), value))
+            samples.append(family + ("_sum", stage_labels, total))
+            samples.append(family + ("_count", stage_labels, count))
+        return samples
+
+
+############################################################################
+# Samples of the router: queue depths and records dropped
+############################################################################
+
+def router_samples(parser_process, device=0):
+    """
+    :param parser_process: Router of the device :type parser_process: ParserProcess.
+    :param device: Device index :type device: int.
+    :return: samples, as expected by render :rtype: list.
+    """
+    labels = {'device': device}
+    samples = [("openqcm_queue_depth", "gauge", "Sweep records waiting in a queue.", "",
+                dict(labels, queue="router"), parser_process.get_depth())]
+    for subscriber in parser_process.get_subscribers():
+        (delivered, dropped) = subscriber.get_stats()
+        subscriber_labels = dict(labels, subscriber=subscriber.name)
+        samples.append(("openqcm_queue_depth", "gauge", "Sweep records waiting in a queue.", "",
+                        dict(labels, queue=subscriber.name), subscriber.get_depth()))
+        samples.append(("openqcm_delivered_total", "counter", "Sweep records delivered to a subscriber.", "",
+                        subscriber_labels, delivered))
+        samples.append(("openqcm_dropped_total", "counter", "Sweep records dropped because a consumer fell behind.", "",
+                        subscriber_labels, dropped))
+    return samples
+
+
+############################################################################
+# Text exposition format
+############################################################################
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+def render(samples):
+    """
+    :param samples: (family, type, help, suffix, labels, value) of each sample :type samples: list.
+    :return: text exposition format, samples grouped by family :rtype: str.
+    """
+    families = {}
+    for (family, kind, description, suffix, labels, value) in samples:
+        if family not in families:
+            families[family] = (kind, description, [])
+        families[family][2].append((suffix, labels, value))
+    lines = []
+    for (family, (kind, description, values)) in families.items():
+        lines.append("# HELP {} {}".format(family, description))
+        lines.append("# TYPE {} {}".format(family, kind))
+        for (suffix, labels, value) in values:
+            text = ",".join('{}="{}"'.format(k, _format_value(v)) for (k, v) in labels.items())
+            lines.append("{}{}{{{}}} {}".format(family, suffix, text, _format_value(value)))
+    return "\n".join(lines) + "\n"
+
+
+############################################################################
+# MetricsServer: plain HTTP exporter on localhost
+############################################################################
+
+class MetricsServer(threading.Thread):
+    """
+    Serves GET /metrics in the text exposition format, collected at each
+    scrape, from a thread of the process owning the acquisition.
+    """
+
+    #######################
+    def __init__(self, collect, host=None, port=None):
+        """
+        :param collect: Returns the samples to expose :type collect: callable.
+        :param host: Address to listen on (default Constants.metrics_host) :type host: str.
+        :param port: Port to listen on (default Constants.metrics_port) :type port: int.
+        """
+        threading.Thread.__init__(self, daemon=True)
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = render(collect()).encode(Constants.app_encoding)
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        # binds now: a port in use is reported to the caller
+        self._server = ThreadingHTTPServer((host or Constants.metrics_host, port or Constants.metrics_port), Handler)
+        self.address = self._server.server_address
+
+    ########################
+    def run(self):
+        Log.i(TAG, "Metrics on http://{}:{}/metrics".format(*self.address))
+        self._server.serve_forever()
+
+    ########################
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
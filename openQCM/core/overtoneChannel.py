@@ -0,0 +1,72 @@
+############################################################################
+# OvertoneChannel: processing state of one overtone in multi-overtone mode
+############################################################################
+
+class OvertoneChannel(object):
+    """
+    Holds the per-overtone state of the acquisition process (sweep window,
+    estimators, smoothers, tracker, ...) while the other overtones are swept.
+    The state is swapped in and out of the process attributes, so the
+    processing methods are the same in single and multi-overtone mode.
+    """
+
+    # attributes of the process that belong to the overtone
+    STATE = ('_overtone_int', '_estimator_type',
+             '_startFreq', '_stopFreq', '_fStep', '_readFREQ', '_spline_points',
+             '_SG_window_size', '_Spline_factor', '_coeffs_all',
+             '_reference_frequency', '_auto_tracking_count',
+             '_tracker', '_sweep_period', '_t_previous_sweep', '_sweeps_since_tracking',
+             '_window_intervals', '_window_bandwidth', '_overtone_width', '_bandwidths', '_cutoff_sweeps', '_window_samples',
+             '_force_full_sweep', '_sweeps_since_full_sweep',
+             '_lorentzian', '_fit_residual', '_phase_slope',
+             '_frequency_smoother', '_dissipation_smoother', '_temperature_smoother')
+
+    #######################
+    def __init__(self, overtone, weight=1.0):
+        # initialization
+        self.overtone = overtone
+        self.weight = weight
+        self.sweeps = 0
+        self.sweep_time = 0.0
+        self._state = {}
+
+    ########################
+    def save(self, process):
+        # copies the overtone state from the process
+        for name in self.STATE:
+            self._state[name] = getattr(process, name)
+
+    ########################
+    def load(self, process):
+        # restores the overtone state into the process
+        for name, value in self._state.items():
+            setattr(process, name, value)
+
+
+############################################################################
+# OvertoneScheduler: budgets the sweep time across the overtones
+############################################################################
+
+class OvertoneScheduler(object):
+    """
+    Weighted round-robin on the measured sweep time: the next sweep goes to the
+    channel with the least sweep time per unit of weight, so each overtone gets
+    a share of the acquisition time proportional to its weight, whatever the
+    duration of its sweeps.
+    """
+
+    #######################
+    def __init__(self, channels):
+        # initialization
+        self.channels = list(channels)
+
+    ########################
+    def next(self):
+        # channel of the next sweep (ties go to the first channel in the list)
+        return min(self.channels, key=lambda c: c.sweep_time / c.weight)
+
+    ########################
+    def account(self, channel, duration):
+        # adds the duration of a sweep (s) to the channel
+        channel.sweeps += 1
+        channel.sweep_time += duration
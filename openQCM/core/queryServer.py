@@ -0,0 +1,292 @@
+import asyncio
+import datetime
+import json
+import sqlite3
+import threading
+from urllib.parse import urlsplit, parse_qs
+
+import numpy as np
+
+from openQCM.core.constants import Constants
+from openQCM.common.logger import Logger as Log
+from openQCM.common.sessionCatalog import SessionCatalog
+
+
+TAG = ""#"[Query]"
+
+# series of the history (sweep values)
+SERIES = ("frequency", "dissipation", "temperature")
+
+
+############################################################################
+# Decimation of a series for a chart of a given number of points
+############################################################################
+
+def decimate(t, v, points):
+    """
+    Keeps the minimum and the maximum of the values in points/2 buckets of
+    consecutive samples, in time order, so peaks and steps survive.
+    :param t: Times, increasing :type t: float array.
+    :param v: Values :type v: float array.
+    :param points: Samples returned at most :type points: int.
+    :return: decimated times and values :rtype: tuple.
+    """
+    n = len(v)
+    buckets = max(1, points // 2)
+    if n <= points:
+        return t, v
+    edges = np.linspace(0, n, buckets + 1).astype(int)
+    ids = np.repeat(np.arange(buckets), np.diff(edges))
+    keep = []
+    for reduce in (np.minimum, np.maximum):
+        extreme = reduce.reduceat(v, edges[:-1])
+        candidates = np.flatnonzero(v == extreme[ids])
+        # first sample reaching the extreme of each bucket
+        keep.append(candidates[np.unique(ids[candidates], return_index=True)[1]])
+    index = np.unique(np.concatenate(keep))
+    return t[index], v[index]
+
+
+def _number(value):
+    # JSON has no NaN
+    if value is None:
+        return None
+    value = float(value)
+    return value if np.isfinite(value) else None
+
+
+def _offset(seconds):
+    # UTC offset (s) of the local wall clock at a local time (s since 1970-01-01, naive)
+    local = datetime.datetime(1970, 1, 1) + datetime.timedelta(seconds=float(seconds))
+    return float(seconds) - local.timestamp()
+
+
+def epoch(timestamps):
+    """
+    Seconds since epoch, as time() and the catalog, of acquisition
+    timestamps: local wall clock in microseconds since 1970-01-01 (naive),
+    as in the CSV. The UTC offset is computed at both ends, and per sample
+    if it changes in between (daylight saving).
+    :param timestamps: Acquisition timestamps (us) :type timestamps: float array.
+    :return: seconds since epoch :rtype: float array.
+    """
+    seconds = np.asarray(timestamps, dtype=float) / 1e6
+    if not len(seconds):
+        return seconds
+    offsets = [_offset(s) for s in (seconds[0], seconds[-1])]
+    if offsets[0] == offsets[-1]:
+        return seconds - offsets[0]
+    return seconds - np.array([_offset(s) for s in seconds])
+
+
+############################################################################
+# QueryServer: local HTTP/JSON API of the Worker
+############################################################################
+
+class QueryServer(threading.Thread):
+    """
+    Answers GET requests from an asyncio loop in its own thread, so the GUI
+    thread never waits for a client. The history is read from snapshots of
+    the ring buffers of the Worker: the views are never written again, the
+    lock of the Worker is only held to take them.
+
+    GET /status   latest frequency, dissipation and temperature, counters
+    GET /session  session metadata
+    GET /window   current sweep window (auto-tracking)
+    GET /history  ?series=frequency|dissipation|temperature
+                  &start=&end= (s since epoch) or &last= (s)
+                  &points= (decimated with min/max buckets) &overtone= &device=
+                  times (t) in s since epoch, as /status and /sessions
+    GET /sessions catalog: ?since=&until= (s since epoch) &overtone= (Hz)
+                  &session= (name pattern, % wildcard) &status= &limit=
+                  or ?id= for a session with its files and tracking events
+    """
+
+    #######################
+    def __init__(self, worker, host=None, port=None):
+        """
+        :param worker: Worker of the main device :type worker: Worker.
+        :param host: Address to listen on (default Constants.api_host) :type host: str.
+        :param port: Port to listen on (default Constants.api_port) :type port: int.
+        """
+        threading.Thread.__init__(self, daemon=True)
+        self._worker = worker
+        self.address = (host or Constants.api_host, port or Constants.api_port)
+        self._loop = None
+        self._stopped = None
+        self._started = threading.Event()
+        self._error = None
+        self._clients = {}
+        self.requests = 0
+
+    ########################
+    def start(self):
+        # returns once listening: a port in use raises OSError to the caller
+        threading.Thread.start(self)
+        self._started.wait()
+        if self._error is not None:
+            raise self._error
+
+    ########################
+    def run(self):
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._loop.run_until_complete(self._main())
+        finally:
+            self._loop.close()
+
+    ########################
+    async def _main(self):
+        self._stopped = asyncio.Event()
+        try:
+            server = await asyncio.start_server(self._serve, *self.address)
+        except OSError as e:
+            self._error = e
+            self._started.set()
+            return
+        self.address = server.sockets[0].getsockname()[:2]
+        self._started.set()
+        Log.i(TAG, "Query API on http://{}:{}".format(*self.address))
+        await self._stopped.wait()
+        server.close()
+        await server.wait_closed()
+        # idle keep-alive clients: closing the connection ends their task
+        for writer in list(self._clients.values()):
+            writer.transport.abort()
+        await asyncio.gather(*self._clients, return_exceptions=True)
+
+    ########################
+    def stop(self):
+        if self._loop is not None and self._stopped is not None and self.is_alive():
+            self._loop.call_soon_threadsafe(self._stopped.set)
+        self.join(Constants.process_join_timeout_ms / 1000)
+
+    ###########################################################################
+    # HTTP/1.1 with keep-alive, GET only
+    ###########################################################################
+    async def _serve(self, reader, writer):
+        task = asyncio.current_task()
+        self._clients[task] = writer
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                headers = {}
+                while True:
+                    header = await reader.readline()
+                    if header in (b"\r\n", b"\n", b""):
+                        break
+                    (name, _, value) = header.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip().lower()
+                parts = line.decode("latin-1").split()
+                if len(parts) != 3:
+                    break
+                (method, target, version) = parts
+                keep_alive = version == "HTTP/1.1" and headers.get("connection") != "close"
+                (status, reason, body) = self._answer(method, target)
+                writer.write("HTTP/1.1 {} {}\r\nContent-Type: application/json\r\nContent-Length: {}\r\n{}\r\n".format(
+                    status, reason, len(body), "" if keep_alive else "Connection: close\r\n").encode("latin-1") + body)
+                await writer.drain()
+                self.requests += 1
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            self._clients.pop(task, None)
+
+    ########################
+    def _answer(self, method, target):
+        #:return: status code, reason and JSON body :rtype: tuple.
+        if method != "GET":
+            return 405, "Method Not Allowed", b'{"error": "GET only"}'
+        url = urlsplit(target)
+        query = {k: v[-1] for (k, v) in parse_qs(url.query).items()}
+        routes = {"/status": self._status, "/session": self._session,
+                  "/window": self._window, "/history": self._history, "/sessions": self._sessions}
+        if url.path not in routes:
+            return 404, "Not Found", b'{"error": "not found"}'
+        try:
+            worker = self._device(query)
+            result = routes[url.path](worker, query)
+        except (KeyError, ValueError) as e:
+            return 400, "Bad Request", json.dumps({"error": str(e)}).encode()
+        except sqlite3.Error as e:
+            return 503, "Service Unavailable", json.dumps({"error": str(e)}).encode()
+        return 200, "OK", json.dumps(result).encode()
+
+    ###########################################################################
+    # Answers
+    ###########################################################################
+    def _device(self, query):
+        device = int(query.get("device", 0))
+        devices = self._worker.get_devices()
+        if device == 0:
+            return self._worker
+        if not 0 < device <= len(devices):
+            raise ValueError("no device {}".format(device))
+        return devices[device - 1]
+
+    ########################
+    @staticmethod
+    def _status(worker, query):
+        (err1, err2, sweep, usb_errors) = worker.get_ser_error()
+        latest = {"time": None}
+        for series in SERIES:
+            (t, v) = worker.get_history(series)
+            latest[series] = _number(v[-1]) if len(v) else None
+            if len(t):
+                latest["time"] = _number(epoch(t[-1:])[0])
+        return dict(latest, sweep=int(sweep), sampling_time=_number(worker.get_sampling_time()),
+                    cutoff_errors=[int(err1), int(err2)], usb_errors=int(usb_errors),
+                    fit_residual=_number(worker.get_fit_residual()))
+
+    ########################
+    @staticmethod
+    def _session(worker, query):
+        return worker.get_session_info()
+
+    ########################
+    @staticmethod
+    def _window(worker, query):
+        return worker.get_window_info()
+
+    ########################
+    @staticmethod
+    def _history(worker, query):
+        series = query.get("series", "frequency")
+        if series not in SERIES:
+            raise ValueError("series must be one of {}".format(SERIES))
+        points = min(int(query.get("points", Constants.api_default_points)), Constants.api_max_points)
+        overtone = int(query["overtone"]) if "overtone" in query else None
+        (t, v) = worker.get_history(series, overtone)
+        t = epoch(t)
+        start = float(query["start"]) if "start" in query else None
+        if "last" in query and len(t):
+            start = t[-1] - float(query["last"])
+        (first, last) = (0, len(t))
+        if start is not None:
+            first = np.searchsorted(t, start, side="left")
+        if "end" in query:
+            last = np.searchsorted(t, float(query["end"]), side="right")
+        (t, v) = (t[first:last], v[first:last])
+        finite = np.isfinite(v)
+        (t, v) = decimate(t[finite], v[finite], points)
+        return {"series": series, "samples": int(last - first), "t": t.tolist(), "v": v.tolist()}
+
+    ########################
+    @staticmethod
+    def _sessions(worker, query):
+        catalog = SessionCatalog()
+        if "id" in query:
+            session = catalog.get(int(query["id"]))
+            if session is None:
+                raise ValueError("no session {}".format(query["id"]))
+            return session
+        number = {"since": float, "until": float, "overtone": float, "limit": int}
+        arguments = {k: number.get(k, str)(v) for (k, v) in query.items() if k in ("since", "until", "overtone", "session", "status", "limit")}
+        if "overtone" in arguments:
+            arguments["overtone_value"] = arguments.pop("overtone")
+        return {"sessions": catalog.find(**arguments)}
@@ -16,23 +16,40 @@ class RingBuffer(object):
     #######################
     def __init__(self, size_max, default_value=np.nan, dtype=float):
         # initialization
+        # the values are stored backwards in twice the size, the buffer is the
+        # view starting at the newest value: appending is O(1) and views already
+        # returned are never written again
         self.size_max = size_max
-        self._data = np.empty(size_max, dtype=dtype)
-        self._data.fill(default_value)
+        self._store = np.empty(2 * size_max, dtype=dtype)
+        self._store.fill(default_value)
+        self._start = size_max
+        self._data = self._store[self._start:]
         self.size = 0
 
+    ########################
+    def _push(self, value):
+        # writes the newest value before the view, moving to a new store when
+        # the beginning is reached
+        if self._start == 0:
+            store = np.empty_like(self._store)
+            store[self.size_max:] = self._store[:self.size_max]
+            self._store = store
+            self._start = self.size_max
+        self._start -= 1
+        self._store[self._start] = value
+        self._data = self._store[self._start:self._start + self.size_max]
+
     ########################
     def append(self, value):
         # append new data to ring buffer
-        self._data = np.roll(self._data, 1)
-        self._data[0] = value
+        self._push(value)
         self.size += 1
         if self.size == self.size_max:
             self.__class__ = RingBufferFull
 
     ########################
     def get_all(self):
-        #return a list of elements from the oldest to the newest
+        #return a list of elements from the newest to the oldest
         return self._data
 
     ########################
@@ -58,5 +75,4 @@ class RingBufferFull(RingBuffer):
     
     def append(self, value):
         #append an element when buffer is full
-        self._data = np.roll(self._data, 1)
-        self._data[0] = value
+        self._push(value)
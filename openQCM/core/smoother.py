@@ -0,0 +1,42 @@
+import numpy as np
+
+############################################################################
+# StreamingSmoother: recursive average with O(1) state per channel
+############################################################################
+
+class StreamingSmoother(object):
+    """
+    Exponential moving average equivalent to a moving average of 'size'
+    samples: alpha = 2/(size+1) gives the same mean delay, (size-1)/2 samples.
+    While warming up the weight 1/n is used, so the first outputs are the
+    exact cumulative mean instead of being biased towards the first sample.
+    """
+
+    #######################
+    def __init__(self, size):
+        # initialization
+        self._alpha = 2.0 / (size + 1)
+        self._value = np.nan
+        self.count = 0
+
+    ########################
+    def update(self, value):
+        # updates the average with a new sample (non finite samples are skipped)
+        if np.isfinite(value):
+            self.count += 1
+            weight = max(1.0 / self.count, self._alpha)
+            if self.count == 1:
+                self._value = value
+            else:
+                self._value += weight * (value - self._value)
+        return self._value
+
+    ########################
+    def get(self):
+        # returns the current smoothed value (nan until the first sample)
+        return self._value
+
+    ########################
+    def reset(self):
+        self._value = np.nan
+        self.count = 0
@@ -0,0 +1,46 @@
+###############################################################################
+# Results of one sweep, sent by the acquisition process as a single message
+###############################################################################
+class SweepRecord(object):
+    """
+    Everything the acquisition process reports for a sweep travels together,
+    so the Worker never pairs values coming from different sweeps.
+    Values not produced by the sweep are None: amplitude and phase outside
+    full window sweeps of the selected overtone, frequency, dissipation and
+    temperature before the smoothers have seen a full environment of sweeps,
+    tracking if the sweep window did not move.
+    """
+
+    __slots__ = ('sweep', 'timestamp', 'acquired', 'overtone',
+                 'frequency', 'dissipation', 'temperature',
+                 'err1', 'err2', 'usb_errors', 'sampling_time', 'fit_residual',
+                 'read_time', 'process_time',
+                 'amplitude', 'phase', 'tracking')
+
+    #######################
+    def __init__(self):
+        # sweep counter, acquisition time (local wall clock, us since 1970-01-01, as in the CSV) and overtone index
+        self.sweep = 0
+        self.timestamp = None
+        # time the record was sent by the acquisition process (s, time() epoch), for the metrics
+        self.acquired = None
+        self.overtone = 0
+        # smoothed resonance frequency (Hz), dissipation and temperature
+        self.frequency = None
+        self.dissipation = None
+        self.temperature = None
+        # cut-off frequency not found (left, right), USB errors
+        self.err1 = 0
+        self.err2 = 0
+        self.usb_errors = 0
+        # time between sweeps (s) and residual of the Lorentzian fit
+        self.sampling_time = 0.0
+        self.fit_residual = 0.0
+        # time spent reading the sweep from the device and processing it (s)
+        self.read_time = 0.0
+        self.process_time = 0.0
+        # filtered amplitude and phase of the sweep
+        self.amplitude = None
+        self.phase = None
+        # AUTO-TRACKING: (start, stop, reference, count, samples) of the new window
+        self.tracking = None
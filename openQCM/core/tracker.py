@@ -0,0 +1,117 @@
+import numpy as np
+
+from openQCM.core.constants import Constants
+
+
+###############################################################################
+# Kalman frequency tracker
+# Constant drift model with state [frequency (Hz), drift rate (Hz/s)].
+# Predicts where the resonance will be at the next sweep so that the sweep
+# window can be moved before the peak reaches its edges. Consecutive
+# rejected measurements (the resonance has jumped) re-initialize it.
+###############################################################################
+class KalmanTracker:
+
+    ###########################################################################
+    # Initializing values for the tracker
+    ###########################################################################
+    def __init__(self, process_noise=Constants.tracking_process_noise,
+                       measurement_noise=Constants.tracking_measurement_noise,
+                       gate=Constants.tracking_gate,
+                       reacquire=Constants.tracking_reacquire):
+        """
+        :param process_noise: Drift rate random walk density (Hz/s^1.5) :type process_noise: float.
+        :param measurement_noise: Standard deviation of a single sweep estimate (Hz) :type measurement_noise: float.
+        :param gate: Innovations above gate*sigma are rejected as outliers :type gate: float.
+        :param reacquire: Consecutive rejected measurements re-initializing the tracker :type reacquire: int.
+        """
+        self._q = process_noise ** 2
+        self._r = measurement_noise ** 2
+        self._gate = gate
+        self._reacquire = reacquire
+        self.reset()
+
+    ###########################################################################
+    # Discards the state (next measurement re-initializes the tracker)
+    ###########################################################################
+    def reset(self):
+        self._x = None
+        self._P = None
+        self._t = None
+        self.rejected = 0
+        self._consecutive = 0
+
+    ###########################################################################
+    # Propagates the state to time t (does not change the tracker)
+    ###########################################################################
+    def _propagate(self, t):
+        dt = max(t - self._t, 0.0)
+        F = np.array([[1.0, dt], [0.0, 1.0]])
+        # discrete white noise on the drift rate
+        Q = self._q * np.array([[dt**3 / 3, dt**2 / 2], [dt**2 / 2, dt]])
+        return F @ self._x, F @ self._P @ F.T + Q
+
+    ###########################################################################
+    # Updates the tracker with a new resonance frequency measurement
+    ###########################################################################
+    def update(self, t, frequency, noise_factor=1.0):
+        """
+        :param t: Time of the measurement (s) :type t: float.
+        :param frequency: Measured resonance frequency (Hz) :type frequency: float.
+        :param noise_factor: Measurement std multiplier (e.g. peak cut off at the window edge) :type noise_factor: float.
+        :return: True if the measurement was accepted :rtype: bool.
+        """
+        if not np.isfinite(frequency):
+            return False
+        r = self._r * noise_factor ** 2
+        if self._x is None:
+            self._initialize(t, frequency, r)
+            return True
+        x, P = self._propagate(t)
+        innovation = frequency - x[0]
+        S = P[0, 0] + r
+        if innovation * innovation > self._gate ** 2 * S:
+            self.rejected += 1
+            self._consecutive += 1
+            if self._consecutive >= self._reacquire:
+                # the resonance has moved (not an outlier): restarts on the measurement
+                self._initialize(t, frequency, r)
+                return True
+            # outlier: keeps the prediction only
+            self._x, self._P, self._t = x, P, t
+            return False
+        K = P[:, 0] / S
+        self._x = x + K * innovation
+        self._P = P - np.outer(K, P[0, :])
+        self._t = t
+        self._consecutive = 0
+        return True
+
+    ########################
+    def _initialize(self, t, frequency, r):
+        self._x = np.array([frequency, 0.0])
+        self._P = np.diag([r, Constants.tracking_initial_drift ** 2])
+        self._t = t
+        self._consecutive = 0
+
+    ###########################################################################
+    # Predicted frequency at time t
+    ###########################################################################
+    def predict(self, t):
+        """
+        :param t: Time of the prediction (s) :type t: float.
+        :return: predicted frequency (Hz), or nan if not initialized :rtype: float.
+        """
+        if self._x is None:
+            return np.nan
+        return self._propagate(t)[0][0]
+
+    ###########################################################################
+    # Current estimates
+    ###########################################################################
+    def get_frequency(self):
+        return np.nan if self._x is None else self._x[0]
+
+    def get_drift(self):
+        #:return: drift rate (Hz/s) :rtype: float.
+        return np.nan if self._x is None else self._x[1]
@@ -1,18 +1,29 @@
 from multiprocessing import Queue
 
-from openQCM.core.constants import Constants, SourceType
-from openQCM.processors.Parser import ParserProcess
+from openQCM.core.constants import Constants, SourceType, EstimatorType, DropPolicy
+from openQCM.processors.Parser import ParserProcess, Subscriber
+from openQCM.processors.Publisher import PublisherProcess
 from openQCM.processors.Serial import SerialProcess
+from openQCM.processors.AsyncSerial import AsyncSerialProcess
 from openQCM.processors.SocketClient import SocketProcess
 from openQCM.processors.Calibration import CalibrationProcess
 from openQCM.common.fileStorage import FileStorage
 from openQCM.common.fileManager import FileManager
+from openQCM.common import sessionFile
+from openQCM.common.csvBlockWriter import CSVBlockWriter
+from openQCM.common.sessionJournal import JournalWriter
+from openQCM.common import sessionSegments
+from openQCM.common.sessionCatalog import SessionCatalog
 from openQCM.common.logger import Logger as Log
 from openQCM.core.ringBuffer import RingBuffer
+from openQCM.core.displayChannel import DisplayChannel
+from openQCM.core.metrics import Metrics, MetricsServer, router_samples
+from openQCM.core.queryServer import QueryServer
 import numpy as np
-from time import time, strftime, localtime
-import csv
+from time import time, perf_counter, strftime, localtime
 import os
+import sqlite3
+import threading
 #import pywt
 
 TAG = ""#"[Worker]"
@@ -30,7 +41,9 @@ class Worker:
                       speed = Constants.serial_default_overtone,
                       samples = Constants.argument_default_samples,
                       source = SourceType.serial,
-                      export_enabled = False):
+                      export_enabled = False,
+                      device = 0,
+                      device_ports = None):
         """
         :param port: Port to open on start :type port: str.
         :param speed: Speed for the specified port :type speed: float.
@@ -38,6 +51,8 @@ class Worker:
         :param source: Source type :type source: SourceType.
         :param export_enabled: If true, data will be stored or exported in a file :type export_enabled: bool.
         :param export_path: If specified, defines where the data will be exported :type export_path: str.
+        :param device: Index of the device, 0 for the main one :type device: int.
+        :param device_ports: Ports of the additional devices, main device only (default Constants.multi_device_ports) :type device_ports: str list.
         """
         # data queues
         self._queue1 = Queue()
@@ -46,7 +61,9 @@ class Worker:
         self._queue4 = Queue()
         self._queue5 = Queue()
         self._queue6 = Queue()
-        self._queue_tracking = Queue()  # AUTO-TRACKING queue
+        self._queue_sweep = Queue()  # measurement: one record per sweep
+        self._display_channel = None  # measurement: newest amplitude/phase (display only)
+        self._max_queue_depth = 0  # most sweep records drained at once
         
         # data buffers
         self._data1_buffer = None 
@@ -62,8 +79,14 @@ class Worker:
         self._ser_err_usb= 0
         self._control_k = 0
         self._sampling_time = 0.0
+        self._fit_residual = 0.0
         self._calibration_cancelled = False
 
+        # MULTI-OVERTONE: overtones of the session (selected one first) and
+        # history buffers of the other overtones
+        self._overtones = []
+        self._overtone_buffers = {}
+
         # AUTO-TRACKING variables
         self._tracking_activated = False
         self._tracking_start_freq = None
@@ -74,6 +97,23 @@ class Worker:
         # instances of the processes
         self._acquisition_process = None
         self._parser_process = None
+        # ROUTER: additional consumers of the sweep records (storage, network...)
+        self._subscribers = []
+        # TCP PUBLISHER: streams the sweeps to the connected clients
+        self._publisher_process = None
+        # METRICS: acquisition health of the device, exporter of the session (main device only)
+        self._metrics = None
+        self._metrics_server = None
+        # QUERY API: local HTTP/JSON server (main device only), the lock
+        # makes the appends of a sweep to the history buffers atomic for it
+        self._query_server = None
+        self._history_lock = threading.Lock()
+        # MULTI-DEVICE: Workers of the additional devices (main device only)
+        self._device = device
+        self._device_ports = list(Constants.multi_device_ports) if device_ports is None else list(device_ports)
+        self._devices = []
+        # ASYNC ACQUISITION: process driving all the devices (shared with the additional devices)
+        self._async_process = None
         
         # others
         self._QCS_on = QCS_on # QCS installed on device (unused now)
@@ -100,30 +140,69 @@ class Worker:
 
         # PERSISTENT FILE: File handle for CSV data (kept open during acquisition)
         self._csv_file = None
-        self._csv_writer = None
-        self._flush_counter = 0
-        self._flush_interval = 30  # Flush to disk every N writes (approx 30 seconds)
+        self._csv_writer = None  # CSVBlockWriter: rows formatted and written a block at a time
+        self._session_writer = None  # SESSION FILE: full precision columns (optional)
+        self._session_metadata = {}
+        self._journal = None  # JOURNAL: rows on disk within journal_commit_interval, removed at STOP
+        # ROLLOVER: segment of the session files being written, and the manifest entries
+        self._segment = 1
+        self._segment_base = None
+        self._segment_start = 0
+        self._segments = []
+        # CATALOG: row of the session, summary of the sweeps
+        self._catalog = None
+        self._catalog_id = None
+        self._tracking_events = []
+        self._ranges = [np.inf, -np.inf, np.inf, -np.inf]  # frequency min/max, dissipation min/max
+        self._sweeps = 0
+        self._cutoff_errors = [0, 0]  # sweeps without the left/right cut-off frequency
         
         
     ###########################################################################
     # Starts all processes, based on configuration given in constructor.
     ###########################################################################
-    def start(self):
-
+    def start(self, session = None, async_process = None):
+        """
+        :param session: Session name (CSV filename prefix), additional devices only :type session: str.
+        :param async_process: Asynchronous acquisition process of the main device, additional devices only :type async_process: AsyncSerialProcess.
+        """
         # Generate new CSV filename with current timestamp each time START is pressed
-        self._csv_filename = strftime(Constants.csv_default_prefix, localtime())
+        # (additional devices share the session name of the main one)
+        self._csv_filename = session if session is not None else strftime(Constants.csv_default_prefix, localtime())
 
-        if self._source == SourceType.serial:
+        if self._source in (SourceType.serial, SourceType.SocketClient):
            self._samples = Constants.argument_default_samples
         elif self._source == SourceType.calibration:
            self._samples = Constants.calibration_default_samples
            self._readFREQ = Constants.calibration_readFREQ
         # Setup/reset the internal buffers
         self.reset_buffers(self._samples)
+        # CATALOG: summary of the new session
+        (self._tracking_events, self._ranges) = ([], [np.inf, -np.inf, np.inf, -np.inf])
         # Instantiates process
-        self._parser_process = ParserProcess(self._queue1,self._queue2,self._queue3,self._queue4,self._queue5,self._queue6,self._queue_tracking)
+        # DISPLAY: amplitude and phase coalesced to the newest sweep, unless the sweeps are exported or published
+        self._display_channel = None
+        measurement = self._source in (SourceType.serial, SourceType.SocketClient)
+        publish = measurement and Constants.publisher_enabled
+        if measurement and not self._export and not (publish and Constants.publisher_magnitude):
+            self._display_channel = DisplayChannel(max(Constants.argument_default_samples, Constants.auto_window_max_samples))
+        self._metrics = Metrics(self._device) if measurement and Constants.metrics_enabled else None
+        self._parser_process = ParserProcess(self._queue1,self._queue2,self._queue3,self._queue4,self._queue5,self._queue6,self._queue_sweep,self._display_channel,self._metrics)
+        for subscriber in self._subscribers:
+            self._parser_process.subscribe(subscriber)
+        self._publisher_process = None
+        if publish:
+            subscriber = Subscriber("tcp", DropPolicy.drop_oldest)
+            self._parser_process.subscribe(subscriber)
+            self._publisher_process = PublisherProcess(subscriber, port=Constants.publisher_port + self._device)
         # Checks the type of source
-        if self._source == SourceType.serial:
+        # ASYNC ACQUISITION: the device is added to the process of the main device
+        self._async_process = async_process
+        if self._source == SourceType.serial and self._async_process is None and self._device == 0 and Constants.async_acquisition:
+            self._async_process = AsyncSerialProcess()
+        if self._source == SourceType.serial and self._async_process is not None:
+            self._acquisition_process = self._async_process.add_device(self._parser_process)
+        elif self._source == SourceType.serial:
             self._acquisition_process = SerialProcess(self._parser_process)
         elif self._source == SourceType.calibration:
             self._acquisition_process = CalibrationProcess(self._parser_process)
@@ -151,10 +230,63 @@ class Worker:
                print(TAG, "Savitzky-Golay Filtering")
                print(TAG, "Order of the polynomial fit: {}".format(Constants.SG_order))
                print(TAG, "Size of data window (in samples): {}".format(SG_window_size))
-               print(TAG, "Oversampling using spline interpolation")
-               print(TAG, "Spline points (in samples): {}".format(spline_points-1))
-               print(TAG, "Resolution after oversampling: {}Hz".format((self._readFREQ[-1]-self._readFREQ[0])/(spline_points-1)))
-               
+               estimator = self._acquisition_process.get_estimator_type()
+               if estimator == EstimatorType.lorentzian:
+                  print(TAG, "Lorentzian fit (warm-started from the previous sweep)")
+                  print(TAG, "Maximum function evaluations per sweep: {}".format(Constants.lorentzian_max_nfev))
+               elif estimator == EstimatorType.phase:
+                  print(TAG, "Maximum phase slope by local linear regression (low-CPU mode)")
+                  print(TAG, "Regression window (in samples): {}".format(SG_window_size))
+               else:
+                  print(TAG, "Oversampling using spline interpolation")
+                  print(TAG, "Spline points (in samples): {}".format(spline_points-1))
+                  print(TAG, "Resolution after oversampling: {}Hz".format((self._readFREQ[-1]-self._readFREQ[0])/(spline_points-1)))
+               self._overtones = self._acquisition_process.get_overtones()
+               self.reset_overtone_buffers()
+               self._session_metadata = {'overtone_name': self._overtone_name,
+                                         'overtone_value': float(self._overtone_value),
+                                         'start': float(self._readFREQ[0]),
+                                         'stop': float(self._readFREQ[-1]),
+                                         'fStep': float(self._fStep),
+                                         'samples': int(self._samples),
+                                         'SG_window_size': int(SG_window_size),
+                                         'SG_order': Constants.SG_order,
+                                         'spline_points': int(spline_points),
+                                         'spline_factor': float(spline_factor),
+                                         'estimator': estimator.name,
+                                         'overtones': [int(n) for n in self._overtones],
+                                         'calibration_file': os.path.basename(SerialProcess.get_calibration_path()),
+                                         'peak_frequencies': [float(f) for f in SerialProcess.load_frequencies_file()]}
+               if len(self._overtones) > 1:
+                  print(TAG, "Multi-overtone mode: overtones {} (weights {})".format(self._overtones, [Constants.multi_overtones.get(n, 1.0) for n in self._overtones]))
+               if Constants.auto_window:
+                  print(TAG, "Automatic window sizing: {} bandwidths, {} samples per bandwidth".format(Constants.auto_window_bandwidths, Constants.auto_window_samples_per_bandwidth))
+               if Constants.adaptive_sweep:
+                  print(TAG, "Adaptive sweep: full window every {} sweeps".format(Constants.adaptive_full_sweep_interval))
+                  print(TAG, "Fine sweeps: {} samples over +-{} bandwidths".format(Constants.adaptive_fine_samples-1, Constants.adaptive_fine_bandwidths))
+
+            elif self._source == SourceType.SocketClient:
+               # REMOTE NODE: sweep settings of the node, tracked window included
+               (self._overtone_name,self._overtone_value, self._fStep, self._readFREQ, SG_window_size, spline_points, spline_factor) = self._acquisition_process.get_frequencies(self._samples)
+               self._spline_factor = spline_factor
+               self._overtones = self._acquisition_process.get_overtones()
+               self.reset_overtone_buffers()
+               session = self._acquisition_process.get_session()
+               self._session_metadata = {k: v for (k, v) in session.items() if k not in ('sweep', 'tracking')}
+               self._session_metadata['node'] = "{}:{}".format(self._port, self._speed)
+               if session['tracking'] is not None:
+                  self._queue_data_tracking(tuple(session['tracking']), self._overtones[0])
+               print("")
+               print(TAG, "REMOTE NODE INFORMATION")
+               print(TAG, "Node: {}:{}, session {}".format(self._port, self._speed, session['session']))
+               print(TAG, "Selected frequency: {} - {}Hz".format(self._overtone_name,self._overtone_value))
+               print(TAG, "Frequency start: {}Hz".format(self._readFREQ[0]))
+               print(TAG, "Frequency stop:  {}Hz".format(self._readFREQ[-1]))
+               print(TAG, "Resonance estimator: {}".format(session['estimator']))
+               if len(self._overtones) > 1:
+                  print(TAG, "Multi-overtone mode: overtones {}".format(self._overtones))
+               Log.i(TAG, "Remote node {}:{}, session {}".format(self._port, self._speed, session['session']))
+
             elif self._source == SourceType.calibration:
                print("")
                print(TAG, "MAIN PEAK DETECTION INFORMATION")
@@ -164,14 +296,33 @@ class Worker:
                print(TAG, "Number of samples: {}".format(Constants.calibration_default_samples-1))
                print(TAG, "Sample rate: {}Hz".format(Constants.calibration_fStep))
             print(TAG, 'Training for plot...\n')
-            # Starts processes
-            self._acquisition_process.start()
+            # Starts processes (ASYNC ACQUISITION: started after all the devices are added)
+            if self._async_process is None:
+                self._acquisition_process.start()
             self._parser_process.start()
+            if self._publisher_process is not None:
+                self._publisher_process.start()
 
             # PERSISTENT FILE: Open CSV file for data logging (stays open during acquisition)
-            if self._source == SourceType.serial:
+            if measurement:
                 self._open_csv_file()
 
+            # MULTI-DEVICE: starts the additional devices in the same session
+            if self._source == SourceType.serial and self._device == 0:
+                self._start_devices()
+                if self._async_process is not None:
+                    print(TAG, "Asynchronous acquisition: {} devices in one process, {} DSP workers".format(len(self._devices) + 1, Constants.async_dsp_workers))
+                    Log.i(TAG, "Asynchronous acquisition: {} devices in one process".format(len(self._devices) + 1))
+                    self._async_process.start()
+
+            # METRICS: one exporter for all the devices of the session
+            if self._metrics is not None and self._device == 0:
+                self._start_metrics_server()
+
+            # QUERY API: status and history for the integrations
+            if measurement and Constants.api_enabled and self._device == 0:
+                self._start_query_server()
+
             return True
         else:
             print(TAG, 'Warning: port is not available')
@@ -179,6 +330,72 @@ class Worker:
             return False
 
 
+    ###########################################################################
+    # MULTI-DEVICE: Starts a Worker for each additional device
+    ###########################################################################
+    def _start_devices(self):
+        self._devices = []
+        for port in self._device_ports:
+            device = Worker(QCS_on = self._QCS_on,
+                            port = port,
+                            speed = self._speed,
+                            samples = self._samples,
+                            source = self._source,
+                            export_enabled = self._export,
+                            device = len(self._devices) + 1)
+            print(TAG, "MULTI-DEVICE: starting device {} on port {}".format(device._device, port))
+            Log.i(TAG, "MULTI-DEVICE: starting device {} on port {}".format(device._device, port))
+            if device.start(session = self._csv_filename, async_process = self._async_process):
+                self._devices.append(device)
+            else:
+                print(TAG, "Warning: device port {} is not available".format(port))
+                Log.w(TAG, "Warning: device port {} is not available".format(port))
+
+
+    ###########################################################################
+    # METRICS: Starts the exporter of the session
+    ###########################################################################
+    def _start_metrics_server(self):
+        try:
+            self._metrics_server = MetricsServer(self.collect_metrics)
+        except OSError as e:
+            print(TAG, "Warning: metrics exporter not started ({})".format(e))
+            Log.w(TAG, "Metrics exporter not started ({})".format(e))
+            return
+        self._metrics_server.start()
+        print(TAG, "Metrics on http://{}:{}/metrics".format(*self._metrics_server.address))
+
+    ###########################################################################
+    # QUERY API: Starts the local HTTP/JSON server
+    ###########################################################################
+    def _start_query_server(self):
+        self._query_server = QueryServer(self)
+        try:
+            self._query_server.start()
+        except OSError as e:
+            print(TAG, "Warning: query API not started ({})".format(e))
+            Log.w(TAG, "Query API not started ({})".format(e))
+            self._query_server = None
+            return
+        print(TAG, "Query API on http://{}:{}".format(*self._query_server.address))
+
+    def collect_metrics(self):
+        #:return: samples of this device and of the additional devices, as expected by metrics.render :rtype: list.
+        if self._metrics is None:
+            return []
+        labels = {'device': self._device}
+        samples = self._metrics.collect() + router_samples(self._parser_process, self._device)
+        if self._display_channel is not None:
+            samples.append(("openqcm_dropped_total", "counter", "Sweep records dropped because a consumer fell behind.", "",
+                            dict(labels, subscriber="display"), self._display_channel.dropped))
+        if self._publisher_process is not None:
+            samples.append(("openqcm_dropped_total", "counter", "Sweep records dropped because a consumer fell behind.", "",
+                            dict(labels, subscriber="tcp clients"), self._publisher_process.get_dropped()))
+        for device in self._devices:
+            samples += device.collect_metrics()
+        return samples
+
+
     ###########################################################################
     # Stops all running processes
     ###########################################################################    
@@ -186,6 +403,19 @@ class Worker:
 
         self._acquisition_process.stop()
         self._parser_process.stop()
+        if self._publisher_process is not None:
+            self._publisher_process.stop()
+        if self._metrics_server is not None:
+            self._metrics_server.stop()
+            self._metrics_server = None
+        if self._query_server is not None:
+            self._query_server.stop()
+            self._query_server = None
+        if self._async_process is not None and self._device == 0:
+            self._async_process.stop()
+        # MULTI-DEVICE: stops the additional devices
+        for device in self._devices:
+            device.stop()
         '''
         for process in [self._acquisition_process, self._parser_process]:
             if process is not None and process.is_alive():
@@ -195,6 +425,20 @@ class Worker:
 
         # PERSISTENT FILE: Close CSV file when stopping acquisition
         self._close_csv_file()
+        # CATALOG: summary of the session
+        self._catalog_finish()
+
+        # ROUTER: records lost by the subscribers
+        for subscriber in self._parser_process.get_subscribers():
+            (delivered, dropped) = subscriber.get_stats()
+            print(TAG, "Subscriber {}: {} sweeps delivered, {} dropped".format(subscriber.name, delivered, dropped))
+            Log.i(TAG, "Subscriber {}: {} sweeps delivered, {} dropped".format(subscriber.name, delivered, dropped))
+
+        # DISPLAY: backpressure metrics of the session
+        if self._display_channel is not None:
+            (frames, dropped, depth) = self.get_backpressure()
+            print(TAG, "Display: {} sweeps shown, {} dropped, max queue depth {}".format(frames, dropped, depth))
+            Log.i(TAG, "Display: {} sweeps shown, {} dropped, max queue depth {}".format(frames, dropped, depth))
 
         print(TAG, 'Running processes stopped...')
         print(TAG, 'Processes finished')
@@ -211,18 +455,55 @@ class Worker:
         If it doesn't terminate within timeout, forces termination.
         :param timeout: Maximum seconds to wait :type timeout: float.
         """
-        if self._acquisition_process is not None and self._acquisition_process.is_alive():
+        process = self._get_process()
+        if process is not None and process.is_alive():
             print(TAG, "Waiting for acquisition process to terminate...")
-            self._acquisition_process.join(timeout=timeout)
-            if self._acquisition_process.is_alive():
+            process.join(timeout=timeout)
+            if process.is_alive():
                 print(TAG, "WARNING: Process did not terminate, forcing...")
                 Log.w(TAG, "Acquisition process did not terminate, forcing...")
-                self._acquisition_process.terminate()
-                self._acquisition_process.join(timeout=2.0)
+                process.terminate()
+                process.join(timeout=2.0)
             print(TAG, "Acquisition process terminated")
             Log.i(TAG, "Acquisition process terminated")
+        # ROUTER: delivers the last records (the GUI queue is drained meanwhile,
+        # the router exits once its queues are flushed)
+        if self._parser_process is not None and self._parser_process.is_alive():
+            t_end = time() + Constants.parser_drain_timeout + 1.0
+            while self._parser_process.is_alive() and time() < t_end:
+                self.consume_queue_sweep()
+                self._parser_process.join(timeout=0.05)
+            if self._parser_process.is_alive():
+                Log.w(TAG, "Parser process did not terminate, forcing...")
+                self._parser_process.terminate()
+                self._parser_process.join(timeout=2.0)
+        # TCP PUBLISHER: sweeps lost by the slow clients
+        if self._publisher_process is not None and self._publisher_process.pid is not None:
+            self._publisher_process.join(timeout=timeout)
+            if self._publisher_process.is_alive():
+                self._publisher_process.terminate()
+                self._publisher_process.join(timeout=2.0)
+            print(TAG, "TCP publisher: {} sweeps dropped for slow clients".format(self._publisher_process.get_dropped()))
+            Log.i(TAG, "TCP publisher: {} sweeps dropped for slow clients".format(self._publisher_process.get_dropped()))
+            self._publisher_process = None
+        for device in self._devices:
+            device.wait_for_process(timeout)
         
         
+    ###########################################################################
+    # ROUTER: Adds a consumer of the sweep records, before start
+    ###########################################################################
+    def add_subscriber(self, subscriber):
+        """
+        :param subscriber: Consumer of the sweep records of this device :type subscriber: Subscriber.
+        """
+        self._subscribers.append(subscriber)
+
+    def get_subscribers(self):
+        #:return: additional consumers of the sweep records :rtype: Subscriber list.
+        return self._subscribers
+
+
     ###########################################################################
     # Empties the internal queues, updating data to consumers
     ###########################################################################    
@@ -256,10 +537,30 @@ class Worker:
         while not self._queue6.empty():
             self._queue_data6(self._queue6.get(False))
 
-    def consume_queue_tracking(self):
-        # queue for auto-tracking notifications
-        while not self._queue_tracking.empty():
-            self._queue_data_tracking(self._queue_tracking.get(False))
+    def consume_queue_sweep(self):
+        # queue for the measurement: one record per sweep (lossless)
+        depth = 0
+        while not self._queue_sweep.empty():
+            self._queue_sweep_record(self._queue_sweep.get(False))
+            depth += 1
+        self._max_queue_depth = max(self._max_queue_depth, depth)
+        # DISPLAY: newest amplitude and phase only
+        if self._display_channel is not None:
+            frame = self._display_channel.get()
+            if frame is not None:
+                self._queue_data1(frame[0])
+                self._queue_data2(frame[1])
+
+    def consume_devices(self):
+        # MULTI-DEVICE: all the queues of the additional devices
+        for device in self._devices:
+            device.consume_queue1()
+            device.consume_queue2()
+            device.consume_queue3()
+            device.consume_queue4()
+            device.consume_queue5()
+            device.consume_queue6()
+            device.consume_queue_sweep()
 
     ###########################################################################
     # Adds data to internal buffers.
@@ -320,24 +621,88 @@ class Worker:
         self._ser_err_usb = data[3]
         if len(data) > 4:
             self._sampling_time = data[4]
+        if len(data) > 5:
+            self._fit_residual = data[5]
 
     #####
-    def _queue_data_tracking(self, data):
+    def _queue_sweep_record(self, record):
+        """
+        Adds the results of a sweep to the buffers and to the CSV file.
+        :param record: Results of the sweep :type record: SweepRecord.
+        """
+        # METRICS: from the acquisition to the GUI tick
+        if self._metrics is not None and record.acquired is not None:
+            self._metrics.observe("display", max(0.0, time() - record.acquired))
+        # CATALOG: summary of the session
+        self._sweeps += 1
+        self._cutoff_errors[0] += record.err1
+        self._cutoff_errors[1] += record.err2
+        # AUTO-TRACKING: the sweep moved the window
+        if record.tracking is not None:
+            self._queue_data_tracking(record.tracking, record.overtone)
+        # amplitude and phase (full window sweeps of the selected overtone)
+        if record.amplitude is not None:
+            self._queue_data1(record.amplitude)
+            self._queue_data2(record.phase)
+        # resonance frequency, dissipation and temperature
+        if record.frequency is not None:
+            self._queue_sweep_values(record)
+        self._queue_data6([record.err1, record.err2, record.sweep, record.usb_errors,
+                           record.sampling_time, record.fit_residual])
+
+    #####
+    def _queue_sweep_values(self, record):
+        #:param record: Results of the sweep :type record: SweepRecord.
+        t = record.timestamp
+        if self._flag and ~np.isnan(record.temperature):
+            self._timestart = t  # microsecond timestamp from SerialProcess
+            self._flag = False
+        # MULTI-OVERTONE: other overtones go to their own buffers, one row per overtone in the file
+        with self._history_lock:
+            if record.overtone != self._overtones[0]:
+                buffers = self._overtone_buffers[record.overtone]
+                for (buffer, value) in zip(buffers, (t, record.frequency, t, record.dissipation)):
+                    buffer.append(value)
+            else:
+                self._queue_data3([t, record.frequency])
+                self._queue_data4([t, record.dissipation])
+                self._queue_data5([t, record.temperature])
+                # CATALOG: ranges of the session (NaN never compares)
+                ranges = self._ranges
+                if record.frequency < ranges[0]:
+                    ranges[0] = record.frequency
+                if record.frequency > ranges[1]:
+                    ranges[1] = record.frequency
+                if record.dissipation < ranges[2]:
+                    ranges[2] = record.dissipation
+                if record.dissipation > ranges[3]:
+                    ranges[3] = record.dissipation
+        if len(self._overtones) > 1:
+            self._write_csv_row((t - self._timestart) / 1e6, record.temperature, record.frequency,
+                                record.dissipation, t, 2 * record.overtone + 1)
+
+    #####
+    def _queue_data_tracking(self, tracking, overtone):
         """
         AUTO-TRACKING: Process tracking notification data
-        :param data: [activated, start_freq, stop_freq, ref_freq, count]
+        :param tracking: (start_freq, stop_freq, ref_freq, count, samples) :type tracking: tuple.
+        :param overtone: Overtone of the sweep :type overtone: int.
         """
-        self._tracking_activated = data[0]
-        self._tracking_start_freq = data[1]
-        self._tracking_stop_freq = data[2]
-        self._tracking_ref_freq = data[3]
-        self._tracking_count = data[4]
+        # MULTI-OVERTONE: the axis of the amplitude/phase plot follows the selected overtone
+        if overtone != self._overtones[0]:
+            return
+        self._tracking_activated = True
+        (self._tracking_start_freq, self._tracking_stop_freq,
+         self._tracking_ref_freq, self._tracking_count, samples) = tracking
+        # CATALOG: window moves of the session
+        self._tracking_events.append((time(), float(self._tracking_start_freq), float(self._tracking_stop_freq),
+                                      float(self._tracking_ref_freq), int(self._tracking_count)))
         # Update the frequency range for sweep storage and display
-        if self._tracking_activated:
-            samples = self._samples
-            fStep = (self._tracking_stop_freq - self._tracking_start_freq) / (samples - 1)
-            self._readFREQ = np.arange(samples) * fStep + self._tracking_start_freq
-            self._fStep = fStep
+        # (the number of samples changes with the automatic window sizing)
+        self._samples = samples
+        fStep = (self._tracking_stop_freq - self._tracking_start_freq) / (samples - 1)
+        self._readFREQ = np.arange(samples) * fStep + self._tracking_start_freq
+        self._fStep = fStep
 
     ###########################################################################
     # Gets data buffers for plot (Amplitude,Phase,Frequency and Dissipation) 
@@ -390,9 +755,24 @@ class Worker:
         #:return: sampling time in seconds between consecutive sweep cycles.
         return self._sampling_time
 
+    def get_backpressure(self):
+        #:return: sweeps displayed, sweeps dropped by the display channel, most sweep records drained at once :rtype: tuple.
+        if self._display_channel is None:
+            return 0, 0, self._max_queue_depth
+        return self._display_channel.frames, self._display_channel.dropped, self._max_queue_depth
+
+    def get_fit_residual(self):
+        #:return: relative RMS residual of the Lorentzian fit (0 for the spline estimator).
+        return self._fit_residual
+
     def is_calibration_cancelled(self):
         return self._calibration_cancelled
 
+    ##### Checks if the node of the remote acquisition has restarted (acquisition ended)
+    def is_node_restarted(self):
+        #:return: True if the SocketProcess ended on a new session of the node :rtype: bool.
+        return isinstance(self._acquisition_process, SocketProcess) and self._acquisition_process.is_restarted()
+
     ##### AUTO-TRACKING: Gets tracking state
     def get_tracking_state(self):
         """
@@ -414,18 +794,20 @@ class Worker:
     ###########################################################################
     def store_data(self):
         # Checks the type of source
-        if self._source == SourceType.serial:
+        if self._source in (SourceType.serial, SourceType.SocketClient):
           # PERSISTENT FILE: Write to open CSV file instead of opening/closing each time
           # Use acquisition timestamps (microseconds) for accurate relative time
-          relative_time_s = (self._t3_store - self._timestart) / 1e6
-          self._write_csv_row(relative_time_s, self._d3_store, self._d1_store, self._d2_store, self._t3_store)
+          # (multi-overtone mode: rows are written per overtone by _queue_sweep_values)
+          if len(self._overtones) <= 1:
+              relative_time_s = (self._t3_store - self._timestart) / 1e6
+              self._write_csv_row(relative_time_s, self._d3_store, self._d1_store, self._d2_store, self._t3_store)
 
           if self._export:
               # Storing acquired sweeps - use _csv_filename for sweep export path too
               filename = "{}_{}_{}".format(Constants.csv_sweeps_filename, self._overtone_name,self._count)
               #filename = "{}_{}".format(Constants.csv_sweeps_filename,self._count)
               sweep_export_path = "{}{}{}".format(Constants.csv_export_path, Constants.slash, self._csv_filename)
-              path = "{}_{}".format(sweep_export_path, self._overtone_name)
+              path = sessionSegments.segment_name("{}_{}".format(sweep_export_path, self._overtone_name), self._segment)
               #FileStorage.CSV_sweeps_save(filename, path, self._readFREQ, self._data1_buffer, self._data2_buffer)
               FileStorage.TXT_sweeps_save(filename, path, self._readFREQ, self._data1_buffer, self._data2_buffer)
           self._count+=1
@@ -434,14 +816,24 @@ class Worker:
     ###########################################################################
     # PERSISTENT FILE: Opens CSV file for data logging (called at START)
     ###########################################################################
-    def _open_csv_file(self):
+    def _open_csv_file(self, segment=1):
         """
         Opens CSV file once at acquisition start. The file stays open during
         the entire acquisition to avoid Windows file I/O limitations.
+        :param segment: ROLLOVER: segment of the session, 1 at START :type segment: int.
         """
         try:
             # Create the full filename with overtone name
             filenameCSV = "{}_{}".format(self._csv_filename, self._overtone_name)
+            # MULTI-DEVICE: one file per device in the same session
+            if self._device > 0:
+                filenameCSV = "{}_device{}".format(filenameCSV, self._device)
+            # ROLLOVER: segment 1 keeps the session name
+            (self._segment_base, self._segment, self._segment_start) = (filenameCSV, segment, time())
+            if segment == 1:
+                self._segments = []
+                self._catalog_begin()
+            filenameCSV = sessionSegments.segment_name(filenameCSV, segment)
             full_path = FileManager.create_full_path(filenameCSV, extension=Constants.csv_extension, path=Constants.csv_export_path)
 
             print("\n")
@@ -451,14 +843,47 @@ class Worker:
 
             # Open file in write mode (new file each time START is pressed)
             self._csv_file = open(full_path, 'w', newline='')
-            self._csv_writer = csv.writer(self._csv_file)
+            # MULTI-OVERTONE: one session file, the harmonic (1, 3, 5...) in the last column
+            multi = len(self._overtones) > 1
+            self._csv_writer = CSVBlockWriter(self._csv_file, harmonic=multi)
 
             # Write header
-            self._csv_writer.writerow(["Date", "Time", "Relative_time", "Temperature", "Resonance_Frequency", "Dissipation"])
+            header = ["Date", "Time", "Relative_time", "Temperature", "Resonance_Frequency", "Dissipation"]
+            if multi:
+                header.append("Harmonic")
+            self._csv_file.write(",".join(header) + "\r\n")
             self._csv_file.flush()  # Ensure header is written immediately
 
-            # Reset flush counter
-            self._flush_counter = 0
+            # SESSION FILE: same name, full precision columns
+            if Constants.session_file_enabled:
+                session_path = FileManager.create_full_path(filenameCSV, extension=Constants.session_extension, path=Constants.csv_export_path)
+                metadata = dict(self._session_metadata, session=self._csv_filename, device=self._device, port=self._port)
+                self._session_writer = sessionFile.open_writer(session_path, metadata)
+                if self._session_writer is not None:
+                    print(TAG, "SESSION FILE: Storing in: {}".format(session_path))
+                    Log.i(TAG, "SESSION FILE: Storing in: {}".format(session_path))
+
+            # JOURNAL: what is needed to write the files again after a crash
+            if Constants.journal_enabled:
+                journal_path = FileManager.create_full_path(filenameCSV, extension=Constants.journal_extension, path=Constants.csv_export_path)
+                self._journal = JournalWriter(journal_path, {
+                    'csv': full_path, 'header': header, 'harmonic': multi,
+                    'session_file': None if self._session_writer is None else self._session_writer.path,
+                    'session_metadata': dict(self._session_metadata, session=self._csv_filename, device=self._device, port=self._port),
+                    'default_harmonic': 2 * self._overtones[0] + 1})
+                self._journal.start()
+
+            # ROLLOVER: the manifest lists the segments from the second one
+            self._segments.append({'csv': os.path.basename(full_path),
+                                   'session_file': None if self._session_writer is None else os.path.basename(self._session_writer.path),
+                                   'sweeps': os.path.basename(sessionSegments.segment_name("{}{}{}_{}".format(
+                                       Constants.csv_export_path, Constants.slash, self._csv_filename, self._overtone_name), segment)) if self._export else None,
+                                   'rows': 0, 'start': None, 'end': None, 'bytes': 0})
+            if segment > 1:
+                sessionSegments.write_manifest(self._segment_base, Constants.csv_export_path, self._segments, complete=False)
+            self._catalog_files(segment, {'csv': full_path,
+                                          'session_file': None if self._session_writer is None else self._session_writer.path,
+                                          'sweeps': self._segments[-1]['sweeps'] and os.path.join(os.path.dirname(full_path), self._segments[-1]['sweeps'])})
 
         except Exception as e:
             print(TAG, "ERROR: Failed to open CSV file: {}".format(e))
@@ -470,68 +895,165 @@ class Worker:
     ###########################################################################
     # PERSISTENT FILE: Writes a row to the open CSV file with periodic flush
     ###########################################################################
-    def _write_csv_row(self, relative_time, temperature, frequency, dissipation, acq_timestamp_us=None):
+    def _write_csv_row(self, relative_time, temperature, frequency, dissipation, acq_timestamp_us=None, harmonic=None):
         """
-        Writes a single data row to the open CSV file.
-        Flushes to disk every _flush_interval writes (~30 seconds).
+        Adds a data row to the open CSV file. Rows are formatted and written
+        a block at a time (Constants.csv_block_rows rows, or at most
+        Constants.csv_flush_interval seconds), then flushed to disk.
         :param acq_timestamp_us: Acquisition timestamp in microseconds since epoch (from SerialProcess).
+        :param harmonic: Harmonic number, multi-overtone mode only (1, 3, 5...).
         """
         if self._csv_file is None or self._csv_writer is None:
             return
 
+        t = perf_counter()
+        # ROLLOVER: new segment at the first row of a sweep once the segment is full
+        if (harmonic is None or harmonic == 2 * self._overtones[0] + 1) and self._rollover_due():
+            self._close_csv_file(last=False)
+            self._open_csv_file(self._segment + 1)
+            if self._csv_file is None:
+                return
+        segment = self._segments[-1]
+        if segment['start'] is None:
+            segment['start'] = acq_timestamp_us
+        segment['end'] = acq_timestamp_us
+        # SESSION FILE: raw values, before the formatting of the CSV row
+        if self._session_writer is not None and acq_timestamp_us is not None:
+            try:
+                self._session_writer.append(acq_timestamp_us, relative_time, temperature, frequency, dissipation,
+                                            2 * self._overtones[0] + 1 if harmonic is None else harmonic)
+            except (OSError, ValueError) as e:
+                print(TAG, "ERROR: Failed to write session file: {}".format(e))
+                Log.e(TAG, "Failed to write session file: {}".format(e))
+                self._session_writer = None
         try:
-            # Format timestamp from acquisition time (not write time)
-            if acq_timestamp_us is not None:
-                import datetime
-                acq_dt = datetime.datetime.fromtimestamp(acq_timestamp_us / 1e6)
-                csv_date = acq_dt.strftime("%Y-%m-%d")
-                csv_time = acq_dt.strftime("%H:%M:%S") + ".{:03d}".format(acq_dt.microsecond // 1000)
-            else:
-                csv_date = strftime("%Y-%m-%d", localtime())
-                csv_time = strftime("%H:%M:%S", localtime())
-
-            # Format data values
-            d0 = float("{0:.2f}".format(relative_time))
-            d1 = float("{0:.2f}".format(temperature))
-            d2 = float("{0:.2f}".format(frequency))
-
-            # Write row
-            self._csv_writer.writerow([csv_date, csv_time, d0, d1, d2, dissipation])
-
-            # Periodic flush to disk (every ~30 seconds to prevent data loss)
-            self._flush_counter += 1
-            if self._flush_counter >= self._flush_interval:
+            # JOURNAL: packed now, on disk at the next commit
+            if self._journal is not None:
+                self._journal.append(acq_timestamp_us, relative_time, temperature, frequency, dissipation, harmonic)
+            # Date and time from acquisition time (not write time), values
+            # rounded to 2 decimals: formatted when the block is written
+            if self._csv_writer.append(relative_time, temperature, frequency, dissipation, acq_timestamp_us, harmonic):
                 self._csv_file.flush()
-                os.fsync(self._csv_file.fileno())  # Force OS to write to disk
-                self._flush_counter = 0
+                # Block written: the journal keeps the rows safe, else flush to disk
+                if self._journal is None:
+                    os.fsync(self._csv_file.fileno())  # Force OS to write to disk
 
         except Exception as e:
             print(TAG, "ERROR: Failed to write CSV row: {}".format(e))
             Log.e(TAG, "Failed to write CSV row: {}".format(e))
+        # METRICS: row added (and block written and flushed)
+        if self._metrics is not None:
+            self._metrics.observe("storage", perf_counter() - t)
+
+
+    ###########################################################################
+    # CATALOG: session at START, files of each segment, summary at STOP
+    ###########################################################################
+    def _catalog_begin(self):
+        (self._catalog, self._catalog_id) = (None, None)
+        (self._sweeps, self._cutoff_errors) = (0, [0, 0])
+        if not Constants.catalog_enabled:
+            return
+        try:
+            self._catalog = SessionCatalog()
+            self._catalog_id = self._catalog.begin(self.get_session_info(), self._session_metadata)
+        except (sqlite3.Error, OSError) as e:
+            print(TAG, "Warning: session not in the catalog ({})".format(e))
+            Log.w(TAG, "Session not in the catalog ({})".format(e))
+            self._catalog = None
+
+    ########################
+    def _catalog_files(self, segment, files):
+        if self._catalog is None:
+            return
+        try:
+            self._catalog.add_files(self._catalog_id, segment, files)
+        except (sqlite3.Error, OSError) as e:
+            print(TAG, "Warning: files not in the catalog ({})".format(e))
+            Log.w(TAG, "Files not in the catalog ({})".format(e))
+
+    ########################
+    def _catalog_finish(self):
+        if self._catalog is None:
+            return
+        if len(self._segments) > 1:
+            self._catalog_files(None, {'manifest': sessionSegments.manifest_path(self._segment_base, Constants.csv_export_path)})
+        usb_errors = self.get_ser_error()[3]
+        ranges = [float(x) if np.isfinite(x) else None for x in self._ranges]
+        summary = {'sweeps': self._sweeps, 'frequency_min': ranges[0], 'frequency_max': ranges[1],
+                   'dissipation_min': ranges[2], 'dissipation_max': ranges[3],
+                   'cutoff_errors_left': int(self._cutoff_errors[0]), 'cutoff_errors_right': int(self._cutoff_errors[1]),
+                   'usb_errors': int(usb_errors)}
+        try:
+            self._catalog.finish(self._catalog_id, summary, self._tracking_events)
+        except (sqlite3.Error, OSError) as e:
+            print(TAG, "Warning: session summary not in the catalog ({})".format(e))
+            Log.w(TAG, "Session summary not in the catalog ({})".format(e))
+        self._catalog = None
+
+
+    ###########################################################################
+    # ROLLOVER: checks the size and duration of the segment
+    ###########################################################################
+    def _rollover_due(self):
+        #:return: True if the session continues in a new segment :rtype: bool.
+        if Constants.csv_segment_max_mb > 0 and self._csv_writer.size >= Constants.csv_segment_max_mb * 1e6:
+            return True
+        return Constants.csv_segment_hours > 0 and time() - self._segment_start >= Constants.csv_segment_hours * 3600
 
 
     ###########################################################################
     # PERSISTENT FILE: Closes the CSV file (called at STOP)
     ###########################################################################
-    def _close_csv_file(self):
+    def _close_csv_file(self, last=True):
         """
         Closes the CSV file when acquisition stops.
         Ensures all data is flushed to disk before closing.
+        The journal is removed once the files are complete.
+        :param last: ROLLOVER: False if the session continues in a new segment :type last: bool.
         """
+        complete = True
         if self._csv_file is not None:
             try:
+                self._csv_writer.flush()  # last rows of the block
                 self._csv_file.flush()
                 os.fsync(self._csv_file.fileno())  # Force final write to disk
+                if self._segments:
+                    self._segments[-1].update(rows=self._csv_writer.written, bytes=self._csv_file.tell())
                 self._csv_file.close()
                 print(TAG, "PERSISTENT FILE: CSV file closed successfully")
                 Log.i(TAG, "PERSISTENT FILE: CSV file closed successfully")
             except Exception as e:
                 print(TAG, "ERROR: Failed to close CSV file: {}".format(e))
                 Log.e(TAG, "Failed to close CSV file: {}".format(e))
+                complete = False
             finally:
                 self._csv_file = None
                 self._csv_writer = None
-                self._flush_counter = 0
+        # SESSION FILE: last buffered rows
+        if self._session_writer is not None:
+            try:
+                self._session_writer.close()
+            except (OSError, ValueError) as e:
+                print(TAG, "ERROR: Failed to close session file: {}".format(e))
+                Log.e(TAG, "Failed to close session file: {}".format(e))
+                complete = False
+            self._session_writer = None
+        # JOURNAL: kept for recovery at the next start if a file is incomplete
+        if self._journal is not None:
+            try:
+                self._journal.close(discard=complete)
+            except OSError as e:
+                print(TAG, "ERROR: Failed to close journal: {}".format(e))
+                Log.e(TAG, "Failed to close journal: {}".format(e))
+            self._journal = None
+        # ROLLOVER: segments of the session
+        if last and len(self._segments) > 1:
+            try:
+                sessionSegments.write_manifest(self._segment_base, Constants.csv_export_path, self._segments, complete=True)
+            except OSError as e:
+                print(TAG, "ERROR: Failed to write manifest: {}".format(e))
+                Log.e(TAG, "Failed to write manifest: {}".format(e))
 
 
     ###########################################################################
@@ -539,7 +1061,17 @@ class Worker:
     ###########################################################################
     def is_running(self):  
         #:return: True if a process is running :rtype: bool.
-        return self._acquisition_process is not None and self._acquisition_process.is_alive()
+        process = self._get_process()
+        return process is not None and process.is_alive()
+
+    ###########################################################################
+    # Gets the process acquiring the device
+    ###########################################################################
+    def _get_process(self):
+        #:return: asynchronous acquisition process if any, the acquisition process otherwise :rtype: multiprocessing.Process.
+        if self._async_process is not None:
+            return self._async_process
+        return self._acquisition_process
 
 
     ###########################################################################
@@ -615,7 +1147,9 @@ class Worker:
         self._ser_error2 = 0
         self._ser_err_usb= 0
         self._sampling_time = 0.0
+        self._fit_residual = 0.0
         self._calibration_cancelled = False
+        self._max_queue_depth = 0
         #self._control_k = 0
         
         self._d1_buffer = RingBuffer(Constants.ring_buffer_samples)  # Resonance frequency 
@@ -624,9 +1158,81 @@ class Worker:
         self._t1_buffer = RingBuffer(Constants.ring_buffer_samples)  # time (Resonance frequency)
         self._t2_buffer = RingBuffer(Constants.ring_buffer_samples)  # time (Dissipation)
         self._t3_buffer = RingBuffer(Constants.ring_buffer_samples)  # time (temperature)
+        self.reset_overtone_buffers()
         #print(TAG,'Buffers cleared')
         #Log.i(TAG, "Buffers cleared") 
 
+    ###########################################################################
+    # MULTI-OVERTONE: Setup/Clear the buffers of the other overtones
+    ###########################################################################
+    def reset_overtone_buffers(self):
+        # [time (frequency), frequency, time (dissipation), dissipation] per overtone
+        self._overtone_buffers = {}
+        for overtone in self._overtones[1:]:
+            self._overtone_buffers[overtone] = [RingBuffer(Constants.ring_buffer_samples) for i in range(4)]
+
+    ############################################################################
+    # MULTI-OVERTONE: Gets the overtones and the buffers of the other overtones
+    ############################################################################
+    def get_overtones(self):
+        #:return: Indexes of the overtones, selected one first :rtype: int list.
+        return self._overtones
+
+    def get_overtone_buffers(self, overtone):
+        #:return: time and frequency, time and dissipation of an overtone (not the selected one) :rtype: tuple.
+        return tuple(b.get_all() for b in self._overtone_buffers[overtone])
+
+    ############################################################################
+    # QUERY API: Snapshots for the server thread
+    ############################################################################
+    def get_history(self, series, overtone=None):
+        """
+        :param series: 'frequency', 'dissipation' or 'temperature' :type series: str.
+        :param overtone: Overtone index, the selected one if None (no temperature for the others) :type overtone: int.
+        :return: times (us since epoch) and values, oldest first :rtype: tuple.
+        """
+        with self._history_lock:
+            if overtone is None or overtone == self._overtones[0]:
+                buffers = {'frequency': (self._t1_buffer, self._d1_buffer),
+                           'dissipation': (self._t2_buffer, self._d2_buffer),
+                           'temperature': (self._t3_buffer, self._d3_buffer)}[series]
+            else:
+                overtone_buffers = self._overtone_buffers[overtone]
+                buffers = {'frequency': overtone_buffers[0:2], 'dissipation': overtone_buffers[2:4]}[series]
+            (t, v) = (buffers[0].get_partial(), buffers[1].get_partial())
+        # the views are never written again: read outside the lock
+        return t[::-1], v[::-1]
+
+    def get_session_info(self):
+        #:return: metadata of the session :rtype: dict.
+        return {'session': self._csv_filename,
+                'source': self._source.name,
+                'port': self._port,
+                'device': self._device,
+                'devices': [self._port] + [device._port for device in self._devices] if self._device == 0 else [self._port],
+                'overtone_name': self._overtone_name,
+                'overtone_value': None if self._overtone_value is None else float(self._overtone_value),
+                'overtones': [int(n) for n in self._overtones],
+                'history_size': Constants.ring_buffer_samples,
+                'export': self._export}
+
+    def get_window_info(self):
+        #:return: current sweep window, moved by the auto-tracking :rtype: dict.
+        readFREQ = self._readFREQ
+        return {'start': None if readFREQ is None else float(readFREQ[0]),
+                'stop': None if readFREQ is None else float(readFREQ[-1]),
+                'step': None if self._fStep is None else float(self._fStep),
+                'samples': None if readFREQ is None else len(readFREQ),
+                'reference': None if self._tracking_ref_freq is None else float(self._tracking_ref_freq),
+                'tracking_count': int(self._tracking_count)}
+
+    ############################################################################
+    # MULTI-DEVICE: Gets the Workers of the additional devices
+    ############################################################################
+    def get_devices(self):
+        #:return: Workers of the additional devices, in port order :rtype: Worker list.
+        return self._devices
+
     ############################################################################
     # Gets frequency range
     ############################################################################
@@ -0,0 +1,197 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from time import time
+
+import numpy as np
+
+from openQCM.core.constants import Constants, EstimatorType
+from openQCM.processors.Serial import SerialProcess, savitzky_golay, spline_estimation
+from openQCM.common.logger import Logger as Log
+
+TAG = ""#"[AsyncSerial]"
+
+
+###############################################################################
+# DSP pool job: filtering and spline estimation of a sweep (no process state)
+###############################################################################
+def spline_kernel(freq, mag_corrected, SG_window_size, Spline_points, Spline_factor):
+    """
+    :param freq: Frequencies of the sweep (Hz) :type freq: float list.
+    :param mag_corrected: Baseline corrected amplitude (dB) :type mag_corrected: float list.
+    :param SG_window_size: Size of the Savitzky-Golay window :type SG_window_size: int.
+    :param Spline_points: Number of spline points :type Spline_points: int.
+    :param Spline_factor: Spline smoothing factor :type Spline_factor: float.
+    :return: filtered amplitude, spline estimate and error flags, as expected by SerialProcess.elaborate :rtype: tuple.
+    """
+    filtered_mag = savitzky_golay(mag_corrected, window_size = SG_window_size, order = Constants.SG_order)
+    (resonance, bandwidth, Qfac, err1, err2) = spline_estimation(freq, filtered_mag, Spline_points, Spline_factor)
+    return filtered_mag, (resonance, bandwidth, Qfac), err1, err2
+
+
+###############################################################################
+# Process driving several serial devices with asyncio
+# Each device keeps its own SerialProcess (processing state and parser), the
+# sweeps of all the devices are read concurrently in one event loop and the
+# spline estimation runs in a process pool shared by the devices
+###############################################################################
+class AsyncSerialProcess(multiprocessing.Process):
+
+    ###########################################################################
+    # Initializing values for process
+    ###########################################################################
+    def __init__(self):
+        multiprocessing.Process.__init__(self)
+        self._exit = multiprocessing.Event()
+        self._devices = []
+
+    ###########################################################################
+    # Adds a device (before starting the process)
+    ###########################################################################
+    def add_device(self, parser_process):
+        """
+        :param parser_process: Reference to the ParserProcess of the device :type parser_process: ParserProcess.
+        :return: processing state of the device, to be opened as a SerialProcess (not started) :rtype: SerialProcess.
+        """
+        device = SerialProcess(parser_process)
+        self._devices.append(device)
+        return device
+
+    ###########################################################################
+    # Runs the event loop of all the devices
+    ###########################################################################
+    def run(self):
+        print(TAG, "Asynchronous acquisition of {} devices".format(len(self._devices)))
+        Log.i(TAG, "Asynchronous acquisition of {} devices".format(len(self._devices)))
+        asyncio.run(self._acquire_all())
+
+    async def _acquire_all(self):
+        pool = None
+        if Constants.async_dsp_workers > 0:
+            pool = ProcessPoolExecutor(Constants.async_dsp_workers)
+        try:
+            # a failing device does not stop the others
+            await asyncio.gather(*[self._acquire(device, pool) for device in self._devices], return_exceptions=True)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+    ###########################################################################
+    # Sweeps loop of a device (same steps as SerialProcess.run)
+    ###########################################################################
+    async def _acquire(self, device, pool):
+        """
+        :param device: Processing state of the device :type device: SerialProcess.
+        :param pool: DSP process pool, None to estimate in the event loop :type pool: ProcessPoolExecutor.
+        """
+        if not device._is_port_available(device._serial.port) or device._serial.isOpen():
+            device._parser_sweep.close()
+            return
+        loop = asyncio.get_running_loop()
+        # INITIALIZES baseline, sweep window, estimators, smoothers and tracker
+        device.setup_processing(Constants.argument_default_samples)
+        device._serial.open()
+        print(TAG, "Capturing raw data on port {}...".format(device._serial.port))
+        timestamp = time()
+        data_temp = 0.0
+        k = 0
+        while not self._is_stopped(device):
+            # MULTI-OVERTONE: selects the overtone of the next sweep
+            device._select_channel(device._scheduler.next())
+            sweep_start_time = time()
+            # ADAPTIVE SWEEP: full overtone window or fine window around the peak
+            (sweep_start, sweep_stop, sweep_step, sweep_freq, sweep_samples, sweep_spline_points, device._full_sweep) = device.next_sweep_window(time())
+            # data reset for new sweep
+            data_mag = np.zeros(sweep_samples)
+            data_ph = np.zeros(sweep_samples)
+            try:
+                device._serial.write(device.sweep_command(sweep_start, sweep_stop, sweep_step))
+                buffer = await self._read_sweep(device)
+                if buffer is None:
+                    break
+                (data_mag, data_ph, data_temp) = device.parse_sweep(buffer, sweep_samples)
+            except ValueError:
+                print(TAG, "WARNING (ValueError): convert raw to float failed", end='\r')
+            except Exception:
+                print(TAG, "WARNING (ValueError): convert raw to float failed", end='\r')
+                device._flag_error_usb += 1
+            device._read_time = time() - sweep_start_time
+
+            sweep_failed = False
+            try:
+                estimate = None
+                # DSP POOL: filtering and spline estimation in another process
+                if pool is not None and device._estimator_type == EstimatorType.spline:
+                    (mag_baseline, phase_baseline) = device._baseline.get(sweep_freq)
+                    estimate = await loop.run_in_executor(pool, spline_kernel, sweep_freq, data_mag - mag_baseline,
+                                                          device._SG_window_size, sweep_spline_points, device._Spline_factor)
+                device.elaborate(device._channel.sweeps, device._coeffs_all, sweep_freq, sweep_samples, data_mag, data_ph, data_temp,
+                                 device._SG_window_size, sweep_spline_points, device._Spline_factor, timestamp, estimate)
+            except Exception:
+                device._flag_error = 1
+                sweep_failed = True
+            # ADDS errors and timing, refreshes error variables
+            device.end_sweep(k, sweep_failed, sweep_start_time)
+            k += 1
+        # CLOSES serial port
+        device._serial.close()
+        # ROUTER: no more sweep records
+        device._parser_sweep.close()
+
+    ###########################################################################
+    # Reads a sweep without blocking the other devices
+    ###########################################################################
+    async def _read_sweep(self, device):
+        """
+        :param device: Processing state of the device :type device: SerialProcess.
+        :return: the sweep as sent by the device, None if the acquisition is stopped :rtype: str.
+        """
+        buffer = ''
+        while 's' not in buffer:
+            if self._is_stopped(device):
+                return None
+            waiting = device._serial.inWaiting()
+            if waiting == 0:
+                await self._wait_readable(device._serial)
+                continue
+            buffer += device._serial.read(waiting).decode(Constants.app_encoding)
+        return buffer
+
+    ###########################################################################
+    # Waits for data on the serial port
+    ###########################################################################
+    @staticmethod
+    async def _wait_readable(port):
+        """
+        Waits on the file descriptor of the port where the event loop supports it
+        (POSIX tty), otherwise polls every Constants.serial_poll_interval.
+        :param port: Serial port :type port: serial.Serial.
+        """
+        loop = asyncio.get_running_loop()
+        readable = loop.create_future()
+        try:
+            fd = port.fileno()
+            loop.add_reader(fd, lambda: readable.done() or readable.set_result(None))
+        except (AttributeError, NotImplementedError, OSError, ValueError):
+            await asyncio.sleep(Constants.serial_poll_interval)
+            return
+        try:
+            # wakes up periodically to check for a stop request
+            await asyncio.wait_for(readable, Constants.async_read_timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            loop.remove_reader(fd)
+
+    ###########################################################################
+    # True if the acquisition, or the acquisition of the device, is stopped
+    ###########################################################################
+    def _is_stopped(self, device):
+        return self._exit.is_set() or device._exit.is_set()
+
+    ###########################################################################
+    # Stops acquiring data
+    ###########################################################################
+    def stop(self):
+        #Signals the process to stop acquiring data.
+        self._exit.set()
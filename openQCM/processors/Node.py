@@ -0,0 +1,204 @@
+import argparse
+import multiprocessing
+import os
+from collections import deque
+from time import sleep, strftime, localtime
+
+from openQCM.core.constants import Constants, DropPolicy
+from openQCM.core.metrics import Metrics, MetricsServer, router_samples
+from openQCM.processors.Parser import ParserProcess, Subscriber
+from openQCM.processors.Publisher import PublisherProcess, FRAME_RESUME, encode_record, encode_session, decode_resume
+from openQCM.processors.Serial import SerialProcess
+from openQCM.common.logger import Logger as Log
+
+
+TAG = ""#"[Node]"
+
+###############################################################################
+# Server of the node: whole sweep records to the remote GUIs, with replay
+###############################################################################
+class NodeProcess(PublisherProcess):
+    """
+    Remote acquisition server. A GUI receives the session first, then says
+    which sweep it received last: the node replays the following ones from
+    its history and streams the new ones. Sweeps are never dropped for a
+    GUI; a GUI too far behind is disconnected and resumes on reconnection.
+    """
+
+    ###########################################################################
+    # Initializing values for process
+    ###########################################################################
+    def __init__(self, subscriber, session, host, port):
+        """
+        :param subscriber: Subscriber of the router delivering the sweep records (lossless) :type subscriber: Subscriber.
+        :param session: Acquisition settings sent to the GUIs :type session: dict.
+        :param host: Address to listen on :type host: str.
+        :param port: Port to listen on :type port: int.
+        """
+        PublisherProcess.__init__(self, subscriber, host, port, False)
+        self._client_buffer = Constants.SocketClient.client_buffer
+        self._lossless = True
+        self._session = dict(session)
+        # REPLAY: frames of the last sweeps (sweep, frames), newest last
+        self._history = deque()
+        self._history_size = 0
+
+    ###########################################################################
+    # Frames of a sweep: the whole record, kept for the replay
+    ###########################################################################
+    def _encode(self, record):
+        frames = encode_record(record)
+        self._history.append((record.sweep, frames))
+        self._history_size += len(frames)
+        while self._history_size > Constants.SocketClient.replay_bytes and len(self._history) > 1:
+            self._history_size -= len(self._history.popleft()[1])
+        # window of the sweep for the GUIs connecting later
+        self._session['sweep'] = record.sweep
+        if record.tracking is not None and record.overtone == self._session['overtones'][0]:
+            self._session['tracking'] = list(record.tracking)
+        return frames
+
+    ###########################################################################
+    # GUIs: session on connection, replay on resume
+    ###########################################################################
+    def _connected(self, client):
+        client.push(encode_session(self._session))
+
+    def _received(self, client, payload):
+        if payload[0] != FRAME_RESUME:
+            return
+        sweep = decode_resume(payload)
+        missed = [frames for (k, frames) in self._history if k > sweep]
+        if self._history and self._history[0][0] > sweep + 1:
+            print(TAG, "WARNING: sweeps {} to {} are no longer available for {}:{}".format(
+                sweep + 1, self._history[0][0] - 1, *client.address[:2]))
+            Log.w(TAG, "Sweeps {} to {} are no longer available for {}:{}".format(
+                sweep + 1, self._history[0][0] - 1, *client.address[:2]))
+        for frames in missed:
+            client.push(frames)
+        client.ready = True
+        Log.i(TAG, "GUI {}:{} resumed after sweep {} ({} sweeps replayed)".format(
+            client.address[0], client.address[1], sweep, len(missed)))
+
+
+###############################################################################
+# Headless acquisition node: device, router and server, no GUI
+###############################################################################
+class Node:
+
+    ###########################################################################
+    # Creates the processes of the node
+    ###########################################################################
+    def __init__(self, port, speed, host, listen_port):
+        """
+        :param port: Serial port of the device :type port: str.
+        :param speed: Overtone frequency, as listed by SerialProcess.get_speeds :type speed: str.
+        :param host: Address to listen on for the GUIs :type host: str.
+        :param listen_port: Port to listen on for the GUIs :type listen_port: int.
+        """
+        self._port = port
+        self._speed = speed
+        self._host = host
+        self._listen_port = listen_port
+        self._parser_process = None
+        self._acquisition_process = None
+        self._node_process = None
+        self._metrics = None
+        self._metrics_server = None
+
+    ###########################################################################
+    # Opens the device and starts acquiring and serving
+    ###########################################################################
+    def start(self):
+        #:return: True if the device was opened :rtype: bool.
+        queues = [multiprocessing.Queue() for i in range(6)]
+        # METRICS: health of the unattended node
+        self._metrics = Metrics() if Constants.metrics_enabled else None
+        self._parser_process = ParserProcess(*queues, metrics=self._metrics)
+        subscriber = Subscriber("remote", DropPolicy.lossless)
+        self._parser_process.subscribe(subscriber)
+        self._acquisition_process = SerialProcess(self._parser_process)
+        if not self._acquisition_process.open(port=self._port, speed=self._speed):
+            print(TAG, "Warning: port {} is not available".format(self._port))
+            Log.w(TAG, "Warning: port {} is not available".format(self._port))
+            return False
+        samples = Constants.argument_default_samples
+        (overtone_name, overtone_value, fStep, readFREQ, SG_window_size, spline_points, spline_factor) = self._acquisition_process.get_frequencies(samples)
+        session = {'session': "{}-{}".format(strftime(Constants.csv_default_prefix, localtime()), os.getpid()),
+                   'sweep': -1,
+                   'overtone_name': overtone_name,
+                   'overtone_value': float(overtone_value),
+                   'fStep': float(fStep),
+                   'start': float(readFREQ[0]),
+                   'samples': samples,
+                   'SG_window_size': int(SG_window_size),
+                   'spline_points': int(spline_points),
+                   'spline_factor': float(spline_factor),
+                   'estimator': self._acquisition_process.get_estimator_type().name,
+                   'overtones': self._acquisition_process.get_overtones(),
+                   'tracking': None}
+        self._node_process = NodeProcess(subscriber, session, self._host, self._listen_port)
+        self._node_process.start()
+        self._parser_process.start()
+        self._acquisition_process.start()
+        if self._metrics is not None:
+            self._metrics_server = MetricsServer(lambda: self._metrics.collect() + router_samples(self._parser_process))
+            self._metrics_server.start()
+            print(TAG, "Metrics on http://{}:{}/metrics".format(*self._metrics_server.address))
+        print(TAG, "Node: {} {} on {}, GUIs on {}:{}".format(overtone_name, overtone_value, self._port, self._host, self._listen_port))
+        Log.i(TAG, "Node: {} {} on {}, GUIs on {}:{}".format(overtone_name, overtone_value, self._port, self._host, self._listen_port))
+        return True
+
+    ###########################################################################
+    # Runs until interrupted or the device stops
+    ###########################################################################
+    def run(self):
+        if not self.start():
+            return
+        try:
+            while self._acquisition_process.is_alive():
+                sleep(0.5)
+        except KeyboardInterrupt:
+            pass
+        self.stop()
+
+    ###########################################################################
+    # Stops the processes, once the last sweeps are routed
+    ###########################################################################
+    def stop(self):
+        self._acquisition_process.stop()
+        self._acquisition_process.join(Constants.process_join_timeout_ms / 1000)
+        self._parser_process.stop()
+        self._parser_process.join(Constants.parser_drain_timeout + 1.0)
+        self._node_process.stop()
+        self._node_process.join(Constants.process_join_timeout_ms / 1000)
+        for process in (self._acquisition_process, self._parser_process, self._node_process):
+            if process.is_alive():
+                process.terminate()
+        if self._metrics_server is not None:
+            self._metrics_server.stop()
+        print(TAG, "Node stopped")
+        Log.i(TAG, "Node stopped")
+
+
+###############################################################################
+# Runs a node, e.g. python -m openQCM.processors.Node --port /dev/ttyACM0
+###############################################################################
+if __name__ == '__main__':
+    multiprocessing.freeze_support()
+    speeds = SerialProcess.get_speeds()
+    ports = SerialProcess.get_ports()
+    parser = argparse.ArgumentParser(description='openQCM Q-1 headless acquisition node')
+    parser.add_argument("-p", "--port", default=ports[0] if ports else None,
+                        help="Serial port of the device")
+    parser.add_argument("-s", "--speed", default=speeds[-1] if speeds else None,
+                        help="Overtone frequency, one of {}".format(speeds))
+    parser.add_argument("--host", default="0.0.0.0",
+                        help="Address to listen on for the GUIs")
+    parser.add_argument("--listen-port", type=int, default=Constants.SocketClient.port_default[0],
+                        help="Port to listen on for the GUIs")
+    parser.add_argument("--metrics", action="store_true",
+                        help="Serves the acquisition health on http://{}:{}/metrics".format(Constants.metrics_host, Constants.metrics_port))
+    args = parser.parse_args()
+    Constants.metrics_enabled = Constants.metrics_enabled or args.metrics
+    Node(args.port, args.speed, args.host, args.listen_port).run()
@@ -1,13 +1,103 @@
 import multiprocessing
+from queue import Empty, Full
+from time import perf_counter
+
+from openQCM.core.constants import Constants, DropPolicy
 from openQCM.common.logger import Logger as Log
 
 
 TAG = ""#"[Parser]"
 
 ###############################################################################
-# Process to parse incoming data and distribute it to worker
+# Consumer of the sweep records: its own queue and drop policy
+###############################################################################
+class Subscriber(object):
+    """
+    Output of the router (GUI, storage, archive, network...). Bounded queues
+    lose records by the drop policy when the consumer falls behind, so it
+    never slows the acquisition or the other subscribers. The counters are
+    shared with the router process.
+    """
+
+    #######################
+    def __init__(self, name, policy=DropPolicy.drop_oldest, maxsize=None, queue=None):
+        """
+        :param name: Name of the subscriber (logs) :type name: str.
+        :param policy: What is lost when the consumer falls behind :type policy: DropPolicy.
+        :param maxsize: Records queued at most, bounded policies only (default Constants.parser_subscriber_maxsize) :type maxsize: int.
+        :param queue: Queue to deliver to, a new one if None :type queue: multiprocessing Queue.
+        """
+        self.name = name
+        self.policy = policy
+        if queue is None:
+            if policy == DropPolicy.lossless:
+                queue = multiprocessing.Queue()
+            else:
+                queue = multiprocessing.Queue(maxsize or Constants.parser_subscriber_maxsize)
+        self.queue = queue
+        self._delivered = multiprocessing.RawValue('L', 0)
+        self._dropped = multiprocessing.RawValue('L', 0)
+
+    ########################
+    def deliver(self, record):
+        # router side: queues the record without ever blocking
+        if self.policy == DropPolicy.lossless:
+            self.queue.put(record)
+        else:
+            try:
+                self.queue.put(record, False)
+            except Full:
+                self._dropped.value += 1
+                if self.policy == DropPolicy.drop_newest:
+                    return
+                try:
+                    # the oldest record makes room (already counted)
+                    self.queue.get(False)
+                except Empty:
+                    # not readable yet: the new record is the one lost
+                    return
+                try:
+                    self.queue.put(record, False)
+                except Full:
+                    self._dropped.value += 1
+                    return
+        self._delivered.value += 1
+
+    ########################
+    def close(self):
+        # router side, on exit: records of a bounded queue may be lost, the
+        # router must not wait for a stalled consumer to read them
+        if self.policy != DropPolicy.lossless:
+            self.queue.cancel_join_thread()
+
+    ########################
+    def get_stats(self):
+        #:return: records delivered and dropped :rtype: tuple.
+        return self._delivered.value, self._dropped.value
+
+    ########################
+    def get_depth(self):
+        #:return: records waiting in the queue (0 where the platform cannot tell) :rtype: int.
+        return _depth(self.queue)
+
+
+def _depth(queue):
+    try:
+        return queue.qsize()
+    except NotImplementedError:
+        return 0
+
+
+###############################################################################
+# Process routing the sweep records from the acquisition to the subscribers
 ###############################################################################
 class ParserProcess(multiprocessing.Process):
+    """
+    The acquisition puts each sweep record once; the router fans it out to the
+    subscribers. Calibration data still goes straight to the queues 1-6, and
+    the display channel is written by the acquisition process, so the arrays
+    are never copied to the router.
+    """
     
     
     ###########################################################################
@@ -19,12 +109,18 @@ class ParserProcess(multiprocessing.Process):
                        data_queue4,
                        data_queue5,
                        data_queue6,
-                       data_queue_tracking=None):
+                       data_queue_sweep=None,
+                       display_channel=None,
+                       metrics=None):
         """
         :param data_queue{i}: References to queue where processed data will be put.
         :type data_queue{i}: multiprocessing Queue.
-        :param data_queue_tracking: Reference to queue for auto-tracking notifications.
-        :type data_queue_tracking: multiprocessing Queue.
+        :param data_queue_sweep: Reference to queue for the sweep records of the GUI (measurement, lossless).
+        :type data_queue_sweep: multiprocessing Queue.
+        :param display_channel: Channel for the amplitude and phase of the sweeps, if only displayed.
+        :type display_channel: DisplayChannel.
+        :param metrics: Acquisition health of the device, if exported.
+        :type metrics: Metrics.
         """
         multiprocessing.Process.__init__(self)
         self._exit = multiprocessing.Event()
@@ -35,7 +131,15 @@ class ParserProcess(multiprocessing.Process):
         self._out_queue4 = data_queue4
         self._out_queue5 = data_queue5
         self._out_queue6 = data_queue6
-        self._out_queue_tracking = data_queue_tracking  # AUTO-TRACKING queue
+        self._display_channel = display_channel  # newest amplitude/phase only
+        self._metrics = metrics
+
+        # ROUTER: one record per sweep in, one queue per subscriber out
+        self._in_queue = multiprocessing.Queue()
+        self._subscribers = []
+        if data_queue_sweep is not None:
+            # the GUI writes the CSV file: it gets every record
+            self.subscribe(Subscriber("gui", DropPolicy.lossless, queue=data_queue_sweep))
 
         #print(TAG, 'Process ready')
         #Log.d(TAG, "Process ready")
@@ -91,92 +195,81 @@ class ParserProcess(multiprocessing.Process):
         """
         self._out_queue6.put(data)
 
-    def add_tracking(self, data):
+    def add_sweep(self, record):
         """
-        Adds auto-tracking notification data to tracking queue.
-        :param data: Tracking data [activated, start_freq, stop_freq, ref_freq, count].
-        :type data: list.
+        Adds the results of a sweep to the router. If they are only displayed,
+        amplitude and phase go to the display channel (newest sweep only).
+        :param record: Results of the sweep.
+        :type record: SweepRecord.
         """
-        if self._out_queue_tracking is not None:
-            self._out_queue_tracking.put(data)
+        if self._display_channel is not None and record.amplitude is not None:
+            self._display_channel.put(record.amplitude, record.phase)
+            record.amplitude = None
+            record.phase = None
+        if self._metrics is not None:
+            self._metrics.add_sweep(record)
+        self._in_queue.put(record)
 
-    def stop(self):
+    def close(self):
         """
-        Signals the process to stop parsing data.
-        :return:
-        """
-        #print(TAG,'Process finishing...')
-        #Log.d(TAG, "Process finishing...")
-        self._exit.set()    
-    '''
-    def run(self):
-        """
-        Process will monitor the internal buffer to parse raw data and distribute to graph and storage, if needed.
-        The process will loop again after timeout if more data is available.
-        :return:
+        Signals that the acquisition has finished: the router stops after
+        delivering the records already added.
         """
-        print(TAG,'Process starting...')
-        Log.d(TAG, "Process starting...")
-        #while not self._exit.is_set():
-            #while not self._in_queue.empty():
-            #      queue = self._in_queue.get(False)#timeout=self._consumer_timeout
-            #      self._out_queue.put((queue))
-            #      print(queue) #DATI SINCRONI
-            #sleep(self._consumer_timeout)
-        # last check on the queue to completely remove data.
-        #self._consume_queue()
-        print(TAG,'Process finished')
-        Log.d(TAG, "Process finished")
-    '''
+        self._in_queue.put(None)
 
-    '''
-    def run(self):
+    ###########################################################################
+    # Subscribers of the sweep records
+    ###########################################################################
+    def subscribe(self, subscriber):
         """
-        Process will monitor the internal buffer to parse raw data and distribute to graph and storage, if needed.
-        The process will loop again after timeout if more data is available.
-        :return:
+        Registers an output of the router, before the process is started.
+        :param subscriber: Consumer of the sweep records.
+        :type subscriber: Subscriber.
         """
-        print(TAG,'Process starting...')
-        Log.d(TAG, "Process starting...")
-        while not self._exit.is_set():
-            self._consume_queue()
-            sleep(self._consumer_timeout)
-        # last check on the queue to completely remove data.
-        self._consume_queue()
-        print(TAG,'Process finished')
-        Log.d(TAG, "Process finished")
+        if self.pid is not None:
+            raise RuntimeError("subscriber {} added after the router started".format(subscriber.name))
+        self._subscribers.append(subscriber)
+
+    def get_subscribers(self):
+        #:return: registered subscribers :rtype: Subscriber list.
+        return self._subscribers
+
+    def get_depth(self):
+        #:return: records waiting to be routed :rtype: int.
+        return _depth(self._in_queue)
 
     def stop(self):
         """
-        Signals the process to stop parsing data.
+        Signals the process to stop routing once no more records arrive.
         :return:
         """
-        print(TAG,'Process finishing...')
-        Log.d(TAG, "Process finishing...")
         self._exit.set()
-        
 
-    def _consume_queue(self):
-        """
-        Consumer method for the queues/process.
-        Used in run method to recall after a stop is requested, to ensure queue is emptied.
-        :return:
-        """
-        while not self._in_queue.empty():
-            queue = self._in_queue.get(timeout=self._consumer_timeout)
-            self._parse_csv(queue)
-
-
-    def _parse_csv(self,line):
+    ###########################################################################
+    # Routes the sweep records until the acquisition closes the router
+    ###########################################################################
+    def run(self):
         """
-        Parses incoming data and distributes to external processes.
-        :param time: Timestamp.
-        :type time: float.
-        :param line: Raw data coming from acquisition process.
-        :type line: basestring.
+        Each record is delivered to all the subscribers. The loop ends when the
+        acquisition closes the router or, after a stop request, when no record
+        arrives for Constants.parser_drain_timeout seconds.
         :return:
         """
-        self._out_queue.put((line))
-        if self._store_reference is not None:
-            self._store_reference.add(line)
-        '''
\ No newline at end of file
+        Log.d(TAG, "Process starting...")
+        while True:
+            try:
+                record = self._in_queue.get(timeout=Constants.parser_drain_timeout)
+            except Empty:
+                if self._exit.is_set():
+                    break
+                continue
+            if record is None:
+                break
+            t = perf_counter()
+            for subscriber in self._subscribers:
+                subscriber.deliver(record)
+            if self._metrics is not None:
+                self._metrics.observe("route", perf_counter() - t)
+        for subscriber in self._subscribers:
+            subscriber.close()
+        Log.d(TAG, "Process finished")
@@ -0,0 +1,486 @@
+import json
+import multiprocessing
+import selectors
+import socket
+import struct
+import sys
+from collections import deque
+from queue import Empty
+
+import numpy as np
+
+from openQCM.core.constants import Constants
+from openQCM.core.sweepRecord import SweepRecord
+from openQCM.common.logger import Logger as Log
+
+
+TAG = ""#"[Publisher]"
+
+###############################################################################
+# Frames of the publisher: 4-byte big-endian payload length, then the payload.
+# The first byte of the payload is the frame type, all numbers are big-endian.
+#   FRAME_VALUES:    type (B), sweep (I), timestamp in us (q), overtone (B),
+#                    frequency in Hz (d), dissipation (d), temperature in C (d)
+#                    (NaN while the smoothers have not seen enough sweeps)
+#   FRAME_MAGNITUDE: type (B), sweep (I), overtone (B), samples (I), then the
+#                    filtered magnitude of the sweep window (float32)
+# Remote acquisition (node to GUI, see Node.py and SocketClient.py):
+#   FRAME_SESSION:   type (B), then the acquisition settings of the node (JSON)
+#   FRAME_RECORD:    type (B), the SweepRecord fields (sweep, timestamp,
+#                    overtone, frequency, dissipation, temperature, err1, err2,
+#                    usb_errors, sampling_time, fit_residual), flags (B),
+#                    samples (I), then amplitude and phase (float64) if
+#                    flags & 1, tracking (start, stop, reference, count,
+#                    samples) if flags & 2
+#   FRAME_RESUME:    type (B), last sweep received (q) (GUI to node)
+###############################################################################
+FRAME_VALUES = 1
+FRAME_MAGNITUDE = 2
+FRAME_SESSION = 3
+FRAME_RECORD = 4
+FRAME_RESUME = 5
+_LENGTH = struct.Struct("!I")
+_VALUES = struct.Struct("!BIqBddd")
+_MAGNITUDE = struct.Struct("!BIBI")
+_RECORD = struct.Struct("!BIqBdddiiiddBI")
+_TRACKING = struct.Struct("!dddii")
+_RESUME = struct.Struct("!Bq")
+_SWEEP_ARRAYS = 1
+_SWEEP_TRACKING = 2
+
+
+def _value(value):
+    # None (not available yet) is sent as NaN
+    return np.nan if value is None else float(value)
+
+
+def _optional(value):
+    # NaN is received as None
+    return None if np.isnan(value) else value
+
+
+def _frame(payload):
+    return _LENGTH.pack(len(payload)) + payload
+
+
+def encode_sweep(record, magnitude=False):
+    """
+    Encodes the results of a sweep as frames.
+    :param record: Results of the sweep :type record: SweepRecord.
+    :param magnitude: If true, the magnitude of the sweep is sent as well, when the record carries it :type magnitude: bool.
+    :return: the frames of the sweep :rtype: bytes.
+    """
+    timestamp = -1 if record.timestamp is None else int(record.timestamp)
+    payload = _VALUES.pack(FRAME_VALUES, record.sweep, timestamp, record.overtone,
+                           _value(record.frequency), _value(record.dissipation), _value(record.temperature))
+    frames = _frame(payload)
+    if magnitude and record.amplitude is not None:
+        samples = np.asarray(record.amplitude, dtype='>f4')
+        frames += _frame(_MAGNITUDE.pack(FRAME_MAGNITUDE, record.sweep, record.overtone, len(samples)) + samples.tobytes())
+    return frames
+
+
+def encode_record(record):
+    """
+    Encodes a whole sweep record (remote acquisition), arrays in full precision.
+    :param record: Results of the sweep :type record: SweepRecord.
+    :return: the frame of the record :rtype: bytes.
+    """
+    flags = 0
+    samples = 0
+    arrays = b''
+    if record.amplitude is not None:
+        flags |= _SWEEP_ARRAYS
+        samples = len(record.amplitude)
+        arrays = np.asarray(record.amplitude, dtype='>f8').tobytes() + np.asarray(record.phase, dtype='>f8').tobytes()
+    tracking = b''
+    if record.tracking is not None:
+        flags |= _SWEEP_TRACKING
+        tracking = _TRACKING.pack(*record.tracking)
+    timestamp = -1 if record.timestamp is None else int(record.timestamp)
+    header = _RECORD.pack(FRAME_RECORD, record.sweep, timestamp, record.overtone,
+                          _value(record.frequency), _value(record.dissipation), _value(record.temperature),
+                          int(record.err1), int(record.err2), int(record.usb_errors),
+                          float(record.sampling_time), float(record.fit_residual), flags, samples)
+    return _frame(header + arrays + tracking)
+
+
+def decode_record(payload):
+    """
+    Decodes the payload of a FRAME_RECORD.
+    :param payload: Payload of the frame, without the length :type payload: bytes.
+    :return: the results of the sweep :rtype: SweepRecord.
+    """
+    record = SweepRecord()
+    (kind, record.sweep, timestamp, record.overtone, frequency, dissipation, temperature,
+     record.err1, record.err2, record.usb_errors, record.sampling_time, record.fit_residual,
+     flags, samples) = _RECORD.unpack_from(payload)
+    record.timestamp = None if timestamp < 0 else timestamp
+    record.frequency = _optional(frequency)
+    record.dissipation = _optional(dissipation)
+    record.temperature = _optional(temperature)
+    offset = _RECORD.size
+    if flags & _SWEEP_ARRAYS:
+        record.amplitude = np.frombuffer(payload, dtype='>f8', count=samples, offset=offset).astype(float)
+        record.phase = np.frombuffer(payload, dtype='>f8', count=samples, offset=offset + 8 * samples).astype(float)
+        offset += 16 * samples
+    if flags & _SWEEP_TRACKING:
+        record.tracking = _TRACKING.unpack_from(payload, offset)
+    return record
+
+
+def encode_session(session):
+    #:param session: Acquisition settings of the node :type session: dict.
+    #:return: the frame of the session :rtype: bytes.
+    return _frame(bytes([FRAME_SESSION]) + json.dumps(session).encode(Constants.app_encoding))
+
+
+def decode_session(payload):
+    #:param payload: Payload of a FRAME_SESSION :type payload: bytes.
+    #:return: acquisition settings of the node :rtype: dict.
+    return json.loads(payload[1:].decode(Constants.app_encoding))
+
+
+def encode_resume(sweep):
+    #:param sweep: Last sweep received, the node sends the following ones :type sweep: int.
+    #:return: the frame of the request :rtype: bytes.
+    return _frame(_RESUME.pack(FRAME_RESUME, sweep))
+
+
+def decode_resume(payload):
+    #:param payload: Payload of a FRAME_RESUME :type payload: bytes.
+    #:return: last sweep received by the GUI :rtype: int.
+    return _RESUME.unpack(payload)[1]
+
+
+def read_frames(buffer):
+    """
+    Extracts the frames received completely, the rest stays in the buffer.
+    :param buffer: Bytes received :type buffer: bytearray.
+    :return: the payloads of the frames :rtype: bytes list.
+    """
+    payloads = []
+    start = 0
+    while len(buffer) - start >= _LENGTH.size:
+        (size,) = _LENGTH.unpack_from(buffer, start)
+        end = start + _LENGTH.size + size
+        if len(buffer) < end:
+            break
+        payloads.append(bytes(buffer[start + _LENGTH.size:end]))
+        start = end
+    del buffer[:start]
+    return payloads
+
+
+def decode_frame(payload):
+    """
+    Decodes the payload of a frame.
+    :param payload: Payload of the frame, without the length :type payload: bytes.
+    :return: the fields of the frame by name, None for an unknown frame type :rtype: dict.
+    """
+    if payload[0] == FRAME_VALUES:
+        (kind, sweep, timestamp, overtone, frequency, dissipation, temperature) = _VALUES.unpack(payload)
+        return {'type': kind, 'sweep': sweep, 'timestamp': timestamp, 'overtone': overtone,
+                'frequency': frequency, 'dissipation': dissipation, 'temperature': temperature}
+    if payload[0] == FRAME_MAGNITUDE:
+        (kind, sweep, overtone, samples) = _MAGNITUDE.unpack_from(payload)
+        magnitude = np.frombuffer(payload, dtype='>f4', count=samples, offset=_MAGNITUDE.size)
+        return {'type': kind, 'sweep': sweep, 'overtone': overtone, 'magnitude': magnitude.astype(float)}
+    return None
+
+
+###############################################################################
+# Connected client: pending sweeps, sent as the socket accepts them
+###############################################################################
+class _Client(object):
+
+    #######################
+    def __init__(self, sock, address, buffer_size, lossless=False):
+        self.sock = sock
+        self.address = address
+        self.buffer_size = buffer_size
+        self.lossless = lossless
+        self.ready = not lossless  # lossless clients first say where to resume
+        self.overflow = False  # lossless client beyond its buffer: disconnected
+        self.received = bytearray()
+        self._pending = deque()  # frames of a sweep per item
+        self._pending_size = 0
+        self._offset = 0  # bytes of the first item already sent
+        self.sent = 0
+        self.dropped = 0
+
+    ########################
+    def push(self, frames):
+        # queues a sweep, dropping the oldest ones beyond the buffer size (the
+        # one being sent is kept whole so the stream stays framed)
+        self._pending.append(frames)
+        self._pending_size += len(frames)
+        if self.lossless:
+            self.overflow = self._pending_size > self.buffer_size
+            return
+        while self._pending_size > self.buffer_size and len(self._pending) > 1:
+            index = 1 if self._offset > 0 else 0
+            self._pending_size -= len(self._pending[index])
+            del self._pending[index]
+            self.dropped += 1
+
+    ########################
+    def send(self):
+        # sends as much as the socket accepts without blocking, the pending
+        # sweeps in one call (up to Constants.publisher_send_size bytes)
+        # :return: True if sweeps are still pending :rtype: bool.
+        while self._pending:
+            batch = []
+            size = 0
+            for frames in self._pending:
+                batch.append(frames)
+                size += len(frames)
+                if size >= Constants.publisher_send_size:
+                    break
+            data = memoryview(b''.join(batch))[self._offset:]
+            try:
+                n = self.sock.send(data)
+            except (BlockingIOError, InterruptedError):
+                return True
+            # removes the sweeps sent whole
+            sent = self._offset + n
+            while self._pending and sent >= len(self._pending[0]):
+                sent -= len(self._pending[0])
+                self._pending_size -= len(self._pending[0])
+                self._pending.popleft()
+                self.sent += 1
+            self._offset = sent
+            if n < len(data):
+                return True
+        return False
+
+
+###############################################################################
+# Process streaming the sweeps of a subscriber of the router to TCP clients
+###############################################################################
+class PublisherProcess(multiprocessing.Process):
+    """
+    Local TCP server for LIMS and dashboards: each sweep is sent to all the
+    connected clients. The sockets are non-blocking and each client has its
+    own buffer, so a slow client loses its oldest sweeps and never stalls the
+    other clients or the acquisition.
+    """
+
+    ###########################################################################
+    # Initializing values for process
+    ###########################################################################
+    def __init__(self, subscriber, host=None, port=None, magnitude=None):
+        """
+        :param subscriber: Subscriber of the router delivering the sweep records :type subscriber: Subscriber.
+        :param host: Address to listen on (default Constants.publisher_host) :type host: str.
+        :param port: Port to listen on (default Constants.publisher_port) :type port: int.
+        :param magnitude: If true, the magnitude sweeps are published as well (default Constants.publisher_magnitude) :type magnitude: bool.
+        """
+        multiprocessing.Process.__init__(self)
+        self._exit = multiprocessing.Event()
+        self._queue = subscriber.queue
+        self._host = Constants.publisher_host if host is None else host
+        self._port = Constants.publisher_port if port is None else port
+        self._magnitude = Constants.publisher_magnitude if magnitude is None else magnitude
+        # sweeps dropped for slow clients, shared with the Worker
+        self._dropped = multiprocessing.RawValue('L', 0)
+        # send buffer of each client, lossless clients are disconnected when full
+        self._client_buffer = Constants.publisher_client_buffer
+        self._lossless = False
+
+    ###########################################################################
+    # Accepts clients and streams the sweeps until a stop call is made
+    ###########################################################################
+    def run(self):
+        try:
+            server = socket.create_server((self._host, self._port))
+        except OSError as e:
+            print(TAG, "WARNING: TCP publisher cannot listen on {}:{} ({})".format(self._host, self._port, e))
+            Log.w(TAG, "TCP publisher cannot listen on {}:{} ({})".format(self._host, self._port, e))
+            return
+        server.setblocking(False)
+        selector = selectors.DefaultSelector()
+        selector.register(server, selectors.EVENT_READ, None)
+        clients = []
+        print(TAG, "TCP publisher listening on {}:{}".format(self._host, self._port))
+        Log.i(TAG, "TCP publisher listening on {}:{}".format(self._host, self._port))
+        while not self._exit.is_set():
+            for (key, events) in selector.select(Constants.publisher_poll_interval):
+                if key.data is None:
+                    self._accept(server, selector, clients)
+                    continue
+                client = key.data
+                if events & selectors.EVENT_READ and not self._receive(client):
+                    self._disconnect(client, selector, clients)
+                elif events & selectors.EVENT_WRITE:
+                    try:
+                        pending = client.send()
+                    except OSError:
+                        # reset while sweeps were pending: only this client is dropped
+                        self._disconnect(client, selector, clients)
+                        continue
+                    if not pending:
+                        selector.modify(client.sock, selectors.EVENT_READ, client)
+            # new sweeps to all the clients
+            while True:
+                try:
+                    record = self._queue.get_nowait()
+                except Empty:
+                    break
+                frames = self._encode(record)
+                for client in clients:
+                    if client.ready:
+                        client.push(frames)
+            for client in list(clients):
+                if client.overflow:
+                    Log.w(TAG, "TCP client {}:{} too slow, disconnected".format(*client.address[:2]))
+                    self._disconnect(client, selector, clients)
+                else:
+                    self._flush(client, selector)
+        for client in list(clients):
+            self._disconnect(client, selector, clients)
+        selector.close()
+        server.close()
+
+    ###########################################################################
+    # Frames of a sweep, received frames and new clients (overridden by the node)
+    ###########################################################################
+    def _encode(self, record):
+        #:param record: Results of the sweep :type record: SweepRecord.
+        #:return: the frames sent to the clients :rtype: bytes.
+        return encode_sweep(record, self._magnitude)
+
+    def _received(self, client, payload):
+        # clients of the publisher do not send anything: the data is discarded
+        pass
+
+    def _connected(self, client):
+        # new client, ready to receive the sweeps
+        pass
+
+    ###########################################################################
+    # Clients
+    ###########################################################################
+    def _accept(self, server, selector, clients):
+        try:
+            (sock, address) = server.accept()
+        except (BlockingIOError, InterruptedError):
+            return
+        sock.setblocking(False)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        client = _Client(sock, address, self._client_buffer, self._lossless)
+        selector.register(sock, selectors.EVENT_READ, client)
+        clients.append(client)
+        Log.i(TAG, "TCP client {}:{} connected".format(*address[:2]))
+        self._connected(client)
+
+    def _receive(self, client):
+        # :return: False if the client has disconnected :rtype: bool.
+        try:
+            data = client.sock.recv(Constants.SocketClient.buffer_recv_size)
+        except (BlockingIOError, InterruptedError):
+            return True
+        except OSError:
+            return False
+        if not data:
+            return False
+        client.received += data
+        for payload in read_frames(client.received):
+            self._received(client, payload)
+        return True
+
+    @staticmethod
+    def _flush(client, selector):
+        # waits for the socket to be writable only while sweeps are pending
+        try:
+            pending = client.send()
+        except OSError:
+            # reported as readable (disconnected) on the next select
+            return
+        events = selectors.EVENT_READ | selectors.EVENT_WRITE if pending else selectors.EVENT_READ
+        if selector.get_key(client.sock).events != events:
+            selector.modify(client.sock, events, client)
+
+    def _disconnect(self, client, selector, clients):
+        selector.unregister(client.sock)
+        client.sock.close()
+        clients.remove(client)
+        self._dropped.value += client.dropped
+        Log.i(TAG, "TCP client {}:{} disconnected: {} sweeps sent, {} dropped".format(
+            client.address[0], client.address[1], client.sent, client.dropped))
+
+    ###########################################################################
+    # Sweeps dropped for slow clients (disconnected clients only)
+    ###########################################################################
+    def get_dropped(self):
+        #:return: sweeps dropped :rtype: int.
+        return self._dropped.value
+
+    ###########################################################################
+    # Stops publishing
+    ###########################################################################
+    def stop(self):
+        #Signals the process to stop publishing.
+        self._exit.set()
+
+
+###############################################################################
+# Reference client of the publisher
+###############################################################################
+class PublisherClient(object):
+    """
+    Blocking client: connects to the publisher and iterates over the frames.
+    """
+
+    #######################
+    def __init__(self, host=None, port=None):
+        """
+        :param host: Address of the publisher (default Constants.publisher_host) :type host: str.
+        :param port: Port of the publisher (default Constants.publisher_port) :type port: int.
+        """
+        self._host = Constants.publisher_host if host is None else host
+        self._port = Constants.publisher_port if port is None else port
+        self._socket = None
+
+    ########################
+    def connect(self, timeout=None):
+        #:param timeout: Timeout of the connection and reads in seconds, None to block :type timeout: float.
+        self._socket = socket.create_connection((self._host, self._port), timeout)
+        self._socket.settimeout(timeout)
+
+    ########################
+    def close(self):
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+    ########################
+    def frames(self):
+        # :return: the decoded frames until the publisher closes the connection :rtype: dict generator.
+        buffer = bytearray()
+        while True:
+            data = self._socket.recv(1 << 16)
+            if not data:
+                return
+            buffer += data
+            for payload in read_frames(buffer):
+                frame = decode_frame(payload)
+                if frame is not None:
+                    yield frame
+
+
+###############################################################################
+# Prints the values published, e.g. python -m openQCM.processors.Publisher localhost 5560
+###############################################################################
+if __name__ == '__main__':
+    client = PublisherClient(*sys.argv[1:2], *[int(p) for p in sys.argv[2:3]])
+    client.connect()
+    print("sweep,timestamp_us,overtone,frequency_Hz,dissipation,temperature_C")
+    try:
+        for frame in client.frames():
+            if frame['type'] == FRAME_VALUES:
+                print("{sweep},{timestamp},{overtone},{frequency},{dissipation},{temperature}".format(**frame))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        client.close()
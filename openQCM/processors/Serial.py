@@ -1,10 +1,16 @@
 import multiprocessing
-from openQCM.core.ringBuffer import RingBuffer
-from openQCM.core.constants import Constants
+from collections import deque
+from openQCM.core.smoother import StreamingSmoother
+from openQCM.core.constants import Constants, EstimatorType
+from openQCM.core.baseline import BaselineService
+from openQCM.core.estimators import LorentzianEstimator, PhaseSlopeEstimator
+from openQCM.core.tracker import KalmanTracker
+from openQCM.core.overtoneChannel import OvertoneChannel, OvertoneScheduler
+from openQCM.core.sweepRecord import SweepRecord
 from openQCM.common.fileStorage import FileStorage
 from openQCM.common.logger import Logger as Log
 from openQCM.common.switcher import Overtone_Switcher_5MHz, Overtone_Switcher_10MHz
-from time import time
+from time import time, sleep
 import serial
 from serial.tools import list_ports
 import numpy as np
@@ -15,6 +21,143 @@ from progressbar import Bar, Percentage, ProgressBar, RotatingMarker,Timer
 
 TAG = ""#"[Serial]"
 
+###############################################################################
+# Savitzky-Golay (Smoothing/Denoising Filter)
+###############################################################################
+def savitzky_golay(y, window_size, order, deriv=0, rate=1):
+
+    """Smooth (and optionally differentiate) data with a Savitzky-Golay filter.
+    The Savitzky-Golay filter removes high frequency noise from data.
+    It has the advantage of preserving the original shape and
+    features of the signal better than other types of filtering
+    approaches, such as moving averages techniques.
+    Parameters
+    ----------
+    y : array_like, shape (N,) the values of the time history of the signal.
+    window_size : int the length of the window. Must be an odd integer number.
+    order : int the order of the polynomial used in the filtering.
+            Must be less then `window_size` - 1.
+    deriv: int the order of the derivative to compute (default = 0 means only smoothing)
+    Returns
+    -------
+    ys : ndarray, shape (N) the smoothed signal (or it's n-th derivative).
+    Notes
+    -----
+    The Savitzky-Golay is a type of low-pass filter, particularly
+    suited for smoothing noisy data. The main idea behind this
+    approach is to make for each point a least-square fit with a
+    polynomial of high order over a odd-sized window centered at
+    the point.
+    Examples
+    --------
+    t = np.linspace(-4, 4, 500)
+    y = np.exp( -t**2 ) + np.random.normal(0, 0.05, t.shape)
+    ysg = savitzky_golay(y, window_size=31, order=4)
+    import matplotlib.pyplot as plt
+    plt.plot(t, y, label='Noisy signal')
+    plt.plot(t, np.exp(-t**2), 'k', lw=1.5, label='Original signal')
+    plt.plot(t, ysg, 'r', label='Filtered signal')
+    plt.legend()
+    plt.show()
+    References
+    ----------
+    .. [1] A. Savitzky, M. J. E. Golay, Smoothing and Differentiation of
+       Data by Simplified Least Squares Procedures. Analytical
+       Chemistry, 1964, 36 (8), pp 1627-1639.
+    .. [2] Numerical Recipes 3rd Edition: The Art of Scientific Computing
+       W.H. Press, S.A. Teukolsky, W.T. Vetterling, B.P. Flannery
+       Cambridge University Press ISBN-13: 9780521880688
+    """
+    import numpy as np
+    from math import factorial
+    try:
+        window_size = np.abs(np.int(window_size))
+        order = np.abs(np.int(order)) 
+    except ValueError as msg:
+        raise ValueError("WARNING: window size and order have to be of type int!")
+    if window_size % 2 != 1 or window_size < 1:
+        raise TypeError("WARNING: window size must be a positive odd number!")
+    if window_size < order + 2:
+        raise TypeError("WARNING: window size is too small for the polynomials order!")
+    order_range = range(order+1)
+    half_window = (window_size -1) // 2
+    # precompute coefficients
+    b = np.mat([[k**i for i in order_range] for k in range(-half_window, half_window+1)])
+    m = np.linalg.pinv(b).A[deriv] * rate**deriv * factorial(deriv)
+    # pad the signal at the extremes with values taken from the signal itself
+    firstvals = y[0] - np.abs( y[1:half_window+1][::-1] - y[0] )
+    lastvals = y[-1] + np.abs(y[-half_window-1:-1][::-1] - y[-1])
+    y = np.concatenate((firstvals, y, lastvals))
+    return np.convolve( m[::-1], y, mode='valid')
+
+
+###############################################################################
+# Resonance Frequency, Resonance Peak, Bandwidth and Q-factor/Dissipation 
+###############################################################################
+def parameters_finder(freq,signal,percent):
+    """
+    :return: index and value of the peak, bandwidth, indexes of the cut-off frequencies,
+             Q-factor and the flags of the cut-off frequencies not found (left, right) :rtype: tuple.
+    """
+    err1 = 0
+    err2 = 0
+    f_max = np.max(signal)          # Find maximum
+    i_max= np.argmax(signal,axis=0) # Find index of maximum
+    # setup the index for finding the leading edge
+    index_m = i_max
+    # loop until the index at FWHM/others is found
+    while signal[index_m] > percent*f_max:
+        if index_m < 1:
+           #print(TAG, 'WARNING: Left value not found')
+           err1 = 1
+           break
+        index_m = index_m-1     
+    #linearly interpolate between the previous values to find the value of freq at the leading edge
+    m = (signal[index_m+1] - signal[index_m])/(freq[index_m+1] - freq[index_m])
+    c = signal[index_m] - freq[index_m]*m
+    i_leading = (percent*f_max - c)/m
+    # setup index for finding the trailing edge
+    index_M = i_max
+    # loop until the index at FWHM/others is found
+    while signal[index_M] > percent*f_max:
+        if index_M >= len(signal)-1:
+            #print(TAG, 'WARNING: Right value not found')
+            err2 = 1
+            break
+        index_M = index_M+1;
+    # linearly interpolate between the previous values to find the value of freq at the trailing edge
+    m = (signal[index_M-1] - signal[index_M])/(freq[index_M-1] - freq[index_M])
+    c = signal[index_M] - freq[index_M]*m
+    i_trailing = (percent*f_max - c)/m
+    #compute the FWHM/others
+    bandwidth = abs(i_trailing - i_leading)
+    Qfac=freq[i_max]/bandwidth
+    return i_max, f_max, bandwidth, index_m, index_M, Qfac, err1, err2
+
+
+###############################################################################
+# Resonance Frequency, Bandwidth and Q-factor from the oversampled spline
+###############################################################################
+def spline_estimation(freq, filtered_mag, Spline_points, Spline_factor):
+    """
+    :param freq: Frequencies of the sweep (Hz) :type freq: float list.
+    :param filtered_mag: Baseline corrected and filtered amplitude :type filtered_mag: float list.
+    :param Spline_points: Number of spline points :type Spline_points: int.
+    :param Spline_factor: Spline smoothing factor :type Spline_factor: float.
+    :return: resonance frequency (Hz), bandwidth (Hz), Q-factor, cut-off frequency not found (left, right) :rtype: tuple.
+    """
+    # FITTING/INTERPOLATING - SPLINE
+    xrange = range(len(filtered_mag))
+    freq_range = np.linspace(freq[0], freq[-1], Spline_points)
+    s = UnivariateSpline(xrange, filtered_mag, s= Spline_factor)
+    xs = np.linspace(0, len(filtered_mag)-1, Spline_points)
+    mag_result_fit = s(xs)
+
+    # PARAMETERS FINDER
+    (index_peak_fit, max_peak_fit, bandwidth_fit,index_f1_fit,index_f2_fit, Qfac_fit, err1, err2)= parameters_finder(freq_range, mag_result_fit, percent=0.707)
+    return freq_range[int(index_peak_fit)], bandwidth_fit, Qfac_fit, err1, err2
+
+
 ###############################################################################
 # Process for the serial package and the communication with the serial port
 # Processes incoming data and calculates outgoing data by the algorithms
@@ -38,60 +181,186 @@ class SerialProcess(multiprocessing.Process):
 
         # Check if drift exceeds threshold
         if freq_drift > Constants.auto_tracking_threshold:
-            # Store old values for logging
-            old_ref_freq = self._reference_frequency
-            old_start = self._startFreq
-            old_stop = self._stopFreq
+            self._move_sweep_window(current_freq, samples,
+                " Frequency drift detected: {:.2f} Hz (threshold: {} Hz)".format(
+                freq_drift, Constants.auto_tracking_threshold))
+            return True
 
-            # Update reference frequency to current measured frequency
-            self._reference_frequency = current_freq
+        return False
 
-            # Get the L and R intervals for current overtone
-            L_interval, R_interval = self._get_overtone_intervals()
+    ###########################################################################
+    # AUTO-TRACKING: Moves the sweep window ahead of the predicted frequency
+    ###########################################################################
+    def check_and_update_predictive_tracking(self, t, samples):
+        """
+        Predicts the resonance frequency at the next sweep with the Kalman tracker
+        and re-centres the sweep window ahead of it, in the direction of the drift.
+        Hysteresis: the window is moved when the prediction deviates more than the
+        threshold from the reference, at most once every 'tracking_min_interval'
+        sweeps, unless the predicted peak gets too close to an edge.
 
-            # Recalculate sweep window with new reference frequency
-            self._startFreq = current_freq - L_interval
-            self._stopFreq = current_freq + R_interval
+        :param t: Time of the current sweep (s)
+        :param samples: Number of samples for sweep
+        :return: True if tracking was updated, False otherwise
+        """
+        self._sweeps_since_tracking += 1
+        period = self._sweep_period.get()
+        if not np.isfinite(period):
+            return False
+        predicted = self._tracker.predict(t + period)
+        if not np.isfinite(predicted):
+            return False
 
-            # Recalculate frequency step and range
-            self._fStep = (self._stopFreq - self._startFreq) / (samples - 1)
-            self._readFREQ = np.arange(samples) * self._fStep + self._startFreq
+        L_interval, R_interval = self._get_overtone_intervals()
+        near_edge = (predicted < self._startFreq + Constants.tracking_edge_margin * L_interval or
+                     predicted > self._stopFreq - Constants.tracking_edge_margin * R_interval)
+        offset = predicted - self._reference_frequency
+        if near_edge or (abs(offset) > Constants.auto_tracking_threshold and
+                         self._sweeps_since_tracking >= Constants.tracking_min_interval):
+            # lead limited to the threshold, so the new window does not re-trigger
+            drift = self._tracker.get_drift()
+            lead = np.clip(drift * period * Constants.tracking_lead_sweeps,
+                           -Constants.auto_tracking_threshold, Constants.auto_tracking_threshold)
+            self._move_sweep_window(predicted + lead, samples,
+                " Predicted drift: {:.2f} Hz (threshold: {} Hz{}), drift rate: {:.2f} Hz/s".format(
+                offset, Constants.auto_tracking_threshold, ", near edge" if near_edge else "", drift))
+            return True
 
-            # Recalculate spline points
-            self._spline_points = int((self._stopFreq - self._startFreq)) + 1
+        return False
 
-            # Recalculate baseline coefficients for new frequency range
-            self._recalculate_baseline_for_range()
+    ###########################################################################
+    # AUTO-TRACKING: Moves the sweep window to a new reference frequency
+    ###########################################################################
+    def _move_sweep_window(self, new_reference, samples, reason):
+        """
+        Recalculates the sweep window around a new reference frequency and notifies the GUI.
 
-            # Increment auto-tracking counter
-            self._auto_tracking_count += 1
+        :param new_reference: New reference frequency (Hz)
+        :param samples: Number of samples for sweep
+        :param reason: Line printed in the notification
+        """
+        # Store old values for logging
+        old_ref_freq = self._reference_frequency
+        old_start = self._startFreq
+        old_stop = self._stopFreq
 
-            # Print detailed notification to terminal
-            print("\n" + "=" * 60)
-            print(" AUTO-TRACKING ACTIVATED (#{})".format(self._auto_tracking_count))
-            print("=" * 60)
-            print(" Frequency drift detected: {:.2f} Hz (threshold: {} Hz)".format(
-                freq_drift, Constants.auto_tracking_threshold))
-            print(" Old reference frequency: {:.2f} Hz".format(old_ref_freq))
-            print(" New reference frequency: {:.2f} Hz".format(current_freq))
-            print(" Old sweep window: {:.0f} - {:.0f} Hz".format(old_start, old_stop))
-            print(" New sweep window: {:.0f} - {:.0f} Hz".format(self._startFreq, self._stopFreq))
-            print(" Baseline recalculated for new frequency range")
-            print("=" * 60 + "\n")
-
-            # Signal GUI to update (via parser queue)
-            # Format: [tracking_activated, new_start_freq, new_stop_freq, new_reference_freq, tracking_count]
-            self._parser_tracking.add_tracking([
-                True,
-                self._startFreq,
-                self._stopFreq,
-                self._reference_frequency,
-                self._auto_tracking_count
-            ])
+        # Update reference frequency
+        self._reference_frequency = new_reference
 
-            return True
+        # Get the L and R intervals for current overtone
+        L_interval, R_interval = self._get_overtone_intervals()
 
-        return False
+        # Recalculate sweep window with new reference frequency
+        self._startFreq = new_reference - L_interval
+        self._stopFreq = new_reference + R_interval
+
+        # Recalculate frequency step and range
+        self._fStep = (self._stopFreq - self._startFreq) / (samples - 1)
+        self._readFREQ = np.arange(samples) * self._fStep + self._startFreq
+
+        # Recalculate spline points
+        self._spline_points = int((self._stopFreq - self._startFreq)) + 1
+
+        # Recalculate baseline coefficients for new frequency range
+        self._recalculate_baseline_for_range()
+
+        # Increment auto-tracking counter
+        self._auto_tracking_count += 1
+        self._sweeps_since_tracking = 0
+
+        # Print detailed notification to terminal
+        print("\n" + "=" * 60)
+        print(" AUTO-TRACKING ACTIVATED (#{})".format(self._auto_tracking_count))
+        print("=" * 60)
+        print(reason)
+        print(" Old reference frequency: {:.2f} Hz".format(old_ref_freq))
+        print(" New reference frequency: {:.2f} Hz".format(new_reference))
+        print(" Old sweep window: {:.0f} - {:.0f} Hz".format(old_start, old_stop))
+        print(" New sweep window: {:.0f} - {:.0f} Hz".format(self._startFreq, self._stopFreq))
+        print(" Baseline recalculated for new frequency range")
+        print("=" * 60 + "\n")
+
+        # Signal GUI to update (with the record of the sweep)
+        self._record.tracking = (self._startFreq,
+                                 self._stopFreq,
+                                 self._reference_frequency,
+                                 self._auto_tracking_count,
+                                 samples)
+
+    ###########################################################################
+    # AUTO WINDOW: Sizes the sweep window on the measured bandwidth
+    ###########################################################################
+    def size_sweep_window(self, bandwidth, center):
+        """
+        Sets the sweep window to 'auto_window_bandwidths' bandwidths around the
+        resonance, keeping the left/right ratio of the overtone window, and scales
+        samples, SG window and spline smoothing factor to match.
+
+        :param bandwidth: Measured bandwidth (Hz)
+        :param center: Resonance frequency (Hz)
+        """
+        L_interval, R_interval = self._get_overtone_intervals()
+        if self._window_intervals is None:
+            self._overtone_width = L_interval + R_interval
+        # at most 'auto_window_max_width' overtone windows (peak lost: no endless widening)
+        bandwidth = min(bandwidth, Constants.auto_window_max_width * self._overtone_width / Constants.auto_window_bandwidths)
+        self._window_bandwidth = bandwidth
+        self._bandwidths.clear()
+        self._cutoff_sweeps = 0
+        samples = int(round(Constants.auto_window_bandwidths * Constants.auto_window_samples_per_bandwidth)) + 1
+        samples = min(max(samples, Constants.auto_window_min_samples), Constants.auto_window_max_samples)
+        # integer step (as sent to the device)
+        step = max(int(round(Constants.auto_window_bandwidths * bandwidth / (samples - 1))), 1)
+        width = step * (samples - 1)
+        left = int(round(width * L_interval / (L_interval + R_interval) / step)) * step
+        self._window_intervals = (left, width - left)
+
+        # SG window over the same frequency span (odd, longer than the SG order)
+        SG_window_size = int(round(self._SG_window_size * self._fStep / step)) // 2 * 2 + 1
+        self._SG_window_size = min(max(SG_window_size, (Constants.SG_order + 2) | 1), samples - 2)
+        self._phase_slope = PhaseSlopeEstimator(self._SG_window_size)
+        self._lorentzian.reset()
+        # the spline smoothing factor bounds a sum of squares over the samples
+        self._Spline_factor = self._Spline_factor * samples / self._window_samples
+        self._window_samples = samples
+
+        self._move_sweep_window(center, samples,
+            " Automatic window sizing: bandwidth {:.1f} Hz, {} samples, step {} Hz, SG window {}".format(
+            bandwidth, samples - 1, step, self._SG_window_size))
+
+    ###########################################################################
+    # ADAPTIVE SWEEP: Chooses the window of the next sweep (full or fine)
+    ###########################################################################
+    def next_sweep_window(self, t):
+        """
+        Interleaves a full window sweep every 'adaptive_full_sweep_interval' sweeps
+        with short, dense sweeps centred on the tracked peak (+-k bandwidths).
+        The full window is also swept until the averages are available and after
+        a sweep that lost the peak.
+
+        :param t: Time of the next sweep (s)
+        :return: start, stop, step (Hz), frequencies, samples, spline points, full window flag
+        """
+        full = (self._startFreq, self._stopFreq, self._fStep, self._readFREQ,
+                self._window_samples, self._spline_points, True)
+        if (not Constants.adaptive_sweep or self._force_full_sweep or
+                self._frequency_smoother.count < self._environment or
+                self._sweeps_since_full_sweep >= Constants.adaptive_full_sweep_interval):
+            return full
+        # peak predicted by the tracker and bandwidth from the averaged dissipation
+        period = self._sweep_period.get()
+        center = self._tracker.predict(t + period) if np.isfinite(period) else self._tracker.get_frequency()
+        bandwidth = self._dissipation_smoother.get() * center
+        if not (np.isfinite(center) and np.isfinite(bandwidth) and bandwidth > 0):
+            return full
+        samples = Constants.adaptive_fine_samples
+        # integer step (as sent to the device), start on the step grid so that
+        # recurring windows share their cached baseline
+        step = max(int(round(2 * Constants.adaptive_fine_bandwidths * bandwidth / (samples - 1))), 1)
+        start = step * int(round(center / step)) - step * ((samples - 1) // 2)
+        stop = start + step * (samples - 1)
+        readFREQ = np.arange(samples) * float(step) + start
+        return start, stop, step, readFREQ, samples, int(stop - start) + 1, False
 
     ###########################################################################
     # AUTO-TRACKING: Gets L and R intervals for current overtone
@@ -103,6 +372,10 @@ class SerialProcess(multiprocessing.Process):
 
         :return: (L_interval, R_interval) in Hz
         """
+        # Window sized on the measured bandwidth
+        if self._window_intervals is not None:
+            return self._window_intervals
+
         # Check QCS type (5MHz or 10MHz) based on reference frequency
         if self._reference_frequency > 4e+06 and self._reference_frequency < 6e+06:
             # 5 MHz sensor - fundamental
@@ -133,13 +406,12 @@ class SerialProcess(multiprocessing.Process):
     ###########################################################################
     def _recalculate_baseline_for_range(self):
         """
-        Recalculates baseline polynomial coefficients for the new sweep window.
-        Uses the calibration data to extract coefficients for the new frequency range.
+        Recalculates the baseline for the new sweep window.
+        Uses the baseline service fitted on the calibration data.
         """
-        # Evaluate baseline polynomial at new frequency range
-        # The baseline coefficients were calculated during calibration for the full range
-        # We just need to evaluate the polynomial at the new frequency points
-        self._polyfitted = np.polyval(self._coeffs_all, self._readFREQ)
+        # The baseline was fitted on the calibration sweep over the full range:
+        # evaluates it once for the new window, the next sweeps read it from the cache
+        self._baseline.prefetch(self._readFREQ)
 
     ###########################################################################
     # BASELINE CORRECTION
@@ -166,129 +438,29 @@ class SerialProcess(multiprocessing.Process):
         # loads Calibration (baseline correction) from file
         (self.freq_all,self.mag_all,self.phase_all) = self.load_calibration_file()
         
+        # Baseline service: Chebyshev series on a scaled frequency axis, baselines cached per sweep window
+        self._baseline = BaselineService(self.freq_all,self.mag_all,self.phase_all)
+        
         # Baseline correction: input signal Amplitude (sweep all frequencies)
-        (self.polyfitted_all,self.coeffs_all)=self.baseline_correction(self.freq_all,self.mag_all,8)
+        self.coeffs_all = self._baseline.mag_series
+        self.polyfitted_all = self.coeffs_all(self.freq_all)
         self.mag_beseline_corrected_all= self.mag_all-self.polyfitted_all
         
         # Baseline correction: input signal Phase (sweep all frequencies)
-        (self.polyfitted_all_phase,self.coeffs_all_phase)=self.baseline_correction(self.freq_all,self.phase_all,8)
+        self.coeffs_all_phase = self._baseline.phase_series
+        self.polyfitted_all_phase = self.coeffs_all_phase(self.freq_all)
         self.phase_beseline_corrected_all= self.phase_all-self.polyfitted_all_phase 
         return self.coeffs_all
     
     
-    ###########################################################################
-    # Savitzky-Golay (Smoothing/Denoising Filter)
-    ###########################################################################
-    def savitzky_golay(self,y, window_size, order, deriv=0, rate=1):
-        
-        """Smooth (and optionally differentiate) data with a Savitzky-Golay filter.
-        The Savitzky-Golay filter removes high frequency noise from data.
-        It has the advantage of preserving the original shape and
-        features of the signal better than other types of filtering
-        approaches, such as moving averages techniques.
-        Parameters
-        ----------
-        y : array_like, shape (N,) the values of the time history of the signal.
-        window_size : int the length of the window. Must be an odd integer number.
-        order : int the order of the polynomial used in the filtering.
-                Must be less then `window_size` - 1.
-        deriv: int the order of the derivative to compute (default = 0 means only smoothing)
-        Returns
-        -------
-        ys : ndarray, shape (N) the smoothed signal (or it's n-th derivative).
-        Notes
-        -----
-        The Savitzky-Golay is a type of low-pass filter, particularly
-        suited for smoothing noisy data. The main idea behind this
-        approach is to make for each point a least-square fit with a
-        polynomial of high order over a odd-sized window centered at
-        the point.
-        Examples
-        --------
-        t = np.linspace(-4, 4, 500)
-        y = np.exp( -t**2 ) + np.random.normal(0, 0.05, t.shape)
-        ysg = savitzky_golay(y, window_size=31, order=4)
-        import matplotlib.pyplot as plt
-        plt.plot(t, y, label='Noisy signal')
-        plt.plot(t, np.exp(-t**2), 'k', lw=1.5, label='Original signal')
-        plt.plot(t, ysg, 'r', label='Filtered signal')
-        plt.legend()
-        plt.show()
-        References
-        ----------
-        .. [1] A. Savitzky, M. J. E. Golay, Smoothing and Differentiation of
-           Data by Simplified Least Squares Procedures. Analytical
-           Chemistry, 1964, 36 (8), pp 1627-1639.
-        .. [2] Numerical Recipes 3rd Edition: The Art of Scientific Computing
-           W.H. Press, S.A. Teukolsky, W.T. Vetterling, B.P. Flannery
-           Cambridge University Press ISBN-13: 9780521880688
-        """
-        import numpy as np
-        from math import factorial
-        try:
-            window_size = np.abs(np.int(window_size))
-            order = np.abs(np.int(order)) 
-        except ValueError as msg:
-            raise ValueError("WARNING: window size and order have to be of type int!")
-        if window_size % 2 != 1 or window_size < 1:
-            raise TypeError("WARNING: window size must be a positive odd number!")
-        if window_size < order + 2:
-            raise TypeError("WARNING: window size is too small for the polynomials order!")
-        order_range = range(order+1)
-        half_window = (window_size -1) // 2
-        # precompute coefficients
-        b = np.mat([[k**i for i in order_range] for k in range(-half_window, half_window+1)])
-        m = np.linalg.pinv(b).A[deriv] * rate**deriv * factorial(deriv)
-        # pad the signal at the extremes with values taken from the signal itself
-        firstvals = y[0] - np.abs( y[1:half_window+1][::-1] - y[0] )
-        lastvals = y[-1] + np.abs(y[-half_window-1:-1][::-1] - y[-1])
-        y = np.concatenate((firstvals, y, lastvals))
-        return np.convolve( m[::-1], y, mode='valid')
-     
-        
-    ###########################################################################
-    # Resonance Frequency, Resonance Peak, Bandwidth and Q-factor/Dissipation 
-    ###########################################################################
-    def parameters_finder(self,freq,signal,percent):
-        f_max = np.max(signal)          # Find maximum
-        i_max= np.argmax(signal,axis=0) # Find index of maximum
-        # setup the index for finding the leading edge
-        index_m = i_max
-        # loop until the index at FWHM/others is found
-        while signal[index_m] > percent*f_max:
-            if index_m < 1:
-               #print(TAG, 'WARNING: Left value not found')
-               self._err1 = 1
-               break
-            index_m = index_m-1     
-        #linearly interpolate between the previous values to find the value of freq at the leading edge
-        m = (signal[index_m+1] - signal[index_m])/(freq[index_m+1] - freq[index_m])
-        c = signal[index_m] - freq[index_m]*m
-        i_leading = (percent*f_max - c)/m
-        # setup index for finding the trailing edge
-        index_M = i_max
-        # loop until the index at FWHM/others is found
-        while signal[index_M] > percent*f_max:
-            if index_M >= len(signal)-1:
-                #print(TAG, 'WARNING: Right value not found')
-                self._err2 = 1
-                break
-            index_M = index_M+1;
-        # linearly interpolate between the previous values to find the value of freq at the trailing edge
-        m = (signal[index_M-1] - signal[index_M])/(freq[index_M-1] - freq[index_M])
-        c = signal[index_M] - freq[index_M]*m
-        i_trailing = (percent*f_max - c)/m
-        #compute the FWHM/others
-        bandwidth = abs(i_trailing - i_leading)
-        Qfac=freq[i_max]/bandwidth
-        return i_max, f_max, bandwidth, index_m, index_M, Qfac  
-    
-    
     ###########################################################################
     # Processes incoming data and calculates outcoming data
     ###########################################################################    
-    def elaborate(self, k, coeffs_all, readFREQ, samples, Xm, Xp, temperature, SG_window_size, Spline_points, Spline_factor, timestamp):
-        
+    def elaborate(self, k, coeffs_all, readFREQ, samples, Xm, Xp, temperature, SG_window_size, Spline_points, Spline_factor, timestamp, estimate=None):
+        """
+        :param estimate: Filtered amplitude, spline estimate and error flags computed
+                         by spline_kernel (e.g. in a DSP process pool), None to compute them here :type estimate: tuple.
+        """
         ###################
         def waveletSmooth(x, wavelet="db4", level=1, title=None):
             import pywt
@@ -310,8 +482,7 @@ class SerialProcess(multiprocessing.Process):
         self._k= k
         # evaluated polynomial coefficients
         self._coeffs_all = coeffs_all
-        # frequency range, samples number
-        self._readFREQ = readFREQ
+        # frequency range, samples number (full or fine sweep window)
         self._samples = samples
         # support vectors
         self._Xm = Xm
@@ -324,14 +495,19 @@ class SerialProcess(multiprocessing.Process):
         self._Xm = np.linspace(0,0,self._samples)
         self._Xp = np.linspace(0,0,self._samples)
         
-        # Evaluate a polynomial at specific values based on the coefficients and frequency range
-        self._polyfitted = np.polyval(self._coeffs_all,self._readFREQ)
+        # Baselines of the sweep window (amplitude and phase), cached by the baseline service
+        (self._polyfitted, self._polyfitted_phase) = self._baseline.get(readFREQ)
         
         # BASELINE CORRECTION ROI (raw data)
         mag_beseline_corrected = mag-self._polyfitted
         
         # FILTERING - Savitzky-Golay
-        filtered_mag = self.savitzky_golay(mag_beseline_corrected, window_size = SG_window_size, order = Constants.SG_order)
+        if estimate is None:
+            filtered_mag = savitzky_golay(mag_beseline_corrected, window_size = SG_window_size, order = Constants.SG_order)
+        else:
+            (filtered_mag, spline_estimate, err1, err2) = estimate
+            self._err1 = max(self._err1, err1)
+            self._err2 = max(self._err2, err2)
         
         # peak, index e frequency of max detection baseline corrected (filtering optional)
         #self._vector_max_baseline_corrected.append(max(mag_beseline_corrected))   #Z axis (max)
@@ -339,15 +515,32 @@ class SerialProcess(multiprocessing.Process):
         #h=self._index_max_baseline_corrected.append(np.argmax(mag_beseline_corrected, axis=0))
         #self._freq_max_baseline_corrected.append(readFREQ[int(h)])
         
-        # FITTING/INTERPOLATING - SPLINE
-        xrange = range(len(filtered_mag))
-        freq_range = np.linspace(self._readFREQ[0], self._readFREQ[-1], points)
-        s = UnivariateSpline(xrange, filtered_mag, s= Spline_factor)
-        xs = np.linspace(0, len(filtered_mag)-1, points)
-        mag_result_fit = s(xs)
-        
-        # PARAMETERS FINDER
-        (index_peak_fit, max_peak_fit, bandwidth_fit,index_f1_fit,index_f2_fit, Qfac_fit)= self.parameters_finder(freq_range, mag_result_fit, percent=0.707)
+        # RESONANCE ESTIMATION
+        if self._estimator_type == EstimatorType.lorentzian:
+            # FITTING - LORENTZIAN (warm-started from the previous sweep)
+            (resonance_fit, bandwidth_fit, Qfac_fit, self._fit_residual) = self._lorentzian.estimate(readFREQ, mag_beseline_corrected)
+            # resonance outside the sweep window: cut-off frequency not found
+            if resonance_fit < readFREQ[0]:
+                self._err1 = 1
+            elif resonance_fit > readFREQ[-1]:
+                self._err2 = 1
+        elif self._estimator_type == EstimatorType.phase:
+            # PHASE SLOPE - local linear regression (low-CPU mode, no oversampling)
+            phase_beseline_corrected = phase - self._polyfitted_phase
+            (resonance_fit, bandwidth_fit, Qfac_fit, index_fit) = self._phase_slope.estimate(readFREQ, phase_beseline_corrected)
+            # maximum slope at the edges of the sweep window: cut-off frequency not found
+            if index_fit <= SG_window_size//2:
+                self._err1 = 1
+            elif index_fit >= samples-1-SG_window_size//2:
+                self._err2 = 1
+        else:
+            # FITTING/INTERPOLATING - SPLINE
+            if estimate is None:
+                (resonance_fit, bandwidth_fit, Qfac_fit, err1, err2) = spline_estimation(readFREQ, filtered_mag, points, Spline_factor)
+                self._err1 = max(self._err1, err1)
+                self._err2 = max(self._err2, err2)
+            else:
+                (resonance_fit, bandwidth_fit, Qfac_fit) = spline_estimate
         
         # BANDWIDTH 70.7% of MAX
         #self._bw3.append(bandwidth_fit)
@@ -360,24 +553,49 @@ class SerialProcess(multiprocessing.Process):
         #self._temperature.append(temperature)
         #######################################################
         
-        self._frequency_buffer.append(freq_range[int(index_peak_fit)])
-        self._dissipation_buffer.append(1/Qfac_fit)
-        self._temperature_buffer.append(temperature)
+        # STREAMING SMOOTHING: constant cost per sweep (no re-filtering of a buffer)
+        freq_range_mean = self._frequency_smoother.update(resonance_fit)
+        diss_mean = self._dissipation_smoother.update(1/Qfac_fit)
+        temperature_mean = self._temperature_smoother.update(temperature)
+        
+        # AUTO-TRACKING: Kalman tracker of frequency and drift rate (peaks at the
+        # window edges are measurements with a larger variance)
+        t_sweep = time()
+        if self._t_previous_sweep is not None:
+           self._sweep_period.update(t_sweep - self._t_previous_sweep)
+        self._t_previous_sweep = t_sweep
+        edge = self._err1 != 0 or self._err2 != 0
+        self._tracker.update(t_sweep, resonance_fit, Constants.tracking_edge_noise if edge else 1.0)
+        
+        # AUTO WINDOW: the bandwidth of the first full sweeps sets the window size,
+        # the running bandwidth (out of the hysteresis band) or repeated cut-off
+        # sweeps (peak wider than the window) size it again
+        if Constants.auto_window and self._full_sweep:
+           if self._err1 == 0 and self._err2 == 0 and np.isfinite(bandwidth_fit):
+              self._bandwidths.append(bandwidth_fit)
+              self._cutoff_sweeps = 0
+           else:
+              self._cutoff_sweeps += 1
+           bandwidth = np.median(self._bandwidths) if len(self._bandwidths) >= Constants.auto_window_sweeps else None
+           if self._window_bandwidth is None:
+              if bandwidth is not None:
+                 self.size_sweep_window(bandwidth, self._tracker.get_frequency())
+           elif self._cutoff_sweeps >= Constants.auto_window_cutoff_sweeps:
+              wider = min(self._window_bandwidth * Constants.auto_window_hysteresis,
+                          Constants.auto_window_max_width * self._overtone_width / Constants.auto_window_bandwidths)
+              if wider > self._window_bandwidth:
+                 self.size_sweep_window(wider, self._tracker.get_frequency())
+              self._cutoff_sweeps = 0
+           elif bandwidth is not None and not (1 / Constants.auto_window_hysteresis <= bandwidth / self._window_bandwidth <= Constants.auto_window_hysteresis):
+              self.size_sweep_window(bandwidth, self._tracker.get_frequency())
         
         if self._k>=self._environment:
-           #FREQUENCY
-           vec_app1 = self.savitzky_golay(self._frequency_buffer.get_all(), window_size = Constants.SG_window_environment, order = Constants.SG_order_environment)
-           freq_range_mean = np.average(vec_app1)
-           #DISSIPATION
-           vec_app1d = self.savitzky_golay(self._dissipation_buffer.get_all(), window_size = Constants.SG_window_environment, order = Constants.SG_order_environment)
-           diss_mean = np.average(vec_app1d)
-           #TEMPERATURE
-           vec_app1t = self.savitzky_golay(self._temperature_buffer.get_all(), window_size = Constants.SG_window_environment, order = Constants.SG_order_environment)
-           temperature_mean = np.average(vec_app1t)
-
            # AUTO-TRACKING: Check for frequency drift and update sweep window if needed
            # This is checked after the environment averaging for stable measurements
-           self.check_and_update_tracking(freq_range_mean, self._samples)
+           if Constants.auto_tracking_predictive:
+              self.check_and_update_predictive_tracking(t_sweep, self._window_samples)
+           else:
+              self.check_and_update_tracking(freq_range_mean, self._window_samples)
            
         #else:
            #freq_range_mean = freq_range[int(index_peak_fit)]
@@ -396,16 +614,20 @@ class SerialProcess(multiprocessing.Process):
         ts_mult=1e6
         w = (int((datetime.datetime.now() - epoch).total_seconds()*ts_mult)) #datetime.datetime.utcnow()
         ##############
-        ## ADDS new serial data to internal queue
-        self._parser1.add1(filtered_mag) ##############
-        self._parser2.add2(phase)        ##############
-        # Adds new calculated data (resonance frequency and dissipation) to internal queues
-        #self._parser3.add3([time()-timestamp,freq_range[int(index_peak_fit)]])
-        self._parser3.add3([w,freq_range_mean]) #time()-timestamp - time in seconds
-        #self._parser4.add4([time()-timestamp,1/Qfac_fit])
-        self._parser4.add4([w,diss_mean]) #time()-timestamp - time in seconds
-        #self._parser5.add5([time()-timestamp,temperature])
-        self._parser5.add5([w,temperature_mean]) #time()-timestamp - time in seconds
+        ## ADDS new serial data to the record of the sweep (full window sweeps of the selected overtone only)
+        self._record.timestamp = w
+        if self._full_sweep and self._overtone_int == self._primary_overtone:
+           self._record.amplitude = filtered_mag
+           self._record.phase = phase
+        # Adds new calculated data (resonance frequency and dissipation) to the record
+        # once the smoothers have seen a full environment of sweeps
+        if self._k>=self._environment:
+           #self._parser3.add3([time()-timestamp,freq_range[int(index_peak_fit)]])
+           self._record.frequency = freq_range_mean #time()-timestamp - time in seconds
+           #self._parser4.add4([time()-timestamp,1/Qfac_fit])
+           self._record.dissipation = diss_mean
+           #self._parser5.add5([time()-timestamp,temperature])
+           self._record.temperature = temperature_mean
         '''
         ##############################
         # DATA STORING in CSV/TXT FILE
@@ -461,7 +683,7 @@ class SerialProcess(multiprocessing.Process):
         self._parser4 = parser_process
         self._parser5 = parser_process
         self._parser6 = parser_process
-        self._parser_tracking = parser_process  # AUTO-TRACKING: for GUI notifications
+        self._parser_sweep = parser_process  # one record per sweep
         self._serial = serial.Serial()
         
     ###########################################################################
@@ -508,6 +730,185 @@ class SerialProcess(multiprocessing.Process):
 
         return self._is_port_available(self._serial.port)
     
+    ###########################################################################
+    # Initializes the processing state for a new acquisition
+    ###########################################################################
+    def setup_processing(self, samples):
+        """
+        Loads the calibration (baseline) and sets the sweep window of the selected
+        overtone, the resonance estimators, the smoothers and the tracker.
+        In multi-overtone mode a channel is set for each overtone.
+
+        :param samples: Number of samples of the full window sweep :type samples: int.
+        """
+        # CALLS baseline_coeffs method
+        coeffs_all = self.baseline_coeffs()
+
+        # error flags and sweep timing
+        self._flag_error = 0
+        self._flag_error_usb = 0
+        self._err1 = 0
+        self._err2 = 0
+        self._prev_cycle_time = None
+        self._read_time = 0.0
+        # record of the current sweep, sent at the end of the sweep
+        self._record = SweepRecord()
+        
+        # STREAMING SMOOTHING: number of sweeps averaged (common to all the overtones)
+        self._environment = Constants.environment
+        
+        # MULTI-OVERTONE: one channel per overtone, the selected one first
+        self._primary_overtone = self._overtone_int
+        self._channels = []
+        for overtone in self.get_overtones():
+            self._overtone_int = overtone
+            self._setup_overtone(samples, coeffs_all)
+            channel = OvertoneChannel(overtone, Constants.multi_overtones.get(overtone, 1.0))
+            channel.save(self)
+            self._channels.append(channel)
+        self._scheduler = OvertoneScheduler(self._channels)
+        self._channel = self._channels[0]
+        self._channel.load(self)
+
+    ###########################################################################
+    # Initializes the processing state of the current overtone
+    ###########################################################################
+    def _setup_overtone(self, samples, coeffs_all):
+        """
+        :param samples: Number of samples of the full window sweep :type samples: int.
+        :param coeffs_all: Baseline of the calibration sweep :type coeffs_all: Chebyshev.
+        """
+        # Calls get_frequencies method:
+        # ACQUIRES overtone, sets start and stop frequencies, the step and range frequency according to the number of samples
+        (overone_name,overtone_value,fStep,readFREQ,SG_window_size,Spline_points,Spline_factor) = self.get_frequencies(samples)
+
+        # AUTO-TRACKING: Initialize reference frequency and tracking variables
+        self._reference_frequency = overtone_value  # Initial reference from calibration
+        self._readFREQ = readFREQ  # Store for later updates
+        self._spline_points = Spline_points
+        self._auto_tracking_count = 0  # Counter for tracking activations
+        self._fStep = fStep  # Store for later updates
+        self._SG_window_size = SG_window_size  # Store for later updates
+        self._Spline_factor = Spline_factor  # Store for later updates
+        self._coeffs_all = coeffs_all  # Store baseline coefficients for updates
+        self._baseline.prefetch(readFREQ)  # Baseline of the overtone window
+        # AUTO WINDOW: bandwidths measured before sizing the window
+        self._window_intervals = None
+        self._window_bandwidth = None
+        self._overtone_width = None
+        self._bandwidths = deque(maxlen=Constants.auto_window_sweeps)
+        self._cutoff_sweeps = 0
+        # ADAPTIVE SWEEP: full window samples and fine sweep scheduling
+        self._window_samples = samples
+        self._full_sweep = True
+        self._force_full_sweep = False
+        self._sweeps_since_full_sweep = 0
+        # AUTO-TRACKING: predictive tracker and sweep period estimate
+        self._tracker = KalmanTracker()
+        self._sweep_period = StreamingSmoother(Constants.environment)
+        self._t_previous_sweep = None
+        self._sweeps_since_tracking = 0
+
+        # RESONANCE ESTIMATOR: warm-started Lorentzian fit
+        self._lorentzian = LorentzianEstimator()
+        self._fit_residual = 0
+        # RESONANCE ESTIMATOR: phase slope over the SG window (low-CPU mode)
+        self._phase_slope = PhaseSlopeEstimator(SG_window_size)
+        
+        # STREAMING SMOOTHING of frequency, dissipation and temperature
+        self._frequency_smoother   = StreamingSmoother(self._environment)
+        self._dissipation_smoother = StreamingSmoother(self._environment)
+        self._temperature_smoother = StreamingSmoother(self._environment)
+
+
+    ###########################################################################
+    # MULTI-OVERTONE: Swaps the state of the current overtone with another one
+    ###########################################################################
+    def _select_channel(self, channel):
+        #:param channel: Channel of the overtone to sweep :type channel: OvertoneChannel.
+        if channel is not self._channel:
+            self._channel.save(self)
+            channel.load(self)
+            self._channel = channel
+
+    ###########################################################################
+    # Encodes the sweep command: start;stop;step
+    ###########################################################################
+    @staticmethod
+    def sweep_command(start, stop, step):
+        return (str(start) + ';' + str(stop) + ';' + str(int(step)) + '\n').encode()
+
+    ###########################################################################
+    # Converts a sweep read from the device to amplitude, phase and temperature
+    ###########################################################################
+    @staticmethod
+    def parse_sweep(buffer, samples):
+        """
+        :param buffer: Sweep as sent by the device ("mag;phase" lines, temperature, "s") :type buffer: str.
+        :param samples: Number of samples of the sweep :type samples: int.
+        :return: amplitude (dB), phase (deg) and temperature :rtype: tuple.
+        """
+        # amplitude/phase convert bit to dB/Deg parameters
+        vmax = 3.3
+        bitmax = 8192 
+        ADCtoVolt = vmax / bitmax
+        VCP = 0.9
+        data_mag = np.linspace(0,0,samples)   
+        data_ph  = np.linspace(0,0,samples)
+        data_raw = buffer.split('\n')
+        length = len(data_raw)
+        
+        # PERFORMS split with the semicolon delimiter
+        strs = [data_raw[i].split(';') for i in range(length)]
+
+        # CONVERTS the sweep samples before adding to queue
+        for i in range (length - 2):
+            data_mag[i] = float(strs[i][0]) * ADCtoVolt / 2
+            data_mag[i] = (data_mag[i]-VCP) / 0.03
+            data_ph[i] = float(strs[i][1]) * ADCtoVolt / 1.5
+            data_ph[i] = (data_ph[i]-VCP) / 0.01
+        
+        # ACQUIRES the temperature value from the buffer 
+        data_temp = float((strs[length - 2][0]))
+        return data_mag, data_ph, data_temp
+
+    ###########################################################################
+    # Ends a sweep: sweep scheduling, timing and errors
+    ###########################################################################
+    def end_sweep(self, k, sweep_failed, sweep_start_time):
+        """
+        :param k: Sweep counter :type k: int.
+        :param sweep_failed: True if the sweep could not be processed :type sweep_failed: bool.
+        :param sweep_start_time: Time at the start of the sweep (s) :type sweep_start_time: float.
+        """
+        # ADAPTIVE SWEEP: back to the full window if the peak was lost
+        self._force_full_sweep = sweep_failed or self._err1 == 1 or self._err2 == 1
+        if self._full_sweep:
+            self._sweeps_since_full_sweep = 0
+        else:
+            self._sweeps_since_full_sweep += 1
+        now = time()
+        self._scheduler.account(self._channel, now - sweep_start_time)
+        sampling_time = (now - self._prev_cycle_time) if self._prev_cycle_time is not None else 0.0
+        self._prev_cycle_time = now
+        # SENDS the record of the sweep (one message per sweep) and starts a new one
+        record = self._record
+        record.sweep = k
+        record.overtone = self._overtone_int
+        record.err1 = self._err1
+        record.err2 = self._err2
+        record.usb_errors = self._flag_error_usb
+        record.sampling_time = sampling_time
+        record.fit_residual = self._fit_residual
+        record.read_time = self._read_time
+        record.process_time = max(0.0, now - sweep_start_time - self._read_time)
+        record.acquired = now
+        self._parser_sweep.add_sweep(record)
+        self._record = SweepRecord()
+        # refreshes error variables at each sweep
+        self._err1 = 0
+        self._err2 = 0
+
     ###########################################################################
     # Reads the serial port,processes and adds all the data to internal queues
     ###########################################################################
@@ -527,31 +928,13 @@ class SerialProcess(multiprocessing.Process):
         #self._q_factor = []
         #self._freq_max_fit = []
         #self._temperature = []
-        self._flag_error = 0
-        self._flag_error_usb = 0
-        self._err1 = 0
-        self._err2 = 0
               
-        # CALLS baseline_coeffs method
-        coeffs_all = self.baseline_coeffs()
-        
         # Checks if the serial port is currently connected
         if self._is_port_available(self._serial.port):
 
             samples = Constants.argument_default_samples 
-            # Calls get_frequencies method:
-            # ACQUIRES overtone, sets start and stop frequencies, the step and range frequency according to the number of samples
-            (overone_name,overtone_value,fStep,readFREQ,SG_window_size,Spline_points,Spline_factor) = self.get_frequencies(samples)
-
-            # AUTO-TRACKING: Initialize reference frequency and tracking variables
-            self._reference_frequency = overtone_value  # Initial reference from calibration
-            self._readFREQ = readFREQ  # Store for later updates
-            self._spline_points = Spline_points
-            self._auto_tracking_count = 0  # Counter for tracking activations
-            self._fStep = fStep  # Store for later updates
-            self._SG_window_size = SG_window_size  # Store for later updates
-            self._Spline_factor = Spline_factor  # Store for later updates
-            self._coeffs_all = coeffs_all  # Store baseline coefficients for updates
+            # INITIALIZES baseline, sweep window, estimators, smoothers and tracker
+            self.setup_processing(samples)
             
             # Gets the state of the serial port
             if not self._serial.isOpen(): 
@@ -564,57 +947,40 @@ class SerialProcess(multiprocessing.Process):
                 # creates a timestamp
                 timestamp = time()
                 
-                self._environment = Constants.environment
-                self._frequency_buffer   = RingBuffer(self._environment)
-                self._dissipation_buffer = RingBuffer(self._environment)
-                self._temperature_buffer = RingBuffer(self._environment)
                 # Initializes the progress bar  
                 bar = ProgressBar(widgets=[TAG,' ', Bar(marker='>'),' ',Percentage(),' ', Timer()], maxval=self._environment).start() #
-                _prev_cycle_time = None
                 #### SWEEPS LOOP ####
                 while not self._exit.is_set():
+                    # MULTI-OVERTONE: selects the overtone of the next sweep
+                    self._select_channel(self._scheduler.next())
+                    _sweep_start_time = time()
+                    # ADAPTIVE SWEEP: full overtone window or fine window around the peak
+                    (sweep_start, sweep_stop, sweep_step, sweep_freq, sweep_samples, sweep_spline_points, self._full_sweep) = self.next_sweep_window(time())
                     # data reset for new sweep 
-                    data_mag = np.linspace(0,0,samples)   
-                    data_ph  = np.linspace(0,0,samples)
+                    data_mag = np.linspace(0,0,sweep_samples)   
+                    data_ph  = np.linspace(0,0,sweep_samples)
                     
                     try:
-                        # amplitude/phase convert bit to dB/Deg parameters
-                        vmax = 3.3
-                        bitmax = 8192 
-                        ADCtoVolt = vmax / bitmax
-                        VCP = 0.9
-                        
                         # WRITES encoded command to the serial port
                         # AUTO-TRACKING: Use instance variables that get updated when tracking activates
-                        cmd = str(self._startFreq) + ';' + str(self._stopFreq) + ';' + str(int(self._fStep)) + '\n'
-                        self._serial.write(cmd.encode())
+                        self._serial.write(self.sweep_command(sweep_start, sweep_stop, sweep_step))
                         
-                        # Initializes buffer and strs record
+                        # Initializes buffer
                         buffer = ''
-                        strs = ["" for x in range(samples + 2)]
                         
                         # READS and decodes sweep from the serial port
                         while 1:
-                         buffer += self._serial.read(self._serial.inWaiting()).decode(Constants.app_encoding)
+                         waiting = self._serial.inWaiting()
+                         # MULTI-DEVICE: sleeps while the device sweeps instead of spinning a core
+                         if waiting == 0 and Constants.serial_poll_interval > 0:
+                            sleep(Constants.serial_poll_interval)
+                            continue
+                         buffer += self._serial.read(waiting).decode(Constants.app_encoding)
                          #if '\n' in buffer:
                          if 's' in buffer:
                               break
-                        data_raw = buffer.split('\n')
-                        length = len(data_raw)
-                        
-                        # PERFORMS split with the semicolon delimiter
-                        for i in range (length):
-                            strs[i] = data_raw[i].split(';')
-
-                        # CONVERTS the sweep samples before adding to queue
-                        for i in range (length - 2):
-                            data_mag[i] = float(strs[i][0]) * ADCtoVolt / 2
-                            data_mag[i] = (data_mag[i]-VCP) / 0.03
-                            data_ph[i] = float(strs[i][1]) * ADCtoVolt / 1.5
-                            data_ph[i] = (data_ph[i]-VCP) / 0.01
-                        
-                        # ACQUIRES the temperature value from the buffer 
-                        data_temp = float((strs[length - 2][0]))
+                        # CONVERTS the sweep samples and ACQUIRES the temperature
+                        (data_mag, data_ph, data_temp) = self.parse_sweep(buffer, sweep_samples)
                             
                     # specify handlers for different exceptions        
                     except ValueError:
@@ -625,6 +991,7 @@ class SerialProcess(multiprocessing.Process):
                         print(TAG, "WARNING (ValueError): convert raw to float failed", end='\r')
                         self._flag_error_usb += 1
                         #Log.w(TAG, "Warning (ValueError): convert Raw to float failed")
+                    self._read_time = time() - _sweep_start_time
                         
                     ## ADDS new serial data to internal queue
                     #self._parser1.add1(data_mag)
@@ -632,29 +999,27 @@ class SerialProcess(multiprocessing.Process):
                     
                     # Calls elaborate method to performs results
                     # AUTO-TRACKING: Use instance variables that get updated when tracking activates
+                    _sweep_failed = False
                     try:
-                        self.elaborate(k, self._coeffs_all, self._readFREQ, samples, data_mag, data_ph, data_temp, self._SG_window_size, self._spline_points, self._Spline_factor, timestamp)
+                        self.elaborate(self._channel.sweeps, self._coeffs_all, sweep_freq, sweep_samples, data_mag, data_ph, data_temp, self._SG_window_size, sweep_spline_points, self._Spline_factor, timestamp)
                     except ValueError:
                         self._flag_error = 1
+                        _sweep_failed = True
                         #if k > self._environment:
                         #   print(TAG, "WARNING (ValueError): miscalculation")
                     except:
                         self._flag_error = 1
+                        _sweep_failed = True
                         #if k > self._environment:
                         #   print(TAG, "WARNING (ValueError): miscalculation")
-                    _now = time()
-                    _sampling_time = (_now - _prev_cycle_time) if _prev_cycle_time is not None else 0.0
-                    _prev_cycle_time = _now
-                    self._parser6.add6([self._err1,self._err2,k,self._flag_error_usb,_sampling_time])
+                    # ADDS errors and timing, refreshes error variables
+                    self.end_sweep(k, _sweep_failed, _sweep_start_time)
                     if k<= self._environment:
                        bar.update(k)
                     elif k/50 == k//50:
                       if k==100:
                          print('\n')
                       print(TAG,"sweep #{}               ".format(k), end='\r')
-                    # refreshes error variables at each sweep
-                    self._err1 = 0
-                    self._err2 = 0
                     # Increases sweep counter 
                     k+=1
                 if k== self._environment:
@@ -662,6 +1027,8 @@ class SerialProcess(multiprocessing.Process):
                 #### END SWEEPS LOOP ####    
                 # CLOSES serial port
                 self._serial.close()
+        # ROUTER: no more sweep records
+        self._parser_sweep.close()
           
     ###########################################################################
     # Stops acquiring data
@@ -760,13 +1127,17 @@ class SerialProcess(multiprocessing.Process):
         if (peaks_mag[0] >4e+06 and peaks_mag[0]<6e+06):
             switch = Overtone_Switcher_5MHz(peak_frequencies = peaks_mag)
             # 0=fundamental, 1=3th overtone and so on
-            (overtone_name,overtone_value, self._startFreq,self._stopFreq,SG_window_size,spline_factor) = switch.overtone5MHz_to_freq_range(self._overtone_int)
+            (overtone_name,overtone_value, self._startFreq,self._stopFreq,SG_window_size,spline_factor,self._estimator_type) = switch.overtone5MHz_to_freq_range(self._overtone_int)
             print(TAG,"openQCM Device setup: @5MHz")
         elif (peaks_mag[0] >9e+06 and peaks_mag[0]<11e+06):
             switch = Overtone_Switcher_10MHz(peak_frequencies = peaks_mag)
-            (overtone_name, overtone_value, self._startFreq,self._stopFreq,SG_window_size,spline_factor) = switch.overtone10MHz_to_freq_range(self._overtone_int)
+            (overtone_name, overtone_value, self._startFreq,self._stopFreq,SG_window_size,spline_factor,self._estimator_type) = switch.overtone10MHz_to_freq_range(self._overtone_int)
             print(TAG,"openQCM Device setup: @10MHz")
         
+        # Low-CPU mode: phase slope estimator for all the overtones
+        if Constants.low_cpu_mode:
+            self._estimator_type = EstimatorType.phase
+        
         # Sets the frequency step 
         fStep = (self._stopFreq-self._startFreq)/(samples-1)
         
@@ -778,6 +1149,25 @@ class SerialProcess(multiprocessing.Process):
         return overtone_name, overtone_value, fStep, readFREQ,SG_window_size, spline_points, spline_factor
     
     
+    ###########################################################################
+    # Gets the resonance estimator selected for the overtone
+    ###########################################################################
+    def get_estimator_type(self):
+        #:return: Resonance estimator (available after get_frequencies) :rtype: EstimatorType.
+        return self._estimator_type
+
+
+    ###########################################################################
+    # Gets the overtones acquired in the session (selected overtone first)
+    ###########################################################################
+    def get_overtones(self):
+        #:return: Indexes of the overtones (0=fundamental, 1=3th overtone...) :rtype: int list.
+        peaks_mag = self.load_frequencies_file()
+        others = sorted(n for n in Constants.multi_overtones
+                        if n != self._overtone_int and 0 <= n < len(peaks_mag))
+        return [self._overtone_int] + others
+
+
     ###########################################################################
     # Loads Fundamental frequency and Overtones from file
     ###########################################################################
@@ -792,10 +1182,18 @@ class SerialProcess(multiprocessing.Process):
     ###########################################################################
     # Loads Calibration (baseline correction) from file
     ###########################################################################
+    @staticmethod
+    def get_calibration_path():
+        #:return: calibration file of the installed sensor :rtype: str.
+        peaks_mag = SerialProcess.load_frequencies_file()
+        # Checks QCS type 5Mhz or 10MHz
+        if (peaks_mag[0] >4e+06 and peaks_mag[0]<6e+06):
+           return Constants.csv_calibration_path
+        elif (peaks_mag[0] >9e+06 and peaks_mag[0]<11e+06):
+           return Constants.csv_calibration_path10
+
     def load_calibration_file(self):
         # Loads Fundamental frequency and Overtones from file
-        peaks_mag = self.load_frequencies_file()
-        
         ############################### 
         # TODO check the damn QCM type 
         ###############################
@@ -808,13 +1206,7 @@ class SerialProcess(multiprocessing.Process):
            filename = Constants.csv_calibration_path10 
         '''
         
-        # Checks QCS type 5Mhz or 10MHz
-        if (peaks_mag[0] >4e+06 and peaks_mag[0]<6e+06):
-           filename = Constants.csv_calibration_path
-        elif (peaks_mag[0] >9e+06 and peaks_mag[0]<11e+06):
-           filename = Constants.csv_calibration_path10 
-        
-        
+        filename = self.get_calibration_path()
         data  = loadtxt(filename)
         freq_all  = data[:,0]
         mag_all   = data[:,1]
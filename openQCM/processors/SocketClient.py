@@ -1,9 +1,11 @@
 import multiprocessing
-from time import time
-
 import socket
+from time import time
+import numpy as np
 
-from openQCM.core.constants import Constants
+from openQCM.core.constants import Constants, EstimatorType
+from openQCM.processors.Publisher import (FRAME_SESSION, FRAME_RECORD, read_frames,
+                                          decode_session, decode_record, encode_resume)
 from openQCM.common.logger import Logger as Log
 
 
@@ -12,7 +14,12 @@ TAG = "Socket"
 
 class SocketProcess(multiprocessing.Process):
     """
-    Socket client
+    Socket client: remote acquisition from a node (openQCM.processors.Node).
+    The sweep records of the node are added to the parser as if they were
+    acquired here. On a connection failure the client reconnects and resumes
+    after the last sweep received, the node replays the missing ones. If the
+    node has restarted (new session, its settings may differ) the acquisition
+    ends: its sweeps do not belong to the session recorded here.
     """
     def __init__(self, parser_process):
         """
@@ -22,49 +29,122 @@ class SocketProcess(multiprocessing.Process):
         """
         multiprocessing.Process.__init__(self)
         self._exit = multiprocessing.Event()
+        self._restarted = multiprocessing.Event()
         self._parser = parser_process
-        self._socket_client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._address = None
+        self._session = None
+        self._last_sweep = -1
         Log.i(TAG, "Process Ready")
 
-    def open(self, port='', speed=5555, timeout=0.01):
+    def open(self, port='', speed=Constants.SocketClient.port_default[0], timeout=Constants.SocketClient.timeout):
         """
-        Opens a socket connection to specified host and port
+        Connects to the node at the specified host and port and gets its session.
         :param port: Host address to connect to.
         :type port: str.
         :param speed: Port number to connect to.
         :type speed: int.
         :param timeout: Sets timeout for socket interactions.
         :type timeout: float.
-        :return: True if the connection was open.
+        :return: True if the node answered.
         :rtype: bool.
         """
         try:
-            #self._socket_client.timeout = timeout
-            speed = int(speed)
-            self._socket_client.connect((port, speed))
-            Log.i(TAG, "Socket open {}:{}".format(port, speed))
-            return True
-        except socket.timeout:
-            Log.w(TAG, "Connection timeout")
-        return False
+            self._address = (port, int(speed))
+            sock = socket.create_connection(self._address, timeout)
+            try:
+                sock.settimeout(timeout)
+                buffer = bytearray()
+                while self._session is None:
+                    data = sock.recv(Constants.SocketClient.buffer_recv_size)
+                    if not data:
+                        break
+                    buffer += data
+                    for payload in read_frames(buffer):
+                        if payload[0] == FRAME_SESSION:
+                            self._session = decode_session(payload)
+            finally:
+                sock.close()
+        except (OSError, ValueError) as e:
+            Log.w(TAG, "Connection to {}:{} failed ({})".format(port, speed, e))
+            return False
+        if self._session is None:
+            Log.w(TAG, "No session from {}:{}".format(port, speed))
+            return False
+        # the GUI starts from the sweeps acquired from now on
+        self._last_sweep = self._session['sweep']
+        Log.i(TAG, "Socket open {}:{}, session {}".format(port, speed, self._session['session']))
+        return True
 
     def run(self):
         """
-        Reads the socket until a stop call is made.
+        Receives the sweeps until a stop call is made, reconnecting when the
+        connection is lost.
         :return:
         """
         Log.i(TAG, "Process starting...")
-        timestamp = time()
+        while not self._exit.is_set():
+            try:
+                sock = socket.create_connection(self._address, Constants.SocketClient.timeout)
+            except OSError as e:
+                Log.w(TAG, "Node {}:{} not reachable ({}), retrying...".format(self._address[0], self._address[1], e))
+                self._exit.wait(Constants.SocketClient.reconnect_interval)
+                continue
+            try:
+                self._receive(sock)
+            except OSError as e:
+                print(TAG, "WARNING: connection to the node lost ({}), reconnecting...".format(e))
+                Log.w(TAG, "Connection to the node lost ({}), reconnecting...".format(e))
+            finally:
+                sock.close()
+            self._exit.wait(Constants.SocketClient.reconnect_interval)
+        # ROUTER: no more sweep records
+        self._parser.close()
+        Log.i(TAG, "Process finished")
 
+    def _receive(self, sock):
+        """
+        Resumes after the last sweep received and adds the records to the parser.
+        :param sock: Connection to the node.
+        :type sock: socket.
+        :return:
+        """
+        # short timeout: a stop call is seen while the node is silent
+        sock.settimeout(Constants.SocketClient.reconnect_interval)
+        buffer = bytearray()
+        idle = 0
         while not self._exit.is_set():
-            stamp = time() - timestamp
             try:
-                data = self._socket_client.recv(Constants.SocketClient.buffer_recv_size).decode()
-                if len(data) > 0:
-                    self._parser.add([stamp, data])
+                data = sock.recv(Constants.SocketClient.buffer_recv_size)
             except socket.timeout:
-                Log.w(TAG, "read timeout")
-        Log.i(TAG, "Process finished")
+                idle += Constants.SocketClient.reconnect_interval
+                if idle >= Constants.SocketClient.timeout:
+                    raise ConnectionError("no data for {} s".format(Constants.SocketClient.timeout))
+                continue
+            idle = 0
+            if not data:
+                raise ConnectionError("closed by the node")
+            buffer += data
+            for payload in read_frames(buffer):
+                if payload[0] == FRAME_SESSION:
+                    session = decode_session(payload)
+                    if session['session'] != self._session['session']:
+                        # the node has restarted: new settings, the acquisition ends
+                        print(TAG, "WARNING: the node has restarted (session {}), acquisition stopped".format(session['session']))
+                        Log.w(TAG, "The node has restarted (session {}), acquisition stopped".format(session['session']))
+                        self._restarted.set()
+                        self._exit.set()
+                        return
+                    sock.sendall(encode_resume(self._last_sweep))
+                elif payload[0] == FRAME_RECORD:
+                    record = decode_record(payload)
+                    # the clock of the node may differ: latency measured from the reception
+                    record.acquired = time()
+                    if record.sweep <= self._last_sweep:
+                        continue
+                    if record.sweep > self._last_sweep + 1:
+                        Log.w(TAG, "Sweeps {} to {} lost".format(self._last_sweep + 1, record.sweep - 1))
+                    self._parser.add_sweep(record)
+                    self._last_sweep = record.sweep
 
     def stop(self):
         """
@@ -72,16 +152,59 @@ class SocketProcess(multiprocessing.Process):
         :return:
         """
         Log.i(TAG, "Process finishing...")
-        self._socket_client.close()
         self._exit.set()
 
+    def is_restarted(self):
+        """
+        Returns True if the acquisition ended because the node has restarted.
+        :return: bool.
+        """
+        return self._restarted.is_set()
+
+    def get_session(self):
+        """
+        Returns the acquisition settings of the node (available after open).
+        :return: dict.
+        """
+        return self._session
+
+    def get_frequencies(self, samples):
+        """
+        Returns the sweep settings of the node, as SerialProcess.get_frequencies.
+        :param samples: Unused, the node sets the number of samples.
+        :type samples: int.
+        :return: overtone name and value, frequency step, frequency range, filter and spline settings.
+        :rtype: tuple.
+        """
+        session = self._session
+        readFREQ = np.arange(session['samples']) * session['fStep'] + session['start']
+        return (session['overtone_name'], session['overtone_value'], session['fStep'], readFREQ,
+                session['SG_window_size'], session['spline_points'], session['spline_factor'])
+
+    def get_estimator_type(self):
+        """
+        Returns the resonance estimator of the node.
+        :return: EstimatorType.
+        """
+        return EstimatorType[self._session['estimator']]
+
+    def get_overtones(self):
+        """
+        Returns the overtones acquired by the node (selected overtone first).
+        :return: int list.
+        """
+        return self._session['overtones']
+
     @staticmethod
     def get_default_host():
         """
         Returns a list of local host names, localhost, host name and local ip address, if available.
         :return: str list.
         """
-        values = socket.gethostbyaddr(socket.gethostname())
+        try:
+            values = socket.gethostbyaddr(socket.gethostname())
+        except OSError:
+            return [Constants.SocketClient.host_default]
         hostname = values[0]
         hostip = values[2][0]
 
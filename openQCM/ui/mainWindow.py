@@ -116,6 +116,8 @@ class MainWindow(QtGui.QMainWindow):
         self._curve_frequency = None      # Resonance frequency curve (plt2)
         self._curve_dissipation = None    # Dissipation curve (plt3)
         self._curve_temperature = None    # Temperature curve (plt4)
+        self._overtone_curves = {}        # MULTI-OVERTONE: (frequency, dissipation) curves per overtone
+        self._device_curves = {}          # MULTI-DEVICE: (frequency, dissipation) curves per additional device
 
         # Theme-specific curve color (only temperature changes with theme)
         self._theme_temp_color = None
@@ -139,9 +141,11 @@ class MainWindow(QtGui.QMainWindow):
         # The serial port is kept open (locked) until Disconnect is pressed.
         # =============================================================================
         self._serial_connected = False
+        self._connected_remote = False
         self._connected_port = None
         self._serial_lock = None  # Serial object to keep port open
         self._lock_file = None    # File lock for exclusive access
+        self._device_locks = {}   # MULTI-DEVICE: file locks of the additional devices (by port)
 
         # Reference variables
         self._reference_flag = False
@@ -209,13 +213,19 @@ class MainWindow(QtGui.QMainWindow):
             self._serial_lock.close()
             print(TAG, "Serial lock released for acquisition")
 
+        # MULTI-DEVICE: locks the ports of the additional devices (measurement only)
+        device_ports = []
+        if self._get_source() == SourceType.serial:
+            device_ports = self._acquire_device_locks()
+
         # Instantiates process
         self.worker = Worker(QCS_on = self._QCS_installed,
                              port = port,
                              speed = self.ui.cBox_Speed.currentText(),
                              samples = self.ui.sBox_Samples.value(),
                              source = self._get_source(),
-                             export_enabled = self.ui.chBox_export.isChecked())
+                             export_enabled = self.ui.chBox_export.isChecked(),
+                             device_ports = device_ports)
 
         if self.worker.start():
             # Gets frequency range 
@@ -271,6 +281,22 @@ class MainWindow(QtGui.QMainWindow):
                 _set_data_value(self.ui.info5, label5)
                 label7= str(Constants.argument_default_samples-1)
                 _set_data_value(self.ui.info7, label7)
+                # MULTI-OVERTONE/MULTI-DEVICE: parallel traces of the other overtones and devices
+                self._configure_overtone_curves()
+
+            elif self._get_source() == SourceType.SocketClient:
+                # REMOTE NODE: settings of the node
+                _set_data_value(self.ui.info1a, "Node {}".format(port))
+                _set_data_value(self.ui.info11, "Remote openQCM Q-1")
+                self._overtone_name,self._overtone_value, self._fStep = self.worker.get_overtone()
+                _set_data_value(self.ui.info6, str(int(self._overtone_value))+" Hz")
+                _set_data_value(self.ui.info2, str(self._overtone_name))
+                _set_data_value(self.ui.info3, str(int(self._readFREQ[0]))+" Hz")
+                _set_data_value(self.ui.info4, str(int(self._readFREQ[-1]))+" Hz")
+                _set_data_value(self.ui.info4a, str(int(self._readFREQ[-1]-self._readFREQ[0]))+" Hz")
+                _set_data_value(self.ui.info5, str(int(self._fStep))+" Hz")
+                _set_data_value(self.ui.info7, str(len(self._readFREQ)-1))
+                self._configure_overtone_curves()
                                      
             elif self._get_source() == SourceType.calibration:
                 label_quartz = self.ui.cBox_Speed.currentText()
@@ -314,6 +340,7 @@ class MainWindow(QtGui.QMainWindow):
                self.ui.pButton_Clear.setEnabled(False) #insert
                self.ui.pButton_Reference.setEnabled(False) #insert
         else:
+            self._release_device_locks()
             print(TAG, "Warning: port is not available!")
             Log.i(TAG, "Warning: port is not available")
             PopUp.warning(self, Constants.app_title, "Warning: Selected Port [{}] is not available!".format(self.ui.cBox_Port.currentText()))
@@ -419,9 +446,11 @@ class MainWindow(QtGui.QMainWindow):
         import serial
         # Wait for the process to fully terminate
         self.worker.wait_for_process(timeout=5.0)
+        # MULTI-DEVICE: the additional devices are locked for the acquisition only
+        self._release_device_locks()
 
-        # Reacquire serial lock if we're still connected
-        if self._serial_connected and self._connected_port:
+        # Reacquire serial lock if we're still connected (not for a remote node)
+        if self._serial_connected and self._connected_port and not self._connected_remote:
             if self._serial_lock is None or not self._serial_lock.isOpen():
                 try:
                     try:
@@ -719,6 +748,7 @@ class MainWindow(QtGui.QMainWindow):
         # Data menu actions
         self.ui.actionDataView.triggered.connect(self._open_data_viewer)
         self.ui.actionRawDataView.triggered.connect(self._open_raw_data_viewer)
+        self.ui.actionCompareView.triggered.connect(self._open_compare_viewer)
 
     ###########################################################################
     # Toggle START / STOP
@@ -806,7 +836,9 @@ class MainWindow(QtGui.QMainWindow):
         self.worker.consume_queue4()
         self.worker.consume_queue5()
         self.worker.consume_queue6()
-        self.worker.consume_queue_tracking()
+        self.worker.consume_queue_sweep()
+        # MULTI-DEVICE: same timer for the additional devices
+        self.worker.consume_devices()
 
         # AUTO-TRACKING: Check for tracking updates and update X-axis if needed
         self._handle_auto_tracking()
@@ -820,7 +852,16 @@ class MainWindow(QtGui.QMainWindow):
         
         # MEASUREMENT: dynamic frequency and dissipation labels at run-time
         ###################################################################
-        if  self._get_source() == SourceType.serial:
+        if  self._get_source() in (SourceType.serial, SourceType.SocketClient):
+            # REMOTE: the node has restarted with new settings, the session ends here
+            if self.worker.is_node_restarted():
+                if self._is_running:  # Guard: only call stop() once
+                    self.stop()
+                    self.ui.infostatus.setText("Node Restarted")
+                    self.ui.infostatus.setStyleSheet('background: #ffff00; padding: 1px; border: 1px solid #cccccc')
+                    self.ui.infobar.setText("Warning: the remote node has restarted, acquisition stopped. Start again to record its new session.")
+                    self.ui.infobar.setStyleSheet('background-color: #fff3e0; color: #e65100; padding: 8px; border-radius: 4px;')
+                return
             vector1 = self.worker.get_d1_buffer()
             vector2 = self.worker.get_d2_buffer()
             vectortemp = self.worker.get_d3_buffer()
@@ -1077,8 +1118,9 @@ class MainWindow(QtGui.QMainWindow):
             ###################################################################
             # Amplitude and phase Plot - using setData() for efficiency
             # NOTE: sigResized.connect moved to _configure_plot() to avoid signal accumulation
-            self._curve_amplitude.setData(x=self._readFREQ, y=self.worker.get_value1_buffer())
-            self._curve_phase.setData(x=self._readFREQ, y=self.worker.get_value2_buffer())
+            if len(self.worker.get_value1_buffer()) == len(self._readFREQ):
+               self._curve_amplitude.setData(x=self._readFREQ, y=self.worker.get_value1_buffer())
+               self._curve_phase.setData(x=self._readFREQ, y=self.worker.get_value2_buffer())
 
             ###################################################################
             # Resonance frequency and dissipation Plot - using setData()
@@ -1131,9 +1173,11 @@ class MainWindow(QtGui.QMainWindow):
                calibration_readFREQ = np.arange(len(self.worker.get_value1_buffer())) * (Constants.calib_fStep) + Constants.calibration_frequency_start
                self._curve_amplitude.setData(x=calibration_readFREQ, y=self.worker.get_value1_buffer())
                self._curve_phase.setData(x=calibration_readFREQ, y=self.worker.get_value2_buffer())
-            elif self._get_source() == SourceType.serial:
-               self._curve_amplitude.setData(x=self._readFREQ, y=self.worker.get_value1_buffer())
-               self._curve_phase.setData(x=self._readFREQ, y=self.worker.get_value2_buffer())
+            elif self._get_source() in (SourceType.serial, SourceType.SocketClient):
+               # skips the last sweep of a window that has just been resized
+               if len(self.worker.get_value1_buffer()) == len(self._readFREQ):
+                  self._curve_amplitude.setData(x=self._readFREQ, y=self.worker.get_value1_buffer())
+                  self._curve_phase.setData(x=self._readFREQ, y=self.worker.get_value2_buffer())
 
             ###################################################################
             # Resonance frequency and dissipation Plot - using setData()
@@ -1174,9 +1218,65 @@ class MainWindow(QtGui.QMainWindow):
                 if np.any(valid_mask):
                     first_valid = t3_buffer[valid_mask][0]
                     self._xaxis_temp.set_start_time(first_valid)     
+
+        # MULTI-OVERTONE/MULTI-DEVICE: frequency shift (Df/n) and dissipation of every trace
+        if self._overtone_curves or self._device_curves:
+            self._update_overtone_curves()
           
     ###########################################################################################################################################
 
+    ###########################################################################
+    # MULTI-OVERTONE/MULTI-DEVICE: Creates a frequency and a dissipation trace
+    # per additional overtone and per additional device
+    ###########################################################################
+    def _configure_overtone_curves(self):
+        for (curve_frequency, curve_dissipation) in list(self._overtone_curves.values()) + list(self._device_curves.values()):
+            self._legend2.removeItem(curve_frequency)
+            self._plt2.removeItem(curve_frequency)
+            self._plt3.removeItem(curve_dissipation)
+        self._overtone_curves = {}
+        self._device_curves = {}
+        # (curves, key, legend name) of every trace
+        traces = [(self._overtone_curves, overtone, "Harmonic {}".format(2 * overtone + 1))
+                  for overtone in self.worker.get_overtones()[1:]]
+        traces += [(self._device_curves, i, "Device {}".format(i + 1))
+                   for i in range(len(self.worker.get_devices()))]
+        for i, (curves, key, name) in enumerate(traces):
+            color = Constants.plot_colors[(4 + i) % Constants.plot_max_lines]
+            curve_frequency = self._plt2.plot(pen=color, name=name)
+            # dissipation: same color, dashed
+            curve_dissipation = pg.PlotCurveItem(pen=pg.mkPen(color, style=QtCore.Qt.DashLine))
+            self._plt3.addItem(curve_dissipation)
+            curves[key] = (curve_frequency, curve_dissipation)
+
+    ###########################################################################
+    # MULTI-OVERTONE/MULTI-DEVICE: Updates the traces of all the overtones and devices
+    ###########################################################################
+    def _update_overtone_curves(self):
+        # frequencies as shift from the first value divided by the harmonic number,
+        # so that the overtones and the devices share the same scale
+        overtones = self.worker.get_overtones()
+        self._curve_frequency.setData(x=self.worker.get_t1_buffer(),
+                                      y=self._frequency_shift(self.worker.get_d1_buffer(), overtones[0]))
+        for overtone, (curve_frequency, curve_dissipation) in self._overtone_curves.items():
+            (t1, d1, t2, d2) = self.worker.get_overtone_buffers(overtone)
+            curve_frequency.setData(x=t1, y=self._frequency_shift(d1, overtone))
+            curve_dissipation.setData(x=t2, y=d2)
+        devices = self.worker.get_devices()
+        for i, (curve_frequency, curve_dissipation) in self._device_curves.items():
+            device = devices[i]
+            curve_frequency.setData(x=device.get_t1_buffer(),
+                                    y=self._frequency_shift(device.get_d1_buffer(), overtones[0]))
+            curve_dissipation.setData(x=device.get_t2_buffer(), y=device.get_d2_buffer())
+
+    @staticmethod
+    def _frequency_shift(frequency, overtone):
+        # ring buffers hold the newest value first: the first value is the last valid one
+        valid = frequency[~np.isnan(frequency)]
+        if len(valid) == 0:
+            return frequency
+        return (frequency - valid[-1]) / (2 * overtone + 1)
+
     ###########################################################################
     # AUTO-TRACKING: Handle tracking state changes and update GUI
     ###########################################################################
@@ -1188,10 +1288,8 @@ class MainWindow(QtGui.QMainWindow):
         (activated, start_freq, stop_freq, ref_freq, count) = self.worker.get_tracking_state()
 
         if activated and start_freq is not None and stop_freq is not None:
-            # Update internal frequency range
-            samples = Constants.argument_default_samples
-            fStep = (stop_freq - start_freq) / (samples - 1)
-            self._readFREQ = np.arange(samples) * fStep + start_freq
+            # Update internal frequency range (samples may change with the window size)
+            self._readFREQ = self.worker.get_frequency_range()
 
             # Update the Device Information panel
             _set_data_value(self.ui.info3, "{:.0f} Hz".format(start_freq))
@@ -1225,6 +1323,18 @@ class MainWindow(QtGui.QMainWindow):
         elif self._get_source() == SourceType.calibration:
             print(TAG, "Mode: {}".format(Constants.app_sources[1]))
             Log.i(TAG, "Mode: {}".format(Constants.app_sources[1]))
+        elif self._get_source() == SourceType.SocketClient:
+            print(TAG, "Mode: {}".format(Constants.app_sources[2]))
+            Log.i(TAG, "Mode: {}".format(Constants.app_sources[2]))
+
+        # REMOTE NODE: host and port of the node can be typed in
+        remote = self._get_source() == SourceType.SocketClient
+        self.ui.cBox_Port.setEditable(remote)
+        self.ui.cBox_Speed.setEditable(remote)
+
+        # REMOTE NODE: a serial port and a node are not interchangeable
+        if self._serial_connected and (self._get_source() == SourceType.SocketClient) != self._connected_remote:
+            self._toggle_serial_connection()
 
         # If serial is connected, don't change port selection
         if self._serial_connected:
@@ -1299,24 +1409,67 @@ class MainWindow(QtGui.QMainWindow):
         if sys.platform == 'win32':
             return True
 
+        self._lock_file = self._lock_port(port)
+        return self._lock_file is not None
+
+    def _lock_port(self, port):
+        """
+        Opens the lock file of a port and locks it (Unix only).
+        Returns the open lock file, or None if the port is locked by another process.
+        """
         import fcntl
         lock_path = self._get_lock_file_path(port)
+        lock_file = None
 
         try:
             # Open (or create) the lock file
-            self._lock_file = open(lock_path, 'w')
+            lock_file = open(lock_path, 'w')
             # Try to acquire exclusive lock (non-blocking)
-            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
             # Write PID to lock file for debugging
-            self._lock_file.write(str(os.getpid()))
-            self._lock_file.flush()
-            return True
+            lock_file.write(str(os.getpid()))
+            lock_file.flush()
+            return lock_file
         except (IOError, OSError) as e:
             # Lock acquisition failed - port is locked by another process
-            if self._lock_file:
-                self._lock_file.close()
-                self._lock_file = None
-            return False
+            if lock_file:
+                lock_file.close()
+            return None
+
+    def _acquire_device_locks(self):
+        """
+        MULTI-DEVICE: locks the ports of the additional devices.
+        Returns the ports that were locked, the others are skipped with a warning.
+        """
+        self._release_device_locks()
+        ports = []
+        for port in Constants.multi_device_ports:
+            if port == self._connected_port:
+                continue
+            if sys.platform == 'win32':
+                ports.append(port)
+                continue
+            lock_file = self._lock_port(port)
+            if lock_file is None:
+                print(TAG, "Warning: device port {} locked by another instance, skipped".format(port))
+                Log.w(TAG, "Device port {} locked by another instance, skipped".format(port))
+                continue
+            self._device_locks[port] = lock_file
+            ports.append(port)
+        return ports
+
+    def _release_device_locks(self):
+        # MULTI-DEVICE: releases the locks of the additional devices
+        if not self._device_locks:
+            return
+        import fcntl
+        for lock_file in self._device_locks.values():
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+                lock_file.close()
+            except Exception as e:
+                print(TAG, "Warning: Error releasing lock file: {}".format(str(e)))
+        self._device_locks = {}
 
     def _release_port_lock(self):
         """
@@ -1354,6 +1507,23 @@ class MainWindow(QtGui.QMainWindow):
                 PopUp.warning(self, Constants.app_title, "No port selected!")
                 return
 
+            # REMOTE NODE: nothing to lock, the node is reached on START
+            if self._get_source() == SourceType.SocketClient:
+                self._serial_connected = True
+                self._connected_remote = True
+                self._connected_port = port
+                self.ui.pButton_Connect.setText("Disconnect")
+                self._set_button_role(self.ui.pButton_Connect, "btnDisconnect")
+                self.ui.cBox_Port.setEnabled(False)
+                self.ui.pButton_Refresh.setEnabled(False)
+                self.ui.pButton_StartStop.setEnabled(True)
+                self.ui.set_connection_state(True)
+                self.ui.infostatus.setText("Standby")
+                self.ui.infobar.setText("Remote node {}".format(port))
+                print(TAG, "Remote node selected: {}".format(port))
+                Log.i(TAG, "Remote node selected: {}".format(port))
+                return
+
             # First, try to acquire the lock file
             if not self._acquire_port_lock(port):
                 # Lock acquisition failed - another instance has the port
@@ -1436,6 +1606,7 @@ class MainWindow(QtGui.QMainWindow):
             self._release_port_lock()
 
             self._serial_connected = False
+            self._connected_remote = False
             self._connected_port = None
             self.ui.pButton_Connect.setText("Connect")
             self._set_button_role(self.ui.pButton_Connect, "btnConnect")
@@ -1804,14 +1975,29 @@ class MainWindow(QtGui.QMainWindow):
         from PyQt5.QtWidgets import QFileDialog
         from openQCM.ui.mainWindow_ui import DataViewerDialog
         csv_path, _ = QFileDialog.getOpenFileName(
-            self, "Open CSV Data File",
+            self, "Open Data File",
             Constants.csv_export_path,
-            "CSV Files (*.csv);;All Files (*)")
+            "Data Files (*.csv *.{0} *_manifest.json);;CSV Files (*.csv);;HDF5 Session Files (*.{0});;Segmented Sessions (*_manifest.json);;All Files (*)".format(Constants.session_extension))
         if csv_path:
             theme = 'dark' if self.ui.actionDarkTheme.isChecked() else 'light'
             viewer = DataViewerDialog(self, csv_path=csv_path, theme=theme)
             viewer.show()
 
+    ###########################################################################
+    # Opens Compare Sessions dialog overlaying several data files
+    ###########################################################################
+    def _open_compare_viewer(self):
+        from PyQt5.QtWidgets import QFileDialog
+        from openQCM.ui.mainWindow_ui import CompareViewerDialog
+        paths, _ = QFileDialog.getOpenFileNames(
+            self, "Compare Sessions",
+            Constants.csv_export_path,
+            "Data Files (*.csv *.{0} *_manifest.json);;CSV Files (*.csv);;HDF5 Session Files (*.{0});;Segmented Sessions (*_manifest.json);;All Files (*)".format(Constants.session_extension))
+        if paths:
+            theme = 'dark' if self.ui.actionDarkTheme.isChecked() else 'light'
+            viewer = CompareViewerDialog(self, paths=paths, theme=theme)
+            viewer.show()
+
     ###########################################################################
     # Opens Raw Data View dialog showing live amplitude/phase sweep curves
     ###########################################################################
@@ -96,11 +96,60 @@ class DeviceInfoDialog(QtWidgets.QDialog):
         return widget
 
 
+###############################################################################################################
+# Data Loader - Reads data files in a background thread, a chunk at a time
+###############################################################################################################
+class DataLoader(QtCore.QThread):
+    """Reads the files of a session (CSV through CSVLoader and its cache, or HDF5) into a MinMaxPyramid and emits the rows as they are parsed."""
+    chunk = QtCore.pyqtSignal(object, float)  # rows (relative time, frequency, dissipation), fraction of the bytes read
+    loaded = QtCore.pyqtSignal(str)           # title
+    failed = QtCore.pyqtSignal(str)           # error
+
+    def __init__(self, files, pyramid, parent=None):
+        super().__init__(parent)
+        self._files = files
+        self._pyramid = pyramid
+        self._cancel = False
+
+    def cancel(self):
+        self._cancel = True
+
+    def run(self):
+        import os
+        from openQCM.common.csvLoader import CSVLoader
+        try:
+            total = max(1, sum(os.path.getsize(path) for path in self._files))
+            (done, title) = (0, "")
+            for (k, path) in enumerate(self._files):
+                if path.lower().endswith(".h5"):
+                    (data, segment_title) = DataViewerDialog._load_session(path)
+                    title = title or segment_title
+                    done += os.path.getsize(path)
+                    self._pyramid.append(data)
+                    self.chunk.emit(data, done / total)
+                else:
+                    loader = CSVLoader(path)
+                    for (data, offset) in loader.chunks():
+                        # cancelled: the generator is closed, no cache written
+                        if self._cancel:
+                            return
+                        self._pyramid.append(data)
+                        self.chunk.emit(data, (done + offset) / total)
+                    done += loader.size
+                if self._cancel:
+                    return
+            if len(self._files) > 1:
+                title += " | {} segments".format(len(self._files))
+            self.loaded.emit(title)
+        except Exception as e:
+            self.failed.emit(str(e))
+
+
 ###############################################################################################################
 # Data Viewer Dialog - Non-modal window for viewing logged CSV data
 ###############################################################################################################
 class DataViewerDialog(QtWidgets.QDialog):
-    """Non-modal dialog for viewing logged CSV data with Frequency and Dissipation plots."""
+    """Non-modal dialog for viewing logged CSV (or HDF5 session) data with Frequency and Dissipation plots."""
 
     def __init__(self, parent=None, csv_path=None, theme='dark'):
         super().__init__(parent)
@@ -135,6 +184,20 @@ class DataViewerDialog(QtWidgets.QDialog):
         self._info_label.setAlignment(QtCore.Qt.AlignCenter)
         layout.addWidget(self._info_label)
 
+        # Loading progress (background loader), hidden once loaded
+        self._loader = None
+        progress_layout = QtWidgets.QHBoxLayout()
+        self._progress_bar = QtWidgets.QProgressBar()
+        self._progress_bar.setRange(0, 1000)
+        self._progress_bar.setTextVisible(False)
+        self._cancel_button = QtWidgets.QPushButton("Cancel")
+        self._cancel_button.clicked.connect(self._cancel_loading)
+        progress_layout.addWidget(self._progress_bar, stretch=1)
+        progress_layout.addWidget(self._cancel_button)
+        layout.addLayout(progress_layout)
+        self._progress_bar.hide()
+        self._cancel_button.hide()
+
         # PyQtGraph plot widget
         import pyqtgraph as pg
         self._plot_widget = pg.GraphicsLayoutWidget()
@@ -170,54 +233,417 @@ class DataViewerDialog(QtWidgets.QDialog):
         # Link X axes
         self._plt_diss.setXLink(self._plt_freq)
 
+        # LOD: the visible time span is queried again when the view changes
+        self._pyramid = None
+        self._plt_freq.getViewBox().sigXRangeChanged.connect(self._update_curves)
+        self._plt_freq.getViewBox().sigResized.connect(self._update_curves)
+
         # Load and plot data
         if csv_path:
             self._load_and_plot(csv_path)
 
     def _load_and_plot(self, csv_path):
-        """Load CSV file and plot Frequency and Dissipation vs Relative Time."""
+        """Load CSV (or HDF5 session) file in a background thread and plot Frequency and Dissipation vs Relative Time as the rows arrive."""
+        import os
         import pyqtgraph as pg
-        import numpy as np
+        from openQCM.common.sessionSegments import session_files
+        from openQCM.common.minMaxPyramid import MinMaxPyramid
         try:
-            # Read CSV (skip header row)
-            # Columns: Date, Time, Relative_time, Temperature, Resonance_Frequency, Dissipation
-            data = []
-            import csv
-            with open(csv_path, 'r') as f:
-                reader = csv.reader(f)
-                header = next(reader)  # skip header
-                for row in reader:
-                    try:
-                        rel_time = float(row[2])
-                        freq = float(row[4])
-                        diss = float(row[5])
-                        data.append((rel_time, freq, diss))
-                    except (ValueError, IndexError):
-                        continue
-
-            if not data:
-                self._info_label.setText("No valid data found in file.")
-                return
+            # ROLLOVER: the segments of a session are read as one stream
+            files = session_files(csv_path)
+        except Exception as e:
+            self._info_label.setText("Error loading file: {}".format(str(e)))
+            return
+        # Curves drawn from the min/max pyramid, filled chunk by chunk
+        self._curve_freq = self._plt_freq.plot([], [], pen=pg.mkPen('#008EC0', width=1), name='Resonance Frequency')
+        self._curve_diss = self._plt_diss.plot([], [], pen=pg.mkPen('#DD8E6B', width=1), name='Dissipation')
+        self._pyramid = MinMaxPyramid(columns=2)
+        self._plot_time = 0
+        self._info_label.setText("Loading {}...".format(os.path.basename(csv_path)))
+        self._progress_bar.show()
+        self._cancel_button.show()
+        self._loader = DataLoader(files, self._pyramid, self)
+        self._loader.chunk.connect(self._on_chunk)
+        self._loader.loaded.connect(self._on_loaded)
+        self._loader.failed.connect(self._on_failed)
+        self._loader.start()
+
+    def _on_chunk(self, data, fraction):
+        from time import time
+        self._progress_bar.setValue(int(1000 * fraction))
+        # redraw at most 5 times per second while loading
+        if time() - self._plot_time > 0.2:
+            self._plot_time = time()
+            self._update_curves()
+
+    def _update_curves(self, *args):
+        """Draw the visible time span (the whole session while auto-ranged) at screen resolution."""
+        if self._pyramid is None:
+            return
+        view = self._plt_freq.getViewBox()
+        span = self._pyramid.span()
+        if span is None:
+            return
+        (start, stop) = span if view.autoRangeEnabled()[0] else view.viewRange()[0]
+        (t, values) = self._pyramid.query(start, stop, view.width())
+        self._curve_freq.setData(t, values[:, 0])
+        self._curve_diss.setData(t, values[:, 1])
+
+    def _on_loaded(self, title):
+        self._loader_done()
+        self._update_curves()
+        span = self._pyramid.span()
+        if span is None:
+            self._info_label.setText("No valid data found in file.")
+            return
 
-            data = np.array(data)
-            t = data[:, 0]
-            freq = data[:, 1]
-            diss = data[:, 2]
+        # Info label
+        duration_s = span[1] - span[0]
+        duration_min = duration_s / 60.0
+        self._info_label.setText("{} data points | Duration: {:.1f} min ({:.0f} s){}".format(
+            len(self._pyramid), duration_min, duration_s, title))
+
+    def _on_failed(self, error):
+        self._loader_done()
+        self._update_curves()
+        self._info_label.setText("Error loading file: {}".format(error))
+
+    def _cancel_loading(self):
+        if self._loader is not None:
+            self._loader.cancel()
+            self._loader.wait()
+            self._loader_done()
+            self._update_curves()
+            self._info_label.setText("Loading cancelled: {} data points".format(len(self._pyramid)))
+
+    def _loader_done(self):
+        self._loader = None
+        self._progress_bar.hide()
+        self._cancel_button.hide()
 
-            # Info label
-            duration_s = t[-1] - t[0]
-            duration_min = duration_s / 60.0
-            self._info_label.setText("{} data points | Duration: {:.1f} min ({:.0f} s)".format(
-                len(t), duration_min, duration_s))
+    def closeEvent(self, event):
+        if self._loader is not None:
+            self._loader.cancel()
+            self._loader.wait()
+        super().closeEvent(event)
+
+    @staticmethod
+    def _load_csv(csv_path):
+        """Read relative time, frequency and dissipation from a CSV file."""
+        import numpy as np
+        from openQCM.common.csvLoader import CSVLoader
+        rows = [data for (data, offset) in CSVLoader(csv_path).chunks()]
+        return (np.concatenate(rows) if rows else np.empty((0, 3))), ""
 
-            # Plot Frequency (blue)
-            self._plt_freq.plot(t, freq, pen=pg.mkPen('#008EC0', width=1), name='Resonance Frequency')
+    @staticmethod
+    def _load_session(session_path):
+        """Read relative time, frequency and dissipation of the selected harmonic from an HDF5 session file."""
+        import numpy as np
+        from openQCM.common.sessionFile import read_session
+        (columns, metadata) = read_session(session_path)
+        harmonic = 2 * metadata.get('overtones', [0])[0] + 1
+        rows = columns['harmonic'] == harmonic
+        data = np.column_stack((columns['relative_time'][rows], columns['frequency'][rows], columns['dissipation'][rows]))
+        title = ""
+        if 'overtone_name' in metadata:
+            title = " | {} {:.0f} Hz".format(metadata['overtone_name'], metadata.get('overtone_value', 0))
+        return data, title
 
-            # Plot Dissipation (brown)
-            self._plt_diss.plot(t, diss, pen=pg.mkPen('#DD8E6B', width=1), name='Dissipation')
 
-        except Exception as e:
-            self._info_label.setText("Error loading file: {}".format(str(e)))
+###############################################################################################################
+# Compare Viewer Dialog - Non-modal window overlaying the f/D of several sessions
+###############################################################################################################
+# Colors of the compared sessions (frequency and dissipation curves of a session share a color)
+COMPARE_COLORS = ['#008EC0', '#DD8E6B', '#4caf50', '#e040fb', '#ffc107', '#f44336', '#9e9e9e', '#3f51b5']
+
+
+class CompareViewerDialog(QtWidgets.QDialog):
+    """
+    Non-modal dialog overlaying the Frequency and Dissipation of several sessions, aligned on relative time or on
+    an event marked in each session, with optional baseline subtraction. Sessions are loaded in parallel (DataLoader
+    threads), drawn from their min/max pyramid; their samples are kept within Constants.compare_memory_mb.
+    """
+
+    def __init__(self, parent=None, paths=(), theme='dark'):
+        super().__init__(parent)
+        import pyqtgraph as pg
+        from openQCM.common.sessionCompare import SessionComparison
+        self._theme = theme
+        self.setWindowTitle("Compare Sessions")
+        self.setMinimumSize(1000, 600)
+        self.resize(1200, 750)
+        self.setWindowFlags(self.windowFlags() | QtCore.Qt.Window)
+        self.setAttribute(QtCore.Qt.WA_DeleteOnClose, True)
+
+        # Colors based on theme
+        if theme == 'dark':
+            bg_color = DARK_BG
+            text_color = '#ffffff'
+            axis_color = '#aaaaaa'
+        else:
+            bg_color = LIGHT_BG
+            text_color = '#333333'
+            axis_color = '#666666'
+
+        self._comparison = SessionComparison()
+        self._curves = {}
+        self._loaders = {}
+        self._queue = []
+        self._reduced = 0
+        self._plot_time = 0
+
+        # Main layout: sessions and options | plots
+        layout = QtWidgets.QHBoxLayout(self)
+        layout.setContentsMargins(8, 8, 8, 8)
+        panel = QtWidgets.QVBoxLayout()
+        layout.addLayout(panel)
+
+        # Sessions (checked: shown)
+        self._session_list = QtWidgets.QListWidget()
+        self._session_list.setMinimumWidth(260)
+        self._session_list.itemChanged.connect(self._on_item_changed)
+        panel.addWidget(self._session_list, stretch=1)
+        buttons = QtWidgets.QHBoxLayout()
+        self._add_button = QtWidgets.QPushButton("Add...")
+        self._add_button.clicked.connect(self._add_dialog)
+        self._remove_button = QtWidgets.QPushButton("Remove")
+        self._remove_button.clicked.connect(self._remove_selected)
+        buttons.addWidget(self._add_button)
+        buttons.addWidget(self._remove_button)
+        panel.addLayout(buttons)
+
+        # Alignment, event, baseline
+        form = QtWidgets.QFormLayout()
+        self._align_combo = QtWidgets.QComboBox()
+        self._align_combo.addItems(["Relative time", "Marked event"])
+        self._align_combo.currentIndexChanged.connect(self._on_align_changed)
+        form.addRow("Align on", self._align_combo)
+        panel.addLayout(form)
+        self._mark_button = QtWidgets.QPushButton("Mark Event")
+        self._mark_button.setCheckable(True)
+        self._mark_button.setToolTip("Click on the plots to mark the event of the selected session")
+        panel.addWidget(self._mark_button)
+        self._baseline_check = QtWidgets.QCheckBox("Subtract baseline")
+        self._baseline_check.setToolTip("Frequency and dissipation relative to their value at the alignment origin")
+        self._baseline_check.toggled.connect(self._update_curves)
+        panel.addWidget(self._baseline_check)
+        self._info_label = QtWidgets.QLabel("")
+        self._info_label.setWordWrap(True)
+        panel.addWidget(self._info_label)
+
+        # PyQtGraph plot widget
+        self._plot_widget = pg.GraphicsLayoutWidget()
+        self._plot_widget.setBackground(bg_color)
+        layout.addWidget(self._plot_widget, stretch=1)
+        self._plt_freq = self._plot_widget.addPlot(row=0, col=0)
+        self._plt_freq.setLabel('left', 'Resonance Frequency', units='Hz', color=text_color)
+        self._plt_diss = self._plot_widget.addPlot(row=1, col=0)
+        self._plt_diss.setLabel('left', 'Dissipation', color=text_color)
+        for plot in (self._plt_freq, self._plt_diss):
+            plot.setLabel('bottom', 'Relative Time', units='s', color=text_color)
+            plot.showGrid(x=True, y=True, alpha=0.3)
+            for ax_name in ['left', 'bottom']:
+                plot.getAxis(ax_name).setPen(axis_color)
+                plot.getAxis(ax_name).setTextPen(axis_color)
+            legend = plot.addLegend(offset=(10, 10))
+            legend.setBrush(pg.mkBrush('#3c3c3c80' if theme == 'dark' else '#ffffff80'))
+            legend.setPen(pg.mkPen('#555555' if theme == 'dark' else '#cccccc'))
+        self._plt_diss.setXLink(self._plt_freq)
+        # Origin of the alignment (marked events at 0)
+        self._event_lines = [pg.InfiniteLine(pos=0, angle=90, movable=False,
+                                             pen=pg.mkPen(ACCENT_GREEN, width=1, style=QtCore.Qt.DashLine))
+                             for plot in (self._plt_freq, self._plt_diss)]
+        for (plot, line) in zip((self._plt_freq, self._plt_diss), self._event_lines):
+            plot.addItem(line, ignoreBounds=True)
+            line.setVisible(False)
+
+        # LOD: the visible time span is queried again when the view changes
+        self._plt_freq.getViewBox().sigXRangeChanged.connect(self._update_curves)
+        self._plt_freq.getViewBox().sigResized.connect(self._update_curves)
+        self._plot_widget.scene().sigMouseClicked.connect(self._on_plot_clicked)
+
+        self.add_sessions(paths)
+
+    ###########################################################################
+    # Sessions added and removed
+    ###########################################################################
+    def add_sessions(self, paths):
+        """Add sessions to the comparison (loaded in the background)."""
+        import pyqtgraph as pg
+        for path in paths:
+            try:
+                session = self._comparison.add(path)
+            except Exception as e:
+                self._info_label.setText("Error loading file: {}".format(str(e)))
+                continue
+            if session is None:
+                continue
+            color = COMPARE_COLORS[len(self._curves) % len(COMPARE_COLORS)]
+            self._curves[session] = (self._plt_freq.plot([], [], pen=pg.mkPen(color, width=1), name=session.label),
+                                     self._plt_diss.plot([], [], pen=pg.mkPen(color, width=1), name=session.label))
+            item = QtWidgets.QListWidgetItem(session.label)
+            item.setData(QtCore.Qt.UserRole, session)
+            item.setForeground(QtGui.QColor(color))
+            item.setFlags(item.flags() | QtCore.Qt.ItemIsUserCheckable)
+            item.setCheckState(QtCore.Qt.Checked)
+            self._session_list.addItem(item)
+            self._load(session)
+        self._update_info()
+
+    def _add_dialog(self):
+        from openQCM.core.constants import Constants
+        paths, _ = QtWidgets.QFileDialog.getOpenFileNames(
+            self, "Add Sessions", Constants.csv_export_path,
+            "Data Files (*.csv *.{0} *_manifest.json);;All Files (*)".format(Constants.session_extension))
+        self.add_sessions(paths)
+
+    def _remove_selected(self):
+        for item in self._session_list.selectedItems():
+            session = item.data(QtCore.Qt.UserRole)
+            if session in self._loaders:
+                self._loaders[session].cancel()
+            if session in self._queue:
+                self._queue.remove(session)
+            for (plot, curve) in zip((self._plt_freq, self._plt_diss), self._curves.pop(session)):
+                plot.removeItem(curve)
+            self._comparison.remove(session)
+            self._session_list.takeItem(self._session_list.row(item))
+        self._update_info()
+
+    def _on_item_changed(self, item):
+        session = item.data(QtCore.Qt.UserRole)
+        if session is None:
+            return
+        session.visible = item.checkState() == QtCore.Qt.Checked
+        event = "" if session.event is None else "  (event at {:.1f} s)".format(session.event)
+        if item.text() != session.label + event:
+            item.setText(session.label + event)
+        self._update_curves()
+
+    ###########################################################################
+    # Loading: Constants.compare_loaders sessions at once
+    ###########################################################################
+    def _load(self, session):
+        if session not in self._queue and session not in self._loaders:
+            self._queue.append(session)
+            self._start_loaders()
+
+    def _start_loaders(self):
+        from openQCM.core.constants import Constants
+        from openQCM.common.minMaxPyramid import MinMaxPyramid
+        while self._queue and len(self._loaders) < Constants.compare_loaders:
+            session = self._queue.pop(0)
+            pyramid = MinMaxPyramid(columns=2)
+            session.load(pyramid)
+            loader = DataLoader(session.files, pyramid, self)
+            loader.chunk.connect(self._on_chunk)
+            loader.loaded.connect(lambda title, session=session: self._on_loaded(session))
+            loader.failed.connect(lambda error, session=session: self._on_loaded(session, error))
+            loader.finished.connect(lambda session=session: self._on_finished(session))
+            self._loaders[session] = loader
+            loader.start()
+
+    def _on_chunk(self, data, fraction):
+        from time import time
+        # redraw at most 5 times per second while loading
+        if time() - self._plot_time > 0.2:
+            self._plot_time = time()
+            self._update_curves()
+
+    def _on_loaded(self, session, error=None):
+        if error is not None:
+            self._info_label.setText("Error loading {}: {}".format(session.label, error))
+        if session in self._curves:
+            session.loaded()
+        self._update_curves()
+
+    def _on_finished(self, session):
+        # cancelled (removed): not loaded
+        loader = self._loaders.pop(session, None)
+        if loader is not None:
+            loader.deleteLater()
+        self._start_loaders()
+        self._update_info()
+
+    ###########################################################################
+    # Curves of the visible span, samples released or loaded again
+    ###########################################################################
+    def _update_curves(self, *args):
+        """Draw the visible time span (all sessions while auto-ranged) of each session at screen resolution."""
+        on_event = self._align_combo.currentIndex() == 1
+        view = self._plt_freq.getViewBox()
+        if view.autoRangeEnabled()[0]:
+            spans = [session.span(on_event) for session in self._curves if session.visible]
+            spans = [span for span in spans if span is not None]
+            if not spans:
+                return
+            (start, stop) = (min(span[0] for span in spans), max(span[1] for span in spans))
+        else:
+            (start, stop) = view.viewRange()[0]
+        (needed, missing) = ([], [])
+        for (session, (curve_freq, curve_diss)) in self._curves.items():
+            if not session.visible:
+                curve_freq.setData([], [])
+                curve_diss.setData([], [])
+                continue
+            if session.needs_samples(start, stop, view.width(), on_event):
+                (needed if session.pyramid is not None else missing).append(session)
+            (t, values) = session.query(start, stop, view.width(), on_event)
+            if self._baseline_check.isChecked():
+                baseline = session.baseline(on_event)
+                if baseline is not None:
+                    values = values - baseline
+            curve_freq.setData(t, values[:, 0])
+            curve_diss.setData(t, values[:, 1])
+        # MEMORY: samples not needed by the view released, zoomed sessions loaded again if they fit
+        self._comparison.release(needed)
+        self._reduced = 0
+        for session in missing:
+            if session in self._loaders or self._comparison.release(needed, extra=session.nbytes):
+                needed.append(session)
+                self._load(session)
+            else:
+                self._reduced += 1
+        self._update_info()
+
+    def _update_info(self):
+        from openQCM.core.constants import Constants
+        self._info_label.setText("{} sessions | {} loading\nSamples in memory: {:.0f} of {} MB{}".format(
+            len(self._curves), len(self._loaders) + len(self._queue),
+            self._comparison.memory() / 1e6, Constants.compare_memory_mb,
+            "\n{} drawn from their overview (memory limit)".format(self._reduced) if self._reduced else ""))
+
+    ###########################################################################
+    # Alignment and marked events
+    ###########################################################################
+    def _on_align_changed(self, index):
+        for line in self._event_lines:
+            line.setVisible(index == 1)
+        self._plt_freq.enableAutoRange(axis='xy', enable=True)
+        self._plt_diss.enableAutoRange(axis='xy', enable=True)
+        self._update_curves()
+
+    def _on_plot_clicked(self, event):
+        item = self._session_list.currentItem()
+        if not self._mark_button.isChecked() or item is None:
+            return
+        on_event = self._align_combo.currentIndex() == 1
+        view = self._plt_freq.getViewBox()
+        for plot in (self._plt_freq, self._plt_diss):
+            if plot.sceneBoundingRect().contains(event.scenePos()):
+                view = plot.getViewBox()
+        session = item.data(QtCore.Qt.UserRole)
+        # session time of the clicked point
+        session.event = view.mapSceneToView(event.scenePos()).x() + session.origin(on_event)
+        self._mark_button.setChecked(False)
+        self._on_item_changed(item)
+
+    def closeEvent(self, event):
+        self._queue = []
+        for loader in list(self._loaders.values()):
+            loader.cancel()
+            loader.wait()
+        super().closeEvent(event)
 
 
 ###############################################################################################################
@@ -1032,6 +1458,10 @@ class Ui_Main(object):
         self.actionRawDataView.setText("Raw Data View")
         self.menuData.addAction(self.actionRawDataView)
 
+        self.actionCompareView = QtWidgets.QAction(MainWindow)
+        self.actionCompareView.setText("Compare Sessions")
+        self.menuData.addAction(self.actionCompareView)
+
         # -----------------------------------------------------------------
         # Help Menu
         # -----------------------------------------------------------------